@@ -26,6 +26,23 @@ def extra_page_info_processing(comic_folder, comic_info, page_path, page_info):
     return page_info
 
 
+# def extra_page_info_list_processing(comic_folder, comic_info, page_info_list):
+#     """
+#     Batch version of extra_page_info_processing, for processing that has an expensive setup step (e.g. opening a
+#     database) that you only want to run once per build instead of once per page. If you define this hook,
+#     extra_page_info_processing is NOT called.
+#
+#     :param comic_folder: If the main comic is being built, this will be blank. Otherwise, it's the name of the extra
+#     comic that's currently being built.
+#     :param comic_info: The current comic's comic_info.ini file parsed into a RawConfigParser object.
+#     :param page_info_list: A list of dict representations of every published info.ini file, in no particular order.
+#     They're sorted by post date after this hook runs. The page folder for each one is
+#     your_content/{comic_folder}comics/{page_info["page_name"]}/
+#     :return: The list of dict representations of the info.ini files.
+#     """
+#     return page_info_list
+
+
 def extra_comic_dict_processing(comic_folder, comic_info, comic_data_dict):
     """
     Use this hook to do further processing on individual comic_data_dicts after they've been generated by build_site.py
@@ -39,6 +56,21 @@ def extra_comic_dict_processing(comic_folder, comic_info, comic_data_dict):
     return comic_data_dict
 
 
+# def extra_comic_data_dicts_processing(comic_folder, comic_info, comic_data_dicts):
+#     """
+#     Batch version of extra_comic_dict_processing, for processing that has an expensive setup step (e.g. opening a
+#     database) that you only want to run once per build instead of once per page. If you define this hook,
+#     extra_comic_dict_processing is NOT called.
+#
+#     :param comic_folder: If the main comic is being built, this will be blank. Otherwise, it's the name of the extra
+#     comic that's currently being built.
+#     :param comic_info: The current comic's comic_info.ini file parsed into a RawConfigParser object.
+#     :param comic_data_dicts: A list of the data dicts for every comic page, in post date order.
+#     :return: A list of the data dicts for every comic page
+#     """
+#     return comic_data_dicts
+
+
 def extra_get_storylines_processing(comic_folder, comic_info, storylines_dict):
     """
     Use this hook to do further processing on the `storylines` variable, which is used primarily to build the
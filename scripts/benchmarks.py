@@ -0,0 +1,316 @@
+"""
+Micro-benchmarks for the hot paths of the build. These are for comparing implementations while working on the engine,
+and aren't run as part of a normal build.
+
+Run from the comic_git_engine folder, e.g.:
+
+    python scripts/benchmarks.py thumbnails path/to/page.png
+    python scripts/benchmarks.py info_ini ../your_content/comics/*/info.ini
+    python scripts/benchmarks.py post_dates --pages 10000
+    python scripts/benchmarks.py rss --items 10000
+    python scripts/benchmarks.py feed_items --items 10000
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import tracemalloc
+from configparser import RawConfigParser
+from datetime import datetime, timedelta
+from time import perf_counter_ns, strftime, strptime
+from typing import Callable
+
+from PIL import Image, ImageChops, ImageStat
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from feed_item_cache import CachedFeedItems  # noqa: E402
+from images import RESAMPLING_FILTERS, fast_resize, resize  # noqa: E402
+from rss import build_feed_context, build_feed_xml, iter_feed_xml, serialize_feed_xml  # noqa: E402
+from utils import parse_flat_info, parse_post_date  # noqa: E402
+
+SAMPLE_INFO_INI = """Title = Page 1
+Post date = January 1, 2020
+Filenames = page1a.png, page1b.png
+# The rest is optional
+Storyline = Chapter 1
+Characters = Alice, Bob
+Tags = intro,
+    first page
+Alt text = The very first page!
+"""
+
+
+def time_ms(func: Callable[[], object], repeat: int) -> float:
+    """
+    Returns the median time of `repeat` calls to `func`, in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start_time = perf_counter_ns()
+        func()
+        times.append((perf_counter_ns() - start_time) / 1_000_000)
+    return statistics.median(times)
+
+
+def get_psnr(im1: Image, im2: Image) -> float:
+    """
+    Peak signal-to-noise ratio between two images of the same size, in dB. Higher is closer; above ~40 dB the
+    difference isn't visible.
+    """
+    diff = ImageChops.difference(im1.convert("RGB"), im2.convert("RGB"))
+    mse = statistics.mean(rms ** 2 for rms in ImageStat.Stat(diff).rms)
+    if mse == 0:
+        return math.inf
+    return 10 * math.log10(255 ** 2 / mse)
+
+
+def make_sample_images(directory: str) -> list[str]:
+    """
+    Creates a tall comic page sized JPEG and PNG with some noise in them, so there's detail for the resamplers to lose.
+    """
+    size = (4000, 6000)
+    noise = Image.effect_noise(size, 64)
+    gradient = Image.linear_gradient("L").resize(size)
+    im = Image.merge("RGB", (noise, gradient, ImageChops.invert(noise)))
+    paths = []
+    for ext in ("jpg", "png"):
+        path = os.path.join(directory, f"sample.{ext}")
+        im.save(path)
+        paths.append(path)
+    return paths
+
+
+def benchmark_thumbnails(args: argparse.Namespace) -> None:
+    resample = RESAMPLING_FILTERS[args.resampling] if args.resampling else None
+
+    def make_thumbnail(resize_func, path):
+        with Image.open(path) as im:
+            return resize_func(im, args.size, resample)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = args.images or make_sample_images(temp_dir)
+        print(f"{'Image':<40} {'resize ms':>10} {'fast ms':>10} {'speedup':>8} {'PSNR dB':>8}")
+        for path in paths:
+            resize_ms = time_ms(lambda: make_thumbnail(resize, path), args.repeat)
+            fast_ms = time_ms(lambda: make_thumbnail(fast_resize, path), args.repeat)
+            psnr = get_psnr(make_thumbnail(resize, path), make_thumbnail(fast_resize, path))
+            print(f"{os.path.basename(path):<40} {resize_ms:>10.1f} {fast_ms:>10.1f} "
+                  f"{resize_ms / fast_ms:>7.1f}x {psnr:>8.1f}")
+
+
+def parse_with_config_parser(info_string: str) -> dict[str, str]:
+    """
+    How read_info() parsed every info.ini file before parse_flat_info() was added.
+    """
+    info = RawConfigParser()
+    info.optionxform = str
+    info.read_string("[DEFAULT]\n" + info_string)
+    return dict(info["DEFAULT"])
+
+
+def benchmark_info_ini(args: argparse.Namespace) -> None:
+    info_strings = []
+    for path in args.files:
+        with open(path, "rb") as f:
+            info_strings.append(f.read().decode("utf-8"))
+    if not info_strings:
+        info_strings = [SAMPLE_INFO_INI]
+
+    def parse_all(parse_func):
+        for info_string in info_strings:
+            parse_func(info_string)
+
+    for info_string in info_strings:
+        if parse_flat_info(info_string) not in (None, parse_with_config_parser(info_string)):
+            raise AssertionError(f"parse_flat_info() doesn't match RawConfigParser for:\n{info_string}")
+    # Time enough parses for the numbers to be meaningful, e.g. one build of a comic with thousands of pages
+    loops = max(1, args.pages // len(info_strings))
+    config_parser_ms = time_ms(lambda: [parse_all(parse_with_config_parser) for _ in range(loops)], args.repeat)
+    flat_ms = time_ms(lambda: [parse_all(parse_flat_info) for _ in range(loops)], args.repeat)
+    page_count = loops * len(info_strings)
+    print(f"{'Parser':<20} {f'ms per {page_count} pages':>20} {'speedup':>8}")
+    print(f"{'RawConfigParser':<20} {config_parser_ms:>20.1f} {1:>7.1f}x")
+    print(f"{'parse_flat_info':<20} {flat_ms:>20.1f} {config_parser_ms / flat_ms:>7.1f}x")
+
+
+def benchmark_post_dates(args: argparse.Namespace) -> None:
+    date_format = "%B %d, %Y"
+    archive_date_format = "%Y-%m-%d"
+    post_dates = [(datetime(2000, 1, 1) + timedelta(i)).strftime(date_format) for i in range(args.pages)]
+
+    def parse_every_time():
+        # Scheduling, sorting, the archive date, and the RSS pubDate each parsed the post date again
+        for post_date in post_dates:
+            datetime.strptime(post_date, date_format)
+        sorted(post_dates, key=lambda d: strptime(d, date_format))
+        for post_date in post_dates:
+            strftime(archive_date_format, strptime(post_date, date_format))
+            strftime("%a, %d %b %Y %H:%M:%S +0000", strptime(post_date, date_format))
+
+    def parse_once():
+        # Start each run from an empty cache, like a new build
+        parse_post_date.cache_clear()
+        for post_date in post_dates:
+            parse_post_date(post_date, date_format)
+        sorted(post_dates, key=lambda d: parse_post_date(d, date_format))
+        for post_date in post_dates:
+            strftime(archive_date_format, parse_post_date(post_date, date_format).timetuple())
+            strftime("%a, %d %b %Y %H:%M:%S +0000", parse_post_date(post_date, date_format).timetuple())
+
+    every_time_ms = time_ms(parse_every_time, args.repeat)
+    once_ms = time_ms(parse_once, args.repeat)
+    print(f"{'Post dates':<20} {f'ms per {args.pages} pages':>20} {'speedup':>8}")
+    print(f"{'Parse every time':<20} {every_time_ms:>20.1f} {1:>7.1f}x")
+    print(f"{'parse_post_date':<20} {once_ms:>20.1f} {every_time_ms / once_ms:>7.1f}x")
+
+
+def make_sample_feed_input(item_count: int) -> tuple[RawConfigParser, list[dict]]:
+    comic_info = RawConfigParser()
+    comic_info.read_string(
+        "[Comic Info]\nComic name = Benchmark Comic\nAuthor = Benchmarker\nDescription = A comic\n"
+        "[Comic Settings]\nComic domain = example.com\nComic subdirectory =\nDate format = %B %d, %Y\n"
+    )
+    comic_data_dicts = [
+        {
+            "_title": f"Page {i} & friends",
+            "_post_date": (datetime(2000, 1, 1) + timedelta(i)).strftime("%B %d, %Y"),
+            "page_name": f"Page {i}",
+            "comic_paths": [f"your_content/comics/Page {i}/page{i}.png"],
+            "_storyline": f"Chapter {i // 100 + 1}",
+            "_characters": ["Alice", "Bob"],
+            "_tags": ["tag1", "tag2", "tag3"],
+            "escaped_alt_text": f"Alt text for page {i}",
+            "post_html": f"<p>This is the post for <strong>page {i}</strong>.</p>\n" * 5,
+        }
+        for i in range(item_count)
+    ]
+    return comic_info, comic_data_dicts
+
+
+def make_sample_feed_context(item_count: int) -> dict:
+    return build_feed_context(*make_sample_feed_input(item_count))
+
+
+def measure_peak_memory_mb(func: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_rss(args: argparse.Namespace) -> None:
+    feed_context = make_sample_feed_context(args.items)
+
+    def write_with_minidom(f):
+        f.write(bytes(serialize_feed_xml(*build_feed_xml(feed_context)), "utf-8"))
+
+    def write_streaming(f):
+        for chunk in iter_feed_xml(feed_context):
+            f.write(bytes(chunk, "utf-8"))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results = []
+        for name, write_func in (("minidom round trip", write_with_minidom), ("iter_feed_xml", write_streaming)):
+            path = os.path.join(temp_dir, f"{write_func.__name__}.xml")
+
+            def write_feed():
+                with open(path, "wb") as f:
+                    write_func(f)
+
+            results.append((name, time_ms(write_feed, args.repeat), measure_peak_memory_mb(write_feed), path))
+        with open(results[0][3], "rb") as f1, open(results[1][3], "rb") as f2:
+            if f1.read() != f2.read():
+                raise AssertionError("iter_feed_xml() doesn't match the minidom round trip")
+    print(f"{'Serializer':<20} {f'ms per {args.items} items':>20} {'speedup':>8} {'peak MB':>8}")
+    for name, ms, peak_mb, _ in results:
+        print(f"{name:<20} {ms:>20.1f} {results[0][1] / ms:>7.1f}x {peak_mb:>8.2f}")
+
+
+def benchmark_feed_items(args: argparse.Namespace) -> None:
+    comic_info, comic_data_dicts = make_sample_feed_input(args.items)
+    # The cache is from the last build, which had every page but the newest one
+    cached_items = CachedFeedItems()
+    build_feed_context(comic_info, comic_data_dicts[:-1], cached_items=cached_items)
+    cache_json = json.dumps(cached_items.used_entries)
+
+    def build_uncached():
+        build_feed_context(comic_info, comic_data_dicts)
+
+    def build_cached():
+        # Loading and saving the cache is part of the cost
+        build_cached_items = CachedFeedItems(cached_items.settings_key, json.loads(cache_json))
+        build_feed_context(comic_info, comic_data_dicts, cached_items=build_cached_items)
+        json.dumps(build_cached_items.used_entries)
+
+    uncached_ms = time_ms(build_uncached, args.repeat)
+    cached_ms = time_ms(build_cached, args.repeat)
+    print(f"{'Feed items':<20} {f'ms per {args.items} items':>20} {'speedup':>8}")
+    print(f"{'Normalize every item':<20} {uncached_ms:>20.1f} {1:>7.1f}x")
+    print(f"{'Feed item cache':<20} {cached_ms:>20.1f} {uncached_ms / cached_ms:>7.1f}x")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks for the comic_git build.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    thumbnails_parser = subparsers.add_parser(
+        "thumbnails",
+        help="Compare the default thumbnail resize against the 'Fast thumbnails' path.",
+    )
+    thumbnails_parser.add_argument(
+        "images", nargs="*",
+        help="Images to make thumbnails from. If none are given, large sample images are generated.",
+    )
+    thumbnails_parser.add_argument("--size", default="200w", help="Thumbnail size, as in comic_info.ini.")
+    thumbnails_parser.add_argument("--resampling", choices=list(RESAMPLING_FILTERS), help="Resampling filter.")
+    thumbnails_parser.add_argument("--repeat", type=int, default=5, help="Times to run each case.")
+    thumbnails_parser.set_defaults(func=benchmark_thumbnails)
+
+    info_ini_parser = subparsers.add_parser(
+        "info_ini",
+        help="Compare parsing page info.ini files with RawConfigParser against the flat info.ini parser.",
+    )
+    info_ini_parser.add_argument(
+        "files", nargs="*",
+        help="info.ini files to parse. If none are given, a typical page info.ini is used.",
+    )
+    info_ini_parser.add_argument("--pages", type=int, default=5000, help="Number of info.ini files to parse per run.")
+    info_ini_parser.add_argument("--repeat", type=int, default=5, help="Times to run each case.")
+    info_ini_parser.set_defaults(func=benchmark_info_ini)
+
+    post_dates_parser = subparsers.add_parser(
+        "post_dates",
+        help="Compare parsing every page's post date each time it's used against parsing it once per build.",
+    )
+    post_dates_parser.add_argument("--pages", type=int, default=10000, help="Number of pages in the archive.")
+    post_dates_parser.add_argument("--repeat", type=int, default=5, help="Times to run each case.")
+    post_dates_parser.set_defaults(func=benchmark_post_dates)
+
+    rss_parser = subparsers.add_parser(
+        "rss",
+        help="Compare writing the RSS feed through the minidom round trip against the streaming feed writer.",
+    )
+    rss_parser.add_argument("--items", type=int, default=10000, help="Number of items in the feed.")
+    rss_parser.add_argument("--repeat", type=int, default=3, help="Times to run each case.")
+    rss_parser.set_defaults(func=benchmark_rss)
+
+    feed_items_parser = subparsers.add_parser(
+        "feed_items",
+        help="Compare normalizing every RSS feed item against the feed item cache, after adding one new page.",
+    )
+    feed_items_parser.add_argument("--items", type=int, default=10000, help="Number of items in the feed.")
+    feed_items_parser.add_argument("--repeat", type=int, default=5, help="Times to run each case.")
+    feed_items_parser.set_defaults(func=benchmark_feed_items)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    args.func(args)
@@ -0,0 +1,88 @@
+"""
+Helpers for the on-disk cache that comic_git uses to skip work on content that hasn't changed between builds.
+
+The cache directory lives in the host repo root by default, next to `your_content/`. Everything in it can be safely
+deleted at any time; the next build will just do a full rebuild and fill it back in.
+"""
+import hashlib
+import json
+import os
+from configparser import RawConfigParser
+from typing import Any
+
+DEFAULT_CACHE_DIRECTORY = ".comic_git_cache"
+
+
+def get_cache_directory(comic_info: RawConfigParser) -> str:
+    return comic_info.get("Comic Settings", "Cache directory", fallback=DEFAULT_CACHE_DIRECTORY)
+
+
+def is_build_cache_enabled(comic_info: RawConfigParser) -> bool:
+    """
+    Whether the `Use build cache` option in the [Comic Settings] section is on. This turns on the caches for work that
+    doesn't write any files of its own, like Markdown conversion.
+    """
+    return comic_info.getboolean("Comic Settings", "Use build cache", fallback=False)
+
+
+def get_cache_path(comic_info: RawConfigParser, filename: str) -> str:
+    return os.path.join(get_cache_directory(comic_info), filename)
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_json(value: Any) -> str:
+    """
+    Hashes any JSON-like value. Keys are sorted so that dicts with the same contents always produce the same hash,
+    and anything that isn't natively JSON serializable (e.g. datetimes) is hashed using its string representation.
+    """
+    return hash_bytes(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+
+
+def load_json_cache(path: str) -> dict[str, Any]:
+    """
+    Loads a JSON cache file. A missing or unreadable cache file is never an error, it just means we start from an
+    empty cache.
+    """
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read().decode("utf-8"))
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable cache file {path}: {e}")
+        return {}
+    if not isinstance(data, dict):
+        print(f"Ignoring cache file {path} with unexpected contents")
+        return {}
+    return data
+
+
+def save_json_cache(path: str, data: dict[str, Any]) -> None:
+    """
+    Writes a JSON cache file. The file is written to a temporary path first and then moved into place, so an
+    interrupted build can't leave a half-written cache file behind.
+    """
+    dir_name = os.path.dirname(path)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(bytes(json.dumps(data), "utf-8"))
+        os.replace(temp_path, path)
+    except (OSError, IOError) as e:
+        raise ValueError(
+            f"Could not write cache file {path}\n"
+            f"Verify the cache directory is writable, or delete it and try again."
+        ) from e
@@ -0,0 +1,156 @@
+"""
+Incremental build support.
+
+When incremental builds are enabled, every comic page that gets written is recorded in a build manifest, along with a
+fingerprint of everything that went into rendering it: the template files and the values of every template variable
+that the page's template tree can read. On the next build, pages whose fingerprint hasn't changed are left on disk
+instead of being rendered and written again.
+"""
+import os
+from configparser import RawConfigParser
+from dataclasses import dataclass, field
+from typing import Any
+
+from jinja2 import Environment, TemplateNotFound, meta
+
+import utils
+from build_cache import get_cache_path, hash_bytes, hash_json, load_json_cache, save_json_cache
+
+MANIFEST_FILENAME = "build_manifest.json"
+MANIFEST_VERSION = 1
+
+
+@dataclass(slots=True)
+class BuildManifest:
+    path: str
+    # Fingerprints from the last build, keyed on output file path
+    previous_pages: dict[str, str]
+    # Fingerprints of every page that's part of the current build, whether it was rewritten or not
+    pages: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class PageTemplate:
+    digest: str
+    # Names of every variable the template tree can read, or None if that couldn't be worked out statically
+    variables: set[str] | None
+
+
+def is_incremental_build_enabled(comic_info: RawConfigParser) -> bool:
+    return comic_info.getboolean("Comic Settings", "Incremental build", fallback=False)
+
+
+def load_build_manifest(comic_info: RawConfigParser) -> BuildManifest:
+    path = get_cache_path(comic_info, MANIFEST_FILENAME)
+    data = load_json_cache(path)
+    previous_pages = data.get("pages", {}) if data.get("version") == MANIFEST_VERSION else {}
+    return BuildManifest(path=path, previous_pages=previous_pages)
+
+
+def save_build_manifest(build_manifest: BuildManifest) -> None:
+    save_json_cache(build_manifest.path, {"version": MANIFEST_VERSION, "pages": build_manifest.pages})
+
+
+def has_previous_build(build_manifest: BuildManifest | None) -> bool:
+    return build_manifest is not None and bool(build_manifest.previous_pages)
+
+
+def get_output_path(html_path: str) -> str:
+    output_dir = os.getenv("OUTPUT_DIR", "")
+    if output_dir:
+        return os.path.join(output_dir, html_path)
+    return html_path
+
+
+def get_template_digest(environment: Environment, md_path: str) -> str:
+    """
+    Hashes every file the Jinja environment can load, plus the Markdown page for this template if there is one.
+    Changing any template is rare compared to changing comic content, so it's not worth the complexity of working out
+    exactly which template files a given page depends on.
+    """
+    sources = []
+    for name in sorted(environment.list_templates()):
+        source, filename, _ = environment.loader.get_source(environment, name)
+        sources.append([name, filename, source])
+    if os.path.isfile(md_path):
+        with open(md_path, "rb") as f:
+            sources.append([md_path, md_path, hash_bytes(f.read())])
+    return hash_json(sources)
+
+
+def get_template_variables(environment: Environment, template_name: str) -> set[str] | None:
+    """
+    Finds every variable read by the given template, and by any template it extends, includes, or imports.
+    :return: The set of variable names, or None if a template is loaded using a dynamic name and the full list of
+    variables can't be determined.
+    """
+    variables = set()
+    seen = set()
+    to_visit = [template_name]
+    while to_visit:
+        name = to_visit.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        source = environment.loader.get_source(environment, name)[0]
+        ast = environment.parse(source)
+        variables.update(meta.find_undeclared_variables(ast))
+        for referenced_template in meta.find_referenced_templates(ast):
+            if referenced_template is None:
+                return None
+            to_visit.append(referenced_template)
+    return variables
+
+
+def get_page_template(template_name: str, theme: str) -> PageTemplate:
+    environment = utils.jinja_environment
+    if environment is None:
+        raise RuntimeError("Jinja environment was not initialized before get_page_template was called.")
+    md_path = f"your_content/themes/{theme}/pages/{template_name}.md"
+    digest = get_template_digest(environment, md_path)
+    if os.path.isfile(md_path):
+        # Markdown pages can pick their own template in their metadata, so fingerprint every variable instead
+        return PageTemplate(digest=digest, variables=None)
+    for ext in (".html", ".tpl"):
+        try:
+            return PageTemplate(digest=digest, variables=get_template_variables(environment, template_name + ext))
+        except TemplateNotFound:
+            pass
+    raise TemplateNotFound(
+        f"Template matching '{template_name}' not found\n"
+        f"Verify the template file exists in your theme's templates folder or the default templates folder, "
+        f"and that the filename matches (case-sensitive)."
+    )
+
+
+def fingerprint_page(page_template: PageTemplate, data_dict: dict[str, Any]) -> str:
+    if page_template.variables is None:
+        values = data_dict
+    else:
+        values = {k: data_dict[k] for k in page_template.variables if k in data_dict}
+    return hash_json([page_template.digest, values])
+
+
+def should_write_page(build_manifest: BuildManifest, html_path: str, fingerprint: str) -> bool:
+    """
+    Records the page in the manifest for this build, and returns whether it needs to be written again.
+    """
+    output_path = get_output_path(html_path)
+    build_manifest.pages[output_path] = fingerprint
+    if build_manifest.previous_pages.get(output_path) != fingerprint:
+        return True
+    return not os.path.isfile(output_path)
+
+
+def remove_stale_pages(build_manifest: BuildManifest) -> None:
+    """
+    Deletes any page that was written by the previous build but isn't part of this one, e.g. because the comic page
+    was deleted, renamed, or rescheduled.
+    """
+    for output_path in build_manifest.previous_pages.keys() - build_manifest.pages.keys():
+        if os.path.isfile(output_path):
+            print(f"Deleting stale page {output_path}")
+            os.remove(output_path)
+        page_dir = os.path.dirname(output_path)
+        if page_dir and os.path.isdir(page_dir) and not os.listdir(page_dir):
+            os.rmdir(page_dir)
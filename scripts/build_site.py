@@ -10,25 +10,39 @@ from collections import OrderedDict, defaultdict
 from configparser import RawConfigParser
 from copy import deepcopy
 from datetime import datetime
-from glob import iglob
-from importlib import import_module
-from time import strptime, strftime
+from fnmatch import fnmatch
+from time import strftime
 from typing import Dict, List, Tuple, Any, Optional
 from urllib.error import HTTPError
 from urllib.request import urlopen
 
-from PIL import Image
-from markdown2 import Markdown
 from pytz import timezone
 
 import utils
+from build_manifest import (
+    BuildManifest, fingerprint_page, get_page_template, has_previous_build, is_incremental_build_enabled,
+    load_build_manifest, remove_stale_pages, save_build_manifest, should_write_page,
+)
+from feed_item_cache import load_feed_item_cache, save_feed_item_cache
+from hook_registry import call_hook, get_hook, print_hook_stats, reset_hook_registry
+from images import create_comic_thumbnail, process_comic_images, resize, save_image  # noqa: F401
+from markdown_cache import CachedMarkdown, load_markdown_cache, save_markdown_cache
 from models import ComicBuildResult
-from rss import build_rss_feed_from_job, get_rss_feed_jobs
+from page_index import PageFolder, PageIndex
+from page_info_cache import PageInfoCache, load_page_info_cache, save_page_info_cache
+from post_text import SharedPostText, build_post_text, load_shared_post_text
+from rendering import write_pages
+from responsive_images import process_responsive_images
+from rss import (
+    FEED_HEADERS_SUFFIX, build_rss_feeds, get_rss_feed_jobs, is_keep_unchanged_feeds_enabled, remove_stale_feeds,
+)
+from transcripts import TranscriptIndex
 from utils import read_info, web_path, checkpoint, print_processing_times
+from workers import get_page_discovery_thread_count, get_worker_count, map_in_thread_pool
 
 VERSION = "1.0.9"
 
-MARKDOWN = Markdown(extras=["strike", "break-on-newline", "markdown-in-html"])
+MARKDOWN = CachedMarkdown(extras=["strike", "break-on-newline", "markdown-in-html"])
 
 AUTOGENERATE_WARNING = """<!--
 !! DO NOT EDIT THIS FILE !!
@@ -57,34 +71,93 @@ def add_inputs_to_env_vars(inputs: str):
             os.environ[k] = v
 
 
-def delete_output_file_space(comic_info: RawConfigParser = None):
+def delete_output_file_space(comic_info: RawConfigParser = None, keep: list[str] | None = None):
+    """
+    Deletes the files generated by the last build.
+    :param comic_info: Config data for comic_info.ini file. Loaded from disk if not given.
+    :param keep: Optional list of glob patterns, relative to the output directory, for generated files and folders
+    that should be left in place.
+    """
     output_dir = os.getenv("OUTPUT_DIR", "")
     if output_dir:
-        shutil.rmtree(output_dir, ignore_errors=True)
+        if not keep:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        elif os.path.isdir(output_dir):
+            for name in os.listdir(output_dir):
+                remove_output_path(output_dir, name, keep)
         return
-    shutil.rmtree("comic", ignore_errors=True)
-    if os.path.isfile("feed.xml"):
-        os.remove("feed.xml")
+    keep = keep or []
+    remove_output_path("", "comic", keep)
+    remove_output_path("", "feed.xml", keep)
     if comic_info is None:
         comic_info = read_info("your_content/comic_info.ini")
     for page in get_pages_list(comic_info):
         if page["template_name"] == "index":
-            if os.path.exists("index.html"):
-                os.remove("index.html")
+            remove_output_path("", "index.html", keep)
         elif page["template_name"] == "404":
-            if os.path.exists("404.html"):
-                os.remove("404.html")
+            remove_output_path("", "404.html", keep)
         else:
-            if os.path.exists(page["template_name"]):
-                shutil.rmtree(page["template_name"])
+            remove_output_path("", page["template_name"], keep)
     for comic in get_extra_comics_list(comic_info):
-        if os.path.exists(comic):
-            shutil.rmtree(comic)
+        remove_output_path("", comic.strip("/"), keep)
+
+
+def remove_output_path(output_dir: str, rel_path: str, keep: list[str]):
+    """
+    Deletes the file or folder at `rel_path` inside the output directory, except for anything matching one of the
+    `keep` glob patterns. Folders that contain something to keep are emptied out instead of deleted.
+    """
+    if any(fnmatch(rel_path, pattern) for pattern in keep):
+        return
+    path = os.path.join(output_dir, rel_path)
+    if os.path.isdir(path):
+        if any(is_parent_of_pattern(rel_path, pattern) for pattern in keep):
+            for name in os.listdir(path):
+                remove_output_path(output_dir, f"{rel_path}/{name}", keep)
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def is_parent_of_pattern(rel_path: str, pattern: str) -> bool:
+    """
+    Returns whether a file matching the glob `pattern` could exist somewhere inside the folder at `rel_path`.
+    """
+    path_parts = rel_path.split("/")
+    pattern_parts = pattern.split("/")
+    if len(pattern_parts) <= len(path_parts):
+        return False
+    return all(fnmatch(path_part, pattern_part) for path_part, pattern_part in zip(path_parts, pattern_parts))
+
+
+def get_preserved_output_paths(comic_info: RawConfigParser, keep_comic_pages: bool) -> list[str]:
+    keep = []
+    if keep_comic_pages:
+        # Comic pages are written as comic/<page>/index.html, so only the folders for individual pages are kept.
+        # Everything else under comic/ is regenerated every build.
+        keep.append("comic/*/index.html")
+        keep.extend(f"{comic.strip('/')}/comic/*/index.html" for comic in get_extra_comics_list(comic_info))
+    keep.extend(get_preserved_feed_paths(comic_info))
+    return keep
+
 
+def get_preserved_feed_paths(comic_info: RawConfigParser) -> list[str]:
+    """
+    Feeds are only rewritten when their contents change with `Keep unchanged feeds`, so the feeds from the last build
+    have to stay around to be compared against. The ones that aren't built again are deleted after the feeds are built.
+    """
+    if not is_keep_unchanged_feeds_enabled(comic_info):
+        return []
+    keep = []
+    for feed_prefix in ["", *(f"{comic.strip('/')}/" for comic in get_extra_comics_list(comic_info))]:
+        keep.extend([f"{feed_prefix}feed*.xml", f"{feed_prefix}feed*.xml{FEED_HEADERS_SUFFIX}"])
+    return keep
 
-def setup_output_file_space(comic_info: RawConfigParser):
+
+def setup_output_file_space(comic_info: RawConfigParser, keep_comic_pages: bool = False):
     # Clean workspace, i.e. delete old files
-    delete_output_file_space(comic_info)
+    delete_output_file_space(comic_info, get_preserved_output_paths(comic_info, keep_comic_pages))
 
 
 def get_links_list(comic_info: RawConfigParser) -> list[dict[str, Any]]:
@@ -131,16 +204,14 @@ def run_hook(theme: str, func: str, args: List[Any]) -> Any:
     :param args: Args list to pass to the function
     :return: The return value of the function called, if one was found. Otherwise, None.
     """
-    if os.path.exists(f"your_content/themes/{theme}/scripts/hooks.py"):
-        current_path = os.path.abspath(".")
-        if current_path not in sys.path:
-            sys.path.append(current_path)
-            print(f"Path updated: {sys.path}")
-        hooks = import_module(f"your_content.themes.{theme}.scripts.hooks")
-        if hasattr(hooks, func):
-            method = getattr(hooks, func)
-            return method(*args)
-    return None
+    return call_hook(theme, func, args)
+
+
+def has_hook(theme: str, func: str) -> bool:
+    """
+    Determines if the hooks.py file has been added to the given theme, and if that file contains the given function.
+    """
+    return get_hook(theme, func) is not None
 
 
 def build_and_publish_comic_pages(
@@ -150,9 +221,12 @@ def build_and_publish_comic_pages(
         delete_scheduled_posts: bool,
         publish_all_comics: bool,
         extra_comics_dict: Optional[dict] = None,
+        build_manifest: Optional[BuildManifest] = None,
 ) -> tuple[list[dict], dict]:
+    page_index = PageIndex(f"your_content/{comic_folder}comics")
+    transcript_index = TranscriptIndex(comic_folder, comic_info, page_index)
     page_info_list, scheduled_post_count = get_page_info_list(
-        comic_folder, comic_info, delete_scheduled_posts, publish_all_comics
+        comic_folder, comic_info, delete_scheduled_posts, publish_all_comics, transcript_index, page_index
     )
     print([p["page_name"] for p in page_info_list])
     checkpoint(f"Get info for all pages in '{comic_folder}'")
@@ -162,13 +236,17 @@ def build_and_publish_comic_pages(
     checkpoint(f"Save page_info_list.json file in '{comic_folder}'")
 
     # Build full comic data dicts to build templates with
-    comic_data_dicts = build_comic_data_dicts(comic_folder, comic_info, page_info_list)
+    comic_data_dicts = build_comic_data_dicts(comic_folder, comic_info, page_info_list, transcript_index)
     checkpoint(f"Build full comic data dicts for '{comic_folder}'")
 
     # Create low-res and thumbnail versions of all the comic pages
-    process_comic_images(comic_info, comic_data_dicts)
+    process_comic_images(comic_info, comic_data_dicts, page_index)
     checkpoint(f"Process comic images in '{comic_folder}'")
 
+    # Create smaller, modern format versions of all the comic pages for srcset
+    process_responsive_images(comic_info, comic_data_dicts)
+    checkpoint(f"Process responsive images in '{comic_folder}'")
+
     # Load home page text
     base_path = f"your_content/{comic_folder}home page."
     for ext in ("txt", "html"):
@@ -227,13 +305,29 @@ def build_and_publish_comic_pages(
     if extra_global_variables:
         global_values.update(extra_global_variables)
     checkpoint(f"Run hook for extra global values in '{comic_folder}'")
-    write_html_files(comic_folder, comic_info, comic_data_dicts, global_values)
+    write_html_files(comic_folder, comic_info, comic_data_dicts, global_values, build_manifest, page_index)
     checkpoint(f"Write HTML files for '{comic_folder}'")
     return comic_data_dicts, global_values
 
 
+def read_page_info(page_folder: PageFolder, page_info_cache: Optional[PageInfoCache] = None) -> Optional[Dict]:
+    """
+    :return: The contents of the page folder's info.ini file, or None if it doesn't have one.
+    """
+    if not page_folder.has_file("info.ini"):
+        return None
+    if page_info_cache is not None:
+        return page_info_cache.read_page_info(page_folder)
+    return read_info(f"{page_folder.path}info.ini", to_dict=True)
+
+
 def get_page_info_list(comic_folder: str, comic_info: RawConfigParser, delete_scheduled_posts: bool,
-                       publish_all_comics: bool) -> Tuple[List[Dict], int]:
+                       publish_all_comics: bool, transcript_index: Optional[TranscriptIndex] = None,
+                       page_index: Optional[PageIndex] = None) -> Tuple[List[Dict], int]:
+    if page_index is None:
+        page_index = PageIndex(f"your_content/{comic_folder}comics")
+    if transcript_index is None:
+        transcript_index = TranscriptIndex(comic_folder, comic_info, page_index)
     date_format = comic_info.get("Comic Settings", "Date format")
     try:
         tz_info = timezone(comic_info.get("Comic Settings", "Timezone"))
@@ -248,16 +342,25 @@ def get_page_info_list(comic_folder: str, comic_info: RawConfigParser, delete_sc
     page_info_list = []
     scheduled_post_count = 0
     theme = comic_info.get("Comic Settings", "Theme", fallback="default")
-    for page_path in iglob(f"your_content/{comic_folder}comics/*/"):
-        # Unuglify Windows paths
-        page_path = page_path.replace("\\", "/")
+    # If the theme processes the whole list of page infos at once, it replaces the hook for individual page infos
+    use_page_info_list_hook = has_hook(theme, "extra_page_info_list_processing")
+    page_folders = list(page_index.pages.values())
+    page_info_cache = load_page_info_cache(comic_info)
+    # Reading the info.ini files is mostly waiting on the disk, so they can be read on several threads at once. The page
+    # infos still come back in order, and any error reading one is raised when the loop reaches that page.
+    page_infos = map_in_thread_pool(
+        lambda page_folder: read_page_info(page_folder, page_info_cache),
+        page_folders,
+        get_page_discovery_thread_count(comic_info),
+    )
+    for page_folder, page_info in zip(page_folders, page_infos):
+        page_path = page_folder.path
         filepath = f"{page_path}info.ini"
-        if not os.path.exists(f"{page_path}info.ini"):
+        if page_info is None:
             print(f"{page_path} is missing its info.ini file. Skipping")
             continue
-        page_info = read_info(filepath, to_dict=True)
         try:
-            post_date = tz_info.localize(datetime.strptime(page_info["Post date"], date_format))
+            post_date = tz_info.localize(utils.parse_post_date(page_info["Post date"], date_format))
         except ValueError as e:
             raise ValueError(
                 f"Invalid 'Post date' in {filepath}: {page_info['Post date']}\n"
@@ -276,7 +379,7 @@ def get_page_info_list(comic_folder: str, comic_info: RawConfigParser, delete_sc
                 # Sanity check that the files actually exist
                 for filename in page_info["image_file_names"]:
                     path = os.path.join(page_path, filename)
-                    if not os.path.isfile(path):
+                    if not page_index.isfile(path):
                         raise FileNotFoundError(
                             f"Could not find comic image {path}\n"
                             f"Did you mistype the filename in the info.ini file? Remember that filenames and extensions "
@@ -287,13 +390,13 @@ def get_page_info_list(comic_folder: str, comic_info: RawConfigParser, delete_sc
                 # folder and add any you find to the list of image files.
                 # Skip any image files whose names start with an underscore.
                 image_files = []
-                for filename in os.listdir(page_path):
+                for filename in page_folder.files:
                     if filename.startswith("_"):
                         continue
                     if re.search(r"\.(jpg|jpeg|png|tif|tiff|gif|bmp|webp|webv|svg|eps)$", filename):
                         image_files.append(filename)
                 page_info["image_file_names"] = sorted(image_files)
-            page_info["page_name"] = os.path.basename(os.path.normpath(page_path))
+            page_info["page_name"] = page_folder.name
             page_info["Storyline"] = page_info.get("Storyline", "")
             page_info["Characters"] = utils.str_to_list(page_info.get("Characters", ""))
             page_info["Tags"] = utils.str_to_list(page_info.get("Tags", ""))
@@ -303,18 +406,23 @@ def get_page_info_list(comic_folder: str, comic_info: RawConfigParser, delete_sc
                 if key.startswith("!"):
                     del page_info[key]
             # Get list of transcript languages for the given page
-            transcripts = get_transcripts(comic_folder, comic_info, page_info["page_name"])
-            page_info["transcript_languages"] = list(transcripts.keys())
-            hook_result = run_hook(theme, "extra_page_info_processing",
-                                   [comic_folder, comic_info, page_path, page_info])
-            if hook_result:
-                page_info = hook_result
+            page_info["transcript_languages"] = transcript_index.get_languages(page_info["page_name"])
+            if not use_page_info_list_hook:
+                hook_result = run_hook(theme, "extra_page_info_processing",
+                                       [comic_folder, comic_info, page_path, page_info])
+                if hook_result:
+                    page_info = hook_result
             print(page_info)
             page_info_list.append(page_info)
+    save_page_info_cache(page_info_cache, page_index)
 
+    if use_page_info_list_hook:
+        hook_result = run_hook(theme, "extra_page_info_list_processing", [comic_folder, comic_info, page_info_list])
+        if hook_result is not None:
+            page_info_list = hook_result
     page_info_list = sorted(
         page_info_list,
-        key=lambda x: (strptime(x["Post date"], date_format), x["page_name"])
+        key=lambda x: (utils.parse_post_date(x["Post date"], date_format), x["page_name"])
     )
     return page_info_list, scheduled_post_count
 
@@ -341,44 +449,7 @@ def get_ids(comic_list: List[Dict], index):
 
 
 def get_transcripts(comic_folder: str, comic_info: RawConfigParser, page_name: str) -> OrderedDict:
-    if not comic_info.getboolean("Transcripts", "Enable transcripts"):
-        return OrderedDict()
-    transcripts = OrderedDict()
-    if comic_info.getboolean("Transcripts", "Load transcripts from comic folder", fallback=True):
-        transcripts.update(load_transcripts_from_folder(f"your_content/{comic_folder}comics", page_name))
-    transcripts_dir = comic_info.get("Transcripts", "Transcripts folder", fallback="")
-    if transcripts_dir:
-        transcripts.update(load_transcripts_from_folder(transcripts_dir, page_name))
-    default_language = comic_info.get("Transcripts", "Default language", fallback="English")
-    if default_language in transcripts:
-        transcripts.move_to_end(default_language, last=False)
-    return transcripts
-
-
-def load_transcripts_from_folder(transcripts_dir: str, page_name: str):
-    """
-    Loads both *.txt and *.md files from the transcripts folder, as defined in the config file. If two files exist
-    with the same name (e.g. English.txt and English.md), then the *.md file will take precedence.
-    :param transcripts_dir:
-    :param page_name:
-    :return:
-    """
-    extensions = ["*.txt", "*.md"]
-    transcripts = {}
-    for ext in extensions:
-        for transcript_path in sorted(iglob(os.path.join(transcripts_dir, page_name, ext))):
-            # Ignore the post.txt in the comic folders
-            if transcript_path.endswith("post.txt"):
-                continue
-            language = os.path.splitext(os.path.basename(transcript_path))[0]
-            with open(transcript_path, "rb") as f:
-                text = f.read()
-                try:
-                    text = text.decode("utf-8")
-                except UnicodeDecodeError:
-                    text = text.decode("latin-1")
-                transcripts[language] = MARKDOWN.convert(text)
-    return transcripts
+    return TranscriptIndex(comic_folder, comic_info).get_transcripts(page_name, MARKDOWN)
 
 
 def format_user_variable(k: str) -> str:
@@ -407,7 +478,13 @@ def format_user_variable(k: str) -> str:
 
 
 def create_comic_data(comic_folder: str, comic_info: RawConfigParser, page_info: dict,
-                      first_id: str, previous_id: str, current_id: str, next_id: str, last_id: str):
+                      first_id: str, previous_id: str, current_id: str, next_id: str, last_id: str,
+                      transcript_index: Optional[TranscriptIndex] = None,
+                      shared_post_text: Optional[SharedPostText] = None, run_comic_dict_hook: bool = True):
+    if transcript_index is None:
+        transcript_index = TranscriptIndex(comic_folder, comic_info)
+    if shared_post_text is None:
+        shared_post_text = load_shared_post_text(comic_folder, comic_info, MARKDOWN)
     t = strftime("%Y-%m-%d %H:%M:%S")
     print(f"[{t}] Building page {page_info['page_name']}...")
     page_dir = f"your_content/{comic_folder}comics/{page_info['page_name']}/"
@@ -415,27 +492,11 @@ def create_comic_data(comic_folder: str, comic_info: RawConfigParser, page_info:
     if archive_date_format:
         archive_post_date = strftime(
             archive_date_format,
-            strptime(
-                page_info["Post date"],
-                comic_info.get("Comic Settings", "Date format")
-            )
+            utils.parse_post_date(page_info["Post date"], comic_info.get("Comic Settings", "Date format")).timetuple()
         )
     else:
         archive_post_date = page_info["Post date"]
-    post_md = []
-    post_text_paths = [
-        f"your_content/{comic_folder}before post text.txt",
-        f"your_content/{comic_folder}before post text.html",
-        page_dir + "post.txt",
-        f"your_content/{comic_folder}after post text.txt",
-        f"your_content/{comic_folder}after post text.html",
-    ]
-    for post_text_path in post_text_paths:
-        if os.path.isfile(post_text_path):
-            with open(post_text_path, "rb") as f:
-                post_md.append(f.read().decode("utf-8"))
-    post_md = "\n\n".join(post_md)
-    post_html = MARKDOWN.convert(post_md)
+    post_md, post_html = build_post_text(shared_post_text, page_dir + "post.txt", MARKDOWN)
     # Figure out page_title from the info.ini or comic page file names
     if "Title" in page_info:
         page_title = page_info["Title"]
@@ -458,7 +519,7 @@ def create_comic_data(comic_folder: str, comic_info: RawConfigParser, page_info:
         "archive_post_date": archive_post_date,
         "post_md": post_md,
         "post_html": post_html,
-        "transcripts": get_transcripts(comic_folder, comic_info, page_info["page_name"]),
+        "transcripts": transcript_index.get_transcripts(page_info["page_name"], MARKDOWN),
     }
     # Copy in existing page info options to the data dict, but format them so they're proper Jinja2 variable names
     d.update({format_user_variable(k): v for k, v in page_info.items()})
@@ -469,88 +530,34 @@ def create_comic_data(comic_folder: str, comic_info: RawConfigParser, page_info:
     if "_on_comic_click" not in d:
         d["_on_comic_click"] = comic_info.get("Comic Settings", "On comic click", fallback="Next comic")
     d["_on_comic_click"] = d["_on_comic_click"].lower()
-    theme = comic_info.get("Comic Settings", "Theme", fallback="default")
-    hook_result = run_hook(theme, "extra_comic_dict_processing", [comic_folder, comic_info, d])
-    if hook_result:
-        d = hook_result
+    if run_comic_dict_hook:
+        theme = comic_info.get("Comic Settings", "Theme", fallback="default")
+        hook_result = run_hook(theme, "extra_comic_dict_processing", [comic_folder, comic_info, d])
+        if hook_result:
+            d = hook_result
     return d
 
 
-def build_comic_data_dicts(comic_folder: str, comic_info: RawConfigParser, page_info_list: List[Dict]) -> List[Dict]:
-    return [
-        create_comic_data(comic_folder, comic_info, page_info, **get_ids(page_info_list, i))
+def build_comic_data_dicts(comic_folder: str, comic_info: RawConfigParser, page_info_list: List[Dict],
+                           transcript_index: Optional[TranscriptIndex] = None) -> List[Dict]:
+    if transcript_index is None:
+        transcript_index = TranscriptIndex(comic_folder, comic_info)
+    shared_post_text = load_shared_post_text(comic_folder, comic_info, MARKDOWN)
+    theme = comic_info.get("Comic Settings", "Theme", fallback="default")
+    # If the theme processes the whole list of comic data dicts at once, it replaces the hook for individual dicts
+    use_comic_data_dicts_hook = has_hook(theme, "extra_comic_data_dicts_processing")
+    comic_data_dicts = [
+        create_comic_data(comic_folder, comic_info, page_info, **get_ids(page_info_list, i),
+                          transcript_index=transcript_index, shared_post_text=shared_post_text,
+                          run_comic_dict_hook=not use_comic_data_dicts_hook)
         for i, page_info in enumerate(page_info_list)
     ]
-
-
-def resize(im: Image, size: str) -> Image:
-    image_width, image_height = im.size
-    if "," in size:
-        # Convert a string of the form "100, 36" into a 2-tuple of ints (100, 36)
-        w, h = size.strip().split(",")
-        w, h = w.strip(), h.strip()
-    elif size.endswith("%"):
-        # Convert a percentage (50%) into a new size (50, 18)
-        size = float(size.strip().strip("%"))
-        size = size / 100
-        w, h = image_width * size, image_height * size
-    elif size.endswith("h"):
-        # Scale to set height and adjust width to keep the same aspect ratio
-        h = int(size[:-1].strip())
-        w = image_width / image_height * h
-    elif size.endswith("w"):
-        # Scale to set width and adjust height to keep the same aspect ratio
-        w = int(size[:-1].strip())
-        h = image_height / image_width * w
-    else:
-        raise ValueError(
-            "Unknown resize value: {!r}\n"
-            "Use format like '100,200' (width,height), '50%' (percentage), '100h' (height), or '100w' (width)."
-            .format(size)
-        )
-    return im.resize((int(w), int(h)))
-
-
-def save_image(im, path):
-    try:
-        # If saving as JPEG, force-convert to RGB first
-        if path.lower().endswith("jpg") or path.lower().endswith("jpeg"):
-            if im.mode != 'RGB':
-                im = im.convert('RGB')
-        im.save(path)
-    except OSError as e:
-        if str(e) == "cannot write mode RGBA as JPEG":
-            # Get rid of transparency
-            bg = Image.new("RGB", im.size, "WHITE")
-            bg.paste(im, (0, 0), im)
-            bg.save(path)
-        else:
-            raise
-
-
-def create_comic_thumbnail(comic_info, comic_page_path):
-    section = "Image Reprocessing"
-    comic_page_dir = os.path.dirname(comic_page_path)
-    comic_page_name, comic_page_ext = os.path.splitext(os.path.basename(comic_page_path))
-    with open(comic_page_path, "rb") as f:
-        im = Image.open(f)
-        thumbnail_path = os.path.join(comic_page_dir, "_thumbnail.jpg")
-        if comic_info.getboolean(section, "Overwrite existing images") or not os.path.isfile(thumbnail_path):
-            print(f"Creating thumbnail for {comic_page_name}")
-            thumb_im = resize(im, comic_info.get(section, "Thumbnail size"))
-            save_image(thumb_im, thumbnail_path)
-
-
-def process_comic_images(comic_info: RawConfigParser, comic_data_dicts: List[Dict]):
-    if comic_info.getboolean("Image Reprocessing", "Create thumbnails"):
-        for comic_data in comic_data_dicts:
-            if not comic_data["comic_paths"]:
-                raise ValueError(
-                    f"No images found for page '{comic_data['page_name']}'. Either add an image for that page, or disable "
-                    f"the 'Create thumbnails' option in the [Image Reprocessing] section."
-                )
-            # We don't support multiple thumbnails per page, so pick the first image in the list
-            create_comic_thumbnail(comic_info, comic_data["comic_paths"][0])
+    if use_comic_data_dicts_hook:
+        hook_result = run_hook(theme, "extra_comic_data_dicts_processing",
+                               [comic_folder, comic_info, comic_data_dicts])
+        if hook_result is not None:
+            comic_data_dicts = hook_result
+    return comic_data_dicts
 
 
 def get_storylines(comic_info: RawConfigParser, comic_data_dicts: List[Dict]) -> OrderedDict:
@@ -635,7 +642,8 @@ def load_webring_data(comic_info: RawConfigParser, comic_url: str) -> dict[str,
     return jinja_variables
 
 
-def write_html_files(comic_folder: str, comic_info: RawConfigParser, comic_data_dicts: List[Dict], global_values: Dict):
+def write_html_files(comic_folder: str, comic_info: RawConfigParser, comic_data_dicts: List[Dict], global_values: Dict,
+                     build_manifest: Optional[BuildManifest] = None, page_index: Optional[PageIndex] = None):
     # Load Jinja environment
     template_folders = ["comic_git_engine/templates"]
     theme = comic_info.get("Comic Settings", "Theme", fallback="default")
@@ -646,17 +654,31 @@ def write_html_files(comic_folder: str, comic_info: RawConfigParser, comic_data_
     print(f"Template folders: {template_folders}")
     utils.build_jinja_environment(comic_info, template_folders)
     utils.build_markdown_parser(comic_info)
+    # In incremental builds, work out what the comic template depends on so unchanged pages can be skipped
+    page_template = get_page_template("comic", theme) if build_manifest is not None else None
     # Write individual comic pages
     print("Writing {} comic pages...".format(len(comic_data_dicts)))
+    pages_to_write = []
+    skipped_page_count = 0
     for comic_data_dict in comic_data_dicts:
         html_path = f"{comic_folder}comic/{comic_data_dict['page_name']}/index.html"
         # Use the custom social_media.json file defined for this particular comic, if one exists
         custom_social_media_path = os.path.join(comic_data_dict["page_dir"], "social_media.json")
+        if page_index is not None and not page_index.isfile(custom_social_media_path):
+            custom_social_media_path = None
         comic_data_dict.update(global_values)
         comic_data_dict["social_media"] = utils.get_social_media_data(
             comic_info, comic_data_dict, "comic", html_path, custom_social_media_path
         )
-        utils.write_to_template("comic", html_path, comic_data_dict)
+        if page_template is not None:
+            fingerprint = fingerprint_page(page_template, comic_data_dict)
+            if not should_write_page(build_manifest, html_path, fingerprint):
+                skipped_page_count += 1
+                continue
+        pages_to_write.append((html_path, comic_data_dict))
+    write_pages(comic_info, template_folders, "comic", pages_to_write, global_values)
+    if skipped_page_count:
+        print(f"Skipped {skipped_page_count} unchanged comic pages")
     write_other_pages(comic_folder, comic_info, comic_data_dicts, global_values)
     run_hook(global_values["theme"], "build_other_pages", [comic_folder, comic_info, comic_data_dicts])
 
@@ -737,8 +759,12 @@ def get_extra_comic_info(folder_name: str, comic_info: RawConfigParser):
     return comic_info
 
 
-def main(delete_scheduled_posts: bool = False, publish_all_comics: bool = False):
+def main(delete_scheduled_posts: bool = False, publish_all_comics: bool = False, incremental: bool = False,
+         workers: Optional[str] = None):
     checkpoint("Start", clear=True)
+    reset_hook_registry()
+    # Post dates are only parsed once per build, but a long-running process like the dev server runs many builds
+    utils.parse_post_date.cache_clear()
 
     # Pull values from the INPUTS and SECRETS env vars and turn them into individual env vars
     add_inputs_to_env_vars("INPUTS")
@@ -749,6 +775,10 @@ def main(delete_scheduled_posts: bool = False, publish_all_comics: bool = False)
     comic_info = read_info("your_content/comic_info.ini")
     comic_url, utils.BASE_DIRECTORY = utils.get_comic_url(comic_info)
     theme = comic_info.get("Comic Settings", "Theme", fallback="default")
+    if incremental:
+        comic_info.set("Comic Settings", "Incremental build", "True")
+    if workers:
+        comic_info.set("Comic Settings", "Build workers", workers)
 
     checkpoint("Get comic settings")
 
@@ -756,8 +786,13 @@ def main(delete_scheduled_posts: bool = False, publish_all_comics: bool = False)
 
     checkpoint("Preprocessing hook")
 
-    # Set up the output file space
-    setup_output_file_space(comic_info)
+    load_markdown_cache(comic_info)
+    checkpoint("Load Markdown cache")
+
+    # Set up the output file space. Incremental builds keep the comic pages from the last build, unless there's no
+    # record of what the last build wrote.
+    build_manifest = load_build_manifest(comic_info) if is_incremental_build_enabled(comic_info) else None
+    setup_output_file_space(comic_info, keep_comic_pages=has_previous_build(build_manifest))
     checkpoint("Setup output file space")
 
     # Build any extra comics that may be needed
@@ -769,7 +804,7 @@ def main(delete_scheduled_posts: bool = False, publish_all_comics: bool = False)
         os.makedirs(extra_comic, exist_ok=True)
         comic_data_dicts, extra_global_values = build_and_publish_comic_pages(
             comic_url, extra_comic.strip("/") + "/", extra_comic_info, delete_scheduled_posts,
-            publish_all_comics
+            publish_all_comics, build_manifest=build_manifest
         )
         comic_results.append(
             ComicBuildResult(
@@ -784,7 +819,7 @@ def main(delete_scheduled_posts: bool = False, publish_all_comics: bool = False)
     # Build and publish pages for the main comic
     print("Main comic")
     comic_data_dicts, global_values = build_and_publish_comic_pages(
-        comic_url, "", comic_info, delete_scheduled_posts, publish_all_comics, extra_comic_values
+        comic_url, "", comic_info, delete_scheduled_posts, publish_all_comics, extra_comic_values, build_manifest
     )
     main_comic_result = ComicBuildResult(
         comic_folder="",
@@ -794,16 +829,27 @@ def main(delete_scheduled_posts: bool = False, publish_all_comics: bool = False)
     )
     comic_results.append(main_comic_result)
 
-    # Build the RSS feed
-    for feed_job in get_rss_feed_jobs(comic_results):
-        build_rss_feed_from_job(feed_job)
-    checkpoint("Build RSS feed")
+    if build_manifest is not None:
+        remove_stale_pages(build_manifest)
+        save_build_manifest(build_manifest)
+        checkpoint("Save build manifest")
+
+    # Build the RSS feeds
+    feed_item_cache = load_feed_item_cache(comic_info)
+    feed_jobs = get_rss_feed_jobs(comic_results)
+    build_rss_feeds(feed_jobs, get_worker_count(comic_info), feed_item_cache)
+    remove_stale_feeds(feed_jobs, get_preserved_feed_paths(comic_info))
+    save_feed_item_cache(feed_item_cache)
+    checkpoint("Save feed item cache")
+
+    save_markdown_cache()
+    checkpoint("Save Markdown cache")
 
     output_dir = os.getenv("OUTPUT_DIR", "")
     if output_dir:
-        shutil.copytree("comic_git_engine/css", os.path.join(output_dir, "comic_git_engine/css"))
-        shutil.copytree("comic_git_engine/js", os.path.join(output_dir, "comic_git_engine/js"))
-        shutil.copytree("your_content", os.path.join(output_dir, "your_content"))
+        shutil.copytree("comic_git_engine/css", os.path.join(output_dir, "comic_git_engine/css"), dirs_exist_ok=True)
+        shutil.copytree("comic_git_engine/js", os.path.join(output_dir, "comic_git_engine/js"), dirs_exist_ok=True)
+        shutil.copytree("your_content", os.path.join(output_dir, "your_content"), dirs_exist_ok=True)
         shutil.copy("favicon.ico", output_dir)
         checkpoint("Copy extra files to output directory")
 
@@ -812,6 +858,7 @@ def main(delete_scheduled_posts: bool = False, publish_all_comics: bool = False)
     checkpoint("Postprocessing hook")
 
     print_processing_times()
+    print_hook_stats()
 
 
 def parse_args():
@@ -829,13 +876,26 @@ def parse_args():
         action="store_true",
         help="Will publish all comics, even ones with a publish date set in the future."
     )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="Only rewrites comic pages that have changed since the last incremental build. Same as setting "
+             "'Incremental build = True' in the [Comic Settings] section of your comic_info.ini file."
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="Number of worker processes to spread the build across, or 'auto' to use one per CPU core. Overrides "
+             "the 'Build workers' option in the [Comic Settings] section of your comic_info.ini file."
+    )
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
     try:
-        main(args.delete_scheduled_posts, args.publish_all_comics)
+        main(args.delete_scheduled_posts, args.publish_all_comics, args.incremental, args.workers)
     except Exception as e:
         # If the repo is not running in GitHub, raise the error normally
         if not os.getenv("GITHUB_REPOSITORY"):
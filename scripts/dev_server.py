@@ -7,11 +7,13 @@ import os
 import sys
 import threading
 import traceback
+from http import HTTPStatus
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 from typing import Any
 
 import build_site
 import utils
+from rss import read_feed_headers
 
 try:
     from watchdog.observers import Observer
@@ -64,6 +66,28 @@ class WatchdogEventHandler(FileSystemEventHandler):
                 SKIP_REBUILD = False
 
 
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Serves the ETag that the RSS feed builder saves next to each feed, and answers requests for a feed the browser or
+    feed reader already has with 304 Not Modified. Last-Modified already comes from the file's modification time.
+    """
+    etag = None
+
+    def send_head(self):
+        feed_headers = read_feed_headers(self.translate_path(self.path))
+        self.etag = feed_headers.get("ETag") if feed_headers else None
+        if self.etag and self.etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.end_headers()
+            return None
+        return super().send_head()
+
+    def end_headers(self):
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        super().end_headers()
+
+
 def watch_and_rebuild(build_args: list[Any]) -> Observer:
     observer = Observer()
     event_handler = WatchdogEventHandler(observer, build_args)
@@ -83,7 +107,7 @@ def start_observer(observer: Observer):
 def start_http_server(subdirectory: str):
     os.chdir(HTTP_ROOT)
     server_address = ('', 8000)
-    httpd = HTTPServer(server_address, SimpleHTTPRequestHandler)
+    httpd = HTTPServer(server_address, DevRequestHandler)
     url = f"http://localhost:{server_address[1]}{subdirectory}"
     print(f"Starting web server.\nGo to {url} in your browser to view your site.\nUse Ctrl+C to stop the server.\n")
     httpd.serve_forever()
@@ -0,0 +1,98 @@
+"""
+A persistent cache of normalized RSS feed items.
+
+Most of the time spent putting a feed item together goes into joining its URLs and parsing its post date. When
+`Use build cache` is turned on in the [Comic Settings] section, those parts of every item in every feed are saved in
+the build cache, keyed on the page fields and feed settings they're made from. On the next build, only new or changed
+pages are normalized again, and the rest of each feed is put together from the saved items. Items are saved under their
+comic page's path, since the main feed can have pages with the same name from several comics.
+
+Feeds can be built in worker processes, so each feed job carries its own CachedFeedItems from the last build, and the
+items it used come back with the job's result to be saved.
+"""
+from configparser import RawConfigParser
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from build_cache import get_cache_path, is_build_cache_enabled, load_json_cache, save_json_cache
+
+FEED_ITEM_CACHE_FILENAME = "feed_items.json"
+FEED_ITEM_CACHE_VERSION = 2
+
+
+@dataclass(slots=True)
+class CachedFeedItems:
+    # Hash of the feed settings that the cached items were made with
+    settings_key: str = ""
+    # Cached items for a single feed from the last build, keyed on the item's comic page path, e.g. "comic/Page 1"
+    entries: dict[str, dict[str, Any]] = field(default_factory=dict)
+    # The items used in this build, which are the only ones that get saved
+    used_entries: dict[str, dict[str, Any]] = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+
+    def set_settings_key(self, settings_key: str) -> None:
+        """
+        Drops every cached item if the feed settings have changed since the last build.
+        """
+        if settings_key != self.settings_key:
+            self.settings_key = settings_key
+            self.entries = {}
+
+    def get_item(self, item_id: str, key: list[Any], normalize_item: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+        """
+        :return: The cached item for the page if its key hasn't changed, otherwise the result of normalize_item().
+        """
+        entry = self.entries.get(item_id)
+        if entry is None or entry["key"] != key:
+            self.misses += 1
+            entry = {"key": key, "item": normalize_item()}
+        else:
+            self.hits += 1
+        self.used_entries[item_id] = entry
+        return entry["item"]
+
+
+@dataclass(slots=True)
+class FeedItemCache:
+    path: str
+    # Cached items by feed relative path, as {"settings_key": ..., "items": {item page path: entry}}
+    feeds: dict[str, dict[str, Any]]
+    # The feeds built in this build, in the same format
+    used_feeds: dict[str, dict[str, Any]] = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+
+    def get_cached_items(self, feed_relative_path: str) -> CachedFeedItems:
+        feed = self.feeds.get(feed_relative_path, {})
+        return CachedFeedItems(feed.get("settings_key", ""), feed.get("items", {}))
+
+    def update(self, feed_relative_path: str, cached_items: CachedFeedItems) -> None:
+        self.used_feeds[feed_relative_path] = {
+            "settings_key": cached_items.settings_key,
+            "items": cached_items.used_entries,
+        }
+        self.hits += cached_items.hits
+        self.misses += cached_items.misses
+
+
+def load_feed_item_cache(comic_info: RawConfigParser) -> FeedItemCache | None:
+    """
+    :return: The feed item cache, or None if the build cache is turned off.
+    """
+    if not is_build_cache_enabled(comic_info):
+        return None
+    path = get_cache_path(comic_info, FEED_ITEM_CACHE_FILENAME)
+    data = load_json_cache(path)
+    feeds = data.get("feeds", {}) if data.get("version") == FEED_ITEM_CACHE_VERSION else {}
+    return FeedItemCache(path, feeds)
+
+
+def save_feed_item_cache(feed_item_cache: FeedItemCache | None) -> None:
+    """
+    Saves the items of every feed built in this build. Feeds and pages that weren't part of this build are dropped.
+    """
+    if feed_item_cache is None:
+        return
+    save_json_cache(feed_item_cache.path, {"version": FEED_ITEM_CACHE_VERSION, "feeds": feed_item_cache.used_feeds})
+    print(f"Feed item cache: {feed_item_cache.hits} hits, {feed_item_cache.misses} misses")
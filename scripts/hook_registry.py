@@ -0,0 +1,82 @@
+"""
+Finds and calls the code hooks in a theme's `scripts/hooks.py` file.
+
+The hooks module for each theme is only looked up and imported once per build, and each hook function is only looked
+up once, including hooks the theme doesn't define. Every call to a hook is counted and timed, so print_hook_stats()
+can show which of the theme's hooks are slowing down the build.
+"""
+import os
+import sys
+from dataclasses import dataclass
+from importlib import import_module
+from time import perf_counter_ns
+from types import ModuleType
+from typing import Any, Callable
+
+
+@dataclass(slots=True)
+class HookStats:
+    calls: int = 0
+    ns: int = 0
+
+
+# Hooks modules by theme name, or None if the theme has no hooks.py file
+hook_modules: dict[str, ModuleType | None] = {}
+# Hook functions by (theme name, function name), or None if the theme doesn't define that hook
+hook_functions: dict[tuple[str, str], Callable | None] = {}
+hook_stats: dict[tuple[str, str], HookStats] = {}
+
+
+def reset_hook_registry() -> None:
+    """
+    Forgets every hooks module and function looked up so far, so the next build looks them up again.
+    """
+    hook_modules.clear()
+    hook_functions.clear()
+    hook_stats.clear()
+
+
+def get_hooks_module(theme: str) -> ModuleType | None:
+    if theme not in hook_modules:
+        hooks = None
+        if os.path.exists(f"your_content/themes/{theme}/scripts/hooks.py"):
+            current_path = os.path.abspath(".")
+            if current_path not in sys.path:
+                sys.path.append(current_path)
+                print(f"Path updated: {sys.path}")
+            hooks = import_module(f"your_content.themes.{theme}.scripts.hooks")
+        hook_modules[theme] = hooks
+    return hook_modules[theme]
+
+
+def get_hook(theme: str, func: str) -> Callable | None:
+    """
+    :return: The hook function with the given name from the theme's hooks.py file, or None if there isn't one.
+    """
+    key = (theme, func)
+    if key not in hook_functions:
+        hooks = get_hooks_module(theme)
+        hook_functions[key] = getattr(hooks, func, None) if hooks is not None else None
+    return hook_functions[key]
+
+
+def call_hook(theme: str, func: str, args: list[Any]) -> Any:
+    method = get_hook(theme, func)
+    if method is None:
+        return None
+    stats = hook_stats.setdefault((theme, func), HookStats())
+    start_time = perf_counter_ns()
+    try:
+        return method(*args)
+    finally:
+        stats.calls += 1
+        stats.ns += perf_counter_ns() - start_time
+
+
+def print_hook_stats() -> None:
+    if not hook_stats:
+        return
+    print("Theme hooks:")
+    for (theme, func), stats in sorted(hook_stats.items(), key=lambda item: item[1].ns, reverse=True):
+        total_ms = stats.ns / 1_000_000
+        print(f"  {theme}.{func}: {stats.calls} calls, {total_ms:.2f} ms ({total_ms / stats.calls:.3f} ms per call)")
@@ -0,0 +1,269 @@
+"""
+Comic image processing, i.e. creating thumbnails from the comic pages.
+"""
+import os
+from configparser import RawConfigParser
+from dataclasses import dataclass
+from functools import partial
+from time import perf_counter_ns
+
+from PIL import Image
+
+from build_cache import get_cache_path, hash_file, hash_json, load_json_cache, save_json_cache
+from page_index import PageIndex
+from workers import get_worker_count, run_in_process_pool
+
+THUMBNAIL_CACHE_FILENAME = "thumbnails.json"
+
+
+# Resampling filters that can be picked with the "Thumbnail resampling" option
+RESAMPLING_FILTERS = {
+    "nearest": Image.Resampling.NEAREST,
+    "box": Image.Resampling.BOX,
+    "bilinear": Image.Resampling.BILINEAR,
+    "hamming": Image.Resampling.HAMMING,
+    "bicubic": Image.Resampling.BICUBIC,
+    "lanczos": Image.Resampling.LANCZOS,
+}
+# How much bigger than the thumbnail an image is allowed to stay before it gets shrunk with a cheap integer reduction
+# first. 3.0 is the value Pillow recommends as being indistinguishable from a full resample.
+FAST_THUMBNAIL_REDUCING_GAP = 3.0
+
+
+def get_resize_dimensions(image_size: tuple[int, int], size: str) -> tuple[int, int]:
+    image_width, image_height = image_size
+    if "," in size:
+        # Convert a string of the form "100, 36" into a 2-tuple of ints (100, 36)
+        w, h = size.strip().split(",")
+        w, h = w.strip(), h.strip()
+    elif size.endswith("%"):
+        # Convert a percentage (50%) into a new size (50, 18)
+        size = float(size.strip().strip("%"))
+        size = size / 100
+        w, h = image_width * size, image_height * size
+    elif size.endswith("h"):
+        # Scale to set height and adjust width to keep the same aspect ratio
+        h = int(size[:-1].strip())
+        w = image_width / image_height * h
+    elif size.endswith("w"):
+        # Scale to set width and adjust height to keep the same aspect ratio
+        w = int(size[:-1].strip())
+        h = image_height / image_width * w
+    else:
+        raise ValueError(
+            "Unknown resize value: {!r}\n"
+            "Use format like '100,200' (width,height), '50%' (percentage), '100h' (height), or '100w' (width)."
+            .format(size)
+        )
+    return int(w), int(h)
+
+
+def resize(im: Image, size: str, resample: Image.Resampling | None = None) -> Image:
+    dimensions = get_resize_dimensions(im.size, size)
+    if resample is None:
+        return im.resize(dimensions)
+    return im.resize(dimensions, resample)
+
+
+def get_resampling_filter(comic_info: RawConfigParser) -> Image.Resampling | None:
+    """
+    Reads the `Thumbnail resampling` option from the [Image Reprocessing] section. If it's not set, None is returned
+    and Pillow's default filter for the image mode is used.
+    """
+    value = comic_info.get("Image Reprocessing", "Thumbnail resampling", fallback="").strip().lower()
+    if not value:
+        return None
+    if value not in RESAMPLING_FILTERS:
+        raise ValueError(
+            f"Invalid 'Thumbnail resampling' value in [Image Reprocessing]: {value!r}\n"
+            f"Use one of: {', '.join(RESAMPLING_FILTERS)}"
+        )
+    return RESAMPLING_FILTERS[value]
+
+
+def is_fast_thumbnails_enabled(comic_info: RawConfigParser) -> bool:
+    return comic_info.getboolean("Image Reprocessing", "Fast thumbnails", fallback=False)
+
+
+def fast_resize(im: Image, size: str, resample: Image.Resampling | None = None) -> Image:
+    """
+    Resizes a freshly opened image without decoding more of it than needed. JPEGs are decoded straight to a reduced
+    scale with draft mode, and anything that's still much bigger than the thumbnail is shrunk with a cheap integer
+    reduction before the final resample.
+    """
+    # Work out the final size before draft() changes the size of the image
+    dimensions = get_resize_dimensions(im.size, size)
+    if im.format == "JPEG":
+        im.draft("RGB" if im.mode not in ("L", "RGB") else im.mode, dimensions)
+    return im.resize(dimensions, resample, reducing_gap=FAST_THUMBNAIL_REDUCING_GAP)
+
+
+def save_image(im, path):
+    try:
+        # If saving as JPEG, force-convert to RGB first
+        if path.lower().endswith("jpg") or path.lower().endswith("jpeg"):
+            if im.mode != 'RGB':
+                im = im.convert('RGB')
+        im.save(path)
+    except OSError as e:
+        if str(e) == "cannot write mode RGBA as JPEG":
+            # Get rid of transparency
+            bg = Image.new("RGB", im.size, "WHITE")
+            bg.paste(im, (0, 0), im)
+            bg.save(path)
+        else:
+            raise
+
+
+def get_thumbnail_path(comic_page_path: str) -> str:
+    return os.path.join(os.path.dirname(comic_page_path), "_thumbnail.jpg")
+
+
+def create_comic_thumbnail(comic_info: RawConfigParser, comic_page_path: str,
+                           thumbnail_exists: bool | None = None, force: bool = False) -> bool:
+    """
+    Creates the _thumbnail.jpg file next to the given comic page, unless it already exists and the "Overwrite existing
+    images" option is turned off.
+    :param thumbnail_exists: Whether the thumbnail file already exists, if that's already known.
+    :param force: Create the thumbnail even if it exists and "Overwrite existing images" is off, e.g. because it's known
+    to be out of date.
+    :return: Whether a new thumbnail was written.
+    """
+    section = "Image Reprocessing"
+    comic_page_name, comic_page_ext = os.path.splitext(os.path.basename(comic_page_path))
+    with open(comic_page_path, "rb") as f:
+        im = Image.open(f)
+        thumbnail_path = get_thumbnail_path(comic_page_path)
+        if thumbnail_exists is None:
+            thumbnail_exists = os.path.isfile(thumbnail_path)
+        if force or comic_info.getboolean(section, "Overwrite existing images") or not thumbnail_exists:
+            print(f"Creating thumbnail for {comic_page_name}")
+            resize_func = fast_resize if is_fast_thumbnails_enabled(comic_info) else resize
+            thumb_im = resize_func(im, comic_info.get(section, "Thumbnail size"), get_resampling_filter(comic_info))
+            save_image(thumb_im, thumbnail_path)
+            return True
+    return False
+
+
+@dataclass(slots=True)
+class ThumbnailJob:
+    comic_page_path: str
+    use_cache: bool = False
+    # The cache key the existing thumbnail was created with, if it's in the thumbnail cache
+    cached_key: str | None = None
+    # Whether the thumbnail file already exists, or None if that has to be checked on disk
+    thumbnail_exists: bool | None = None
+
+
+@dataclass(slots=True)
+class ThumbnailResult:
+    comic_page_path: str
+    created: bool
+    ms: float
+    # The cache key that matches the thumbnail on disk, or None if the cache entry shouldn't be updated
+    cache_key: str | None = None
+
+
+def is_thumbnail_cache_enabled(comic_info: RawConfigParser) -> bool:
+    return comic_info.getboolean("Image Reprocessing", "Cache thumbnails", fallback=False)
+
+
+def get_thumbnail_cache_key(comic_info: RawConfigParser, comic_page_path: str) -> str:
+    """
+    Thumbnails only need to be recreated when the source image's contents or the settings used to create the thumbnail
+    change, so those are what the cache is keyed on.
+    """
+    section = "Image Reprocessing"
+    return hash_json([
+        hash_file(comic_page_path),
+        comic_info.get(section, "Thumbnail size"),
+        comic_info.get(section, "Thumbnail resampling", fallback=""),
+        is_fast_thumbnails_enabled(comic_info),
+    ])
+
+
+def is_thumbnail_newer(comic_page_path: str) -> bool:
+    """
+    :return: Whether the comic page's thumbnail was modified at the same time or after its image.
+    """
+    try:
+        return os.stat(get_thumbnail_path(comic_page_path)).st_mtime_ns >= os.stat(comic_page_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def run_thumbnail_job(comic_info: RawConfigParser, job: ThumbnailJob) -> ThumbnailResult:
+    start_time = perf_counter_ns()
+    cache_key = get_thumbnail_cache_key(comic_info, job.comic_page_path) if job.use_cache else None
+    thumbnail_exists = job.thumbnail_exists
+    if thumbnail_exists is None:
+        thumbnail_exists = os.path.isfile(get_thumbnail_path(job.comic_page_path))
+    if cache_key is not None and cache_key == job.cached_key and thumbnail_exists:
+        # The existing thumbnail was made from this exact image with these exact settings
+        created = False
+    else:
+        # A thumbnail in the cache was made by an earlier build, so if its key has changed, it's out of date and gets
+        # replaced even when "Overwrite existing images" is off. Thumbnails that aren't in the cache could have been
+        # made by hand, so they're left to the usual overwrite rules.
+        is_stale = cache_key is not None and job.cached_key is not None and cache_key != job.cached_key
+        created = create_comic_thumbnail(comic_info, job.comic_page_path, thumbnail_exists, force=is_stale)
+        if not created and not (job.cached_key is None and is_thumbnail_newer(job.comic_page_path)):
+            # The thumbnail was left alone, so we don't know whether it matches the current image. A thumbnail that's
+            # not in the cache yet but is newer than its image was made from it, though, so it's added to the cache,
+            # and gets recreated once the image changes.
+            cache_key = None
+    return ThumbnailResult(job.comic_page_path, created, (perf_counter_ns() - start_time) / 1_000_000, cache_key)
+
+
+def process_comic_images(comic_info: RawConfigParser, comic_data_dicts: list[dict],
+                         page_index: PageIndex | None = None):
+    if not comic_info.getboolean("Image Reprocessing", "Create thumbnails"):
+        return
+    use_cache = is_thumbnail_cache_enabled(comic_info)
+    cache_path = get_cache_path(comic_info, THUMBNAIL_CACHE_FILENAME)
+    thumbnail_cache = load_json_cache(cache_path) if use_cache else {}
+    jobs = []
+    for comic_data in comic_data_dicts:
+        if not comic_data["comic_paths"]:
+            raise ValueError(
+                f"No images found for page '{comic_data['page_name']}'. Either add an image for that page, or disable "
+                f"the 'Create thumbnails' option in the [Image Reprocessing] section."
+            )
+        # We don't support multiple thumbnails per page, so pick the first image in the list
+        comic_page_path = comic_data["comic_paths"][0]
+        thumbnail_path = get_thumbnail_path(comic_page_path)
+        thumbnail_exists = page_index.isfile(thumbnail_path) if page_index is not None else None
+        jobs.append(ThumbnailJob(comic_page_path, use_cache, thumbnail_cache.get(thumbnail_path), thumbnail_exists))
+    worker_count = min(get_worker_count(comic_info), len(jobs))
+    if worker_count <= 1:
+        results = [run_thumbnail_job(comic_info, job) for job in jobs]
+    else:
+        print(f"Creating thumbnails for {len(jobs)} pages with {worker_count} worker processes")
+        results = run_in_process_pool(partial(run_thumbnail_job, comic_info), jobs, worker_count)
+    report_thumbnail_times(results)
+    if use_cache:
+        # Only the thumbnails of this build's pages are kept, along with the ones for other comic folders
+        comics_dirs = {os.path.dirname(os.path.dirname(os.path.normpath(job.comic_page_path))) for job in jobs}
+        if page_index is not None:
+            comics_dirs.add(os.path.normpath(page_index.comics_dir))
+        thumbnail_cache = {
+            thumbnail_path: cache_key for thumbnail_path, cache_key in thumbnail_cache.items()
+            if os.path.dirname(os.path.dirname(os.path.normpath(thumbnail_path))) not in comics_dirs
+        }
+        for result in results:
+            if result.cache_key is not None:
+                thumbnail_cache[get_thumbnail_path(result.comic_page_path)] = result.cache_key
+        save_json_cache(cache_path, thumbnail_cache)
+
+
+def report_thumbnail_times(results: list[ThumbnailResult]) -> None:
+    created_results = [result for result in results if result.created]
+    for result in created_results:
+        print(f"Thumbnail for {result.comic_page_path}: {result.ms:.2f} ms")
+    if created_results:
+        total_ms = sum(result.ms for result in created_results)
+        print(f"Created {len(created_results)} thumbnails in {total_ms:.2f} ms of processing time "
+              f"({total_ms / len(created_results):.2f} ms per thumbnail)")
+    skipped_count = len(results) - len(created_results)
+    if skipped_count:
+        print(f"Kept {skipped_count} existing thumbnails")
@@ -1,25 +1,333 @@
 """
-A script for generating a LOT of comic folders and their info.json,
-intended for load testing the archive and tagged pages
-"""
+A benchmark harness for the whole build. It generates a synthetic comic with as many pages as you like in a temporary
+folder, runs build_site.main() against it, and reports how long each phase of the build took (from utils.checkpoint())
+and how much memory the build used, as JSON so runs can be saved and compared over time.
+
+Run from the comic_git_engine folder, e.g.:
 
+    python scripts/load_test.py --pages 10000 --transcript-languages English,French --output before.json
+    python scripts/load_test.py --pages 10000 --builds 2 --set "Comic Settings" "Use build cache" True
+
+Builds after the first one rebuild the same folder in the same process, so they show how a warm rebuild performs.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import tracemalloc
 from datetime import datetime, timedelta
-from os import makedirs
-from shutil import copyfile
-
-for i in range(1, 101):
-    folder_name = f"Page {i}"
-    post_date = (datetime(2019, 1, 1) + timedelta(i - 1)).strftime("%B %d, %Y")
-    chapter_num = int((i - 1) / 20) + 1
-    makedirs("../../your_content/comics/" + folder_name)
-
-    text = f"""
-Title = Page {i}
-Post date = {post_date}
-Filename = Page_197.png
-Alt text = 
-Storyline = Chapter {chapter_num}
+from typing import Any
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import build_site  # noqa: E402
+import utils  # noqa: E402
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+ENGINE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The last page is posted on this date, so no pages are scheduled for the future
+LAST_POST_DATE = datetime(2020, 1, 1)
+DATE_FORMAT = "%B %d, %Y"
+
+COMIC_INFO = """[Comic Info]
+Comic name = Load Test Comic
+Author = Load Tester
+Description = A comic generated by load_test.py
+
+[Comic Settings]
+Comic domain = example.com
+Comic subdirectory =
+Date format = %B %d, %Y
+Timezone = UTC
+Theme = default
+Extra comics = {extra_comics}
+
+[Archive]
+Date format = %B %d, %Y
+Use thumbnails = True
+Show Uncategorized comics = True
+
+[Image Reprocessing]
+Create thumbnails = True
+Overwrite existing images = False
+Thumbnail size = 200w
+
+[Transcripts]
+Enable transcripts = {enable_transcripts}
+Default language = {default_language}
+
+[RSS Feed]
+Build RSS feed = True
+
+[Pages]
+archive = Archive
+index =
+404 = Page not found
+latest =
+tagged =
+infinite_scroll = Infinite Scroll
+
+[Links Bar]
+Archive = /archive/
+"""
+
+EXTRA_COMIC_INFO = """[Comic Info]
+Comic name = Extra Comic {number}
 """
-    with open("../../your_content/comics/" + folder_name + "/info.ini", 'w') as f:
-        f.write(text)
-    copyfile("Page_197.png", "../../your_content/comics/" + folder_name + "/Page_197.png")
+
+
+def make_sample_image(directory: str, size: tuple[int, int]) -> str:
+    """
+    Creates a comic page image with a gradient in it, which compresses well so thousands of copies don't fill the disk.
+    """
+    path = os.path.join(directory, f"sample_{size[0]}x{size[1]}.png")
+    if not os.path.isfile(path):
+        gradient = Image.linear_gradient("L").resize(size)
+        Image.merge("RGB", (gradient, gradient.transpose(Image.Transpose.ROTATE_90).resize(size), gradient)).save(path)
+    return path
+
+
+def pick_names(rng: random.Random, prefix: str, total: int, count: int) -> str:
+    if not total or not count:
+        return ""
+    return ", ".join(f"{prefix} {n}" for n in sorted(rng.sample(range(1, total + 1), min(count, total))))
+
+
+def generate_pages(comics_dir: str, page_count: int, args: argparse.Namespace, rng: random.Random) -> None:
+    image_paths = [make_sample_image(os.path.dirname(comics_dir), size) for size in args.image_sizes]
+    for i in range(1, page_count + 1):
+        page_dir = os.path.join(comics_dir, f"Page {i}")
+        os.makedirs(page_dir)
+        post_date = (LAST_POST_DATE - timedelta(page_count - i)).strftime(DATE_FORMAT)
+        storyline = f"Chapter {(i - 1) * args.storylines // page_count + 1}" if args.storylines else ""
+        filenames = []
+        for n in range(1, args.images_per_page + 1):
+            image_path = image_paths[(i + n) % len(image_paths)]
+            filenames.append(f"page{i}_{n}.png")
+            shutil.copyfile(image_path, os.path.join(page_dir, filenames[-1]))
+        with open(os.path.join(page_dir, "info.ini"), "w") as f:
+            f.write(
+                f"Title = Page {i}\n"
+                f"Post date = {post_date}\n"
+                f"Filenames = {', '.join(filenames)}\n"
+                f"Alt text = Alt text for page {i}\n"
+                f"Storyline = {storyline}\n"
+                f"Characters = {pick_names(rng, 'Character', args.characters, args.characters_per_page)}\n"
+                f"Tags = {pick_names(rng, 'Tag', args.tags, args.tags_per_page)}\n"
+            )
+        with open(os.path.join(page_dir, "post.txt"), "w") as f:
+            f.write(f"This is the post for **page {i}**.\n\nIt has [a link](https://example.com/{i}/) in it.\n")
+        for language in args.transcript_languages:
+            with open(os.path.join(page_dir, f"{language}.md"), "w") as f:
+                f.write(f"**{language}:** The transcript for *page {i}*.\n")
+
+
+def generate_comic(root: str, args: argparse.Namespace) -> None:
+    """
+    Writes a host comic_git repo with a generated comic in it to the given folder.
+    """
+    rng = random.Random(args.seed)
+    extra_comics = [f"extra_{n}" for n in range(1, args.extra_comics + 1)]
+    os.makedirs(os.path.join(root, "your_content", "images"))
+    comic_info = COMIC_INFO.format(
+        extra_comics=", ".join(extra_comics),
+        enable_transcripts=bool(args.transcript_languages),
+        default_language=args.transcript_languages[0] if args.transcript_languages else "English",
+    )
+    with open(os.path.join(root, "your_content", "comic_info.ini"), "w") as f:
+        f.write(comic_info)
+    if args.settings:
+        update_comic_info(os.path.join(root, "your_content", "comic_info.ini"), args.settings)
+    open(os.path.join(root, "favicon.ico"), "wb").close()
+    generate_pages(os.path.join(root, "your_content", "comics"), args.pages, args, rng)
+    for n, extra_comic in enumerate(extra_comics, start=1):
+        os.makedirs(os.path.join(root, "your_content", extra_comic))
+        with open(os.path.join(root, "your_content", extra_comic, "comic_info.ini"), "w") as f:
+            f.write(EXTRA_COMIC_INFO.format(number=n))
+        generate_pages(os.path.join(root, "your_content", extra_comic, "comics"), args.extra_pages, args, rng)
+    link_engine(root)
+
+
+def update_comic_info(path: str, settings: list[list[str]]) -> None:
+    comic_info = utils.read_info(path)
+    for section, option, value in settings:
+        if not comic_info.has_section(section):
+            comic_info.add_section(section)
+        comic_info.set(section, option, value)
+    with open(path, "w") as f:
+        comic_info.write(f)
+
+
+def link_engine(root: str) -> None:
+    """
+    Makes this engine available as the host repo's comic_git_engine folder.
+    """
+    engine_path = os.path.join(root, "comic_git_engine")
+    try:
+        os.symlink(ENGINE_DIRECTORY, engine_path, target_is_directory=True)
+    except OSError:
+        # Creating symlinks needs extra permissions on Windows
+        shutil.copytree(ENGINE_DIRECTORY, engine_path, ignore=shutil.ignore_patterns(".git", "__pycache__"))
+
+
+def get_max_rss_mb() -> float | None:
+    """
+    :return: The peak resident memory of this process and any worker processes it has waited for, in MB.
+    """
+    if resource is None:
+        return None
+    max_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+    return max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def get_phase_times() -> list[dict[str, Any]]:
+    phases = []
+    for name, ms, parts in utils.get_processing_times():
+        phase = {"name": name, "ms": round(ms, 3)}
+        if parts:
+            phase["parts"] = [{"name": part_name, "ms": round(part_ms, 3)} for part_name, part_ms in parts]
+        phases.append(phase)
+    return phases
+
+
+def run_build(root: str, args: argparse.Namespace) -> dict[str, Any]:
+    old_cwd = os.getcwd()
+    os.chdir(root)
+    if args.trace_memory:
+        tracemalloc.start()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+            build_site.main(incremental=args.incremental, workers=args.workers)
+        result = {
+            "total_ms": round((utils.PROCESSING_TIMES[-1][1] - utils.PROCESSING_TIMES[0][1]) / 1_000_000, 3),
+            "phases": get_phase_times(),
+            "max_rss_mb": get_max_rss_mb(),
+        }
+        if args.trace_memory:
+            result["peak_traced_memory_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        return result
+    finally:
+        if args.trace_memory:
+            tracemalloc.stop()
+        os.chdir(old_cwd)
+
+
+def get_engine_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ENGINE_DIRECTORY, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_load_test(args: argparse.Namespace) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="comic_git_load_test_") as temp_dir:
+        root = args.directory or temp_dir
+        if os.path.exists(os.path.join(root, "your_content")):
+            raise ValueError(
+                f"{root} already has a your_content folder in it\n"
+                f"Use an empty folder for the generated comic."
+            )
+        generate_comic(root, args)
+        builds = [run_build(root, args) for _ in range(args.builds)]
+    return {
+        "engine_commit": get_engine_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "options": {
+            "pages": args.pages,
+            "storylines": args.storylines,
+            "tags": args.tags,
+            "tags_per_page": args.tags_per_page,
+            "characters": args.characters,
+            "characters_per_page": args.characters_per_page,
+            "transcript_languages": args.transcript_languages,
+            "image_sizes": [f"{width}x{height}" for width, height in args.image_sizes],
+            "images_per_page": args.images_per_page,
+            "extra_comics": args.extra_comics,
+            "extra_pages": args.extra_pages,
+            "workers": args.workers,
+            "incremental": args.incremental,
+            "settings": args.settings,
+        },
+        "builds": builds,
+    }
+
+
+def parse_image_size(value: str) -> tuple[int, int]:
+    try:
+        width, height = (int(n) for n in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Image sizes look like 800x1200, not {value!r}")
+    return width, height
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a large comic and time how long it takes to build.")
+    parser.add_argument("--pages", type=int, default=100, help="Number of pages in the main comic.")
+    parser.add_argument("--storylines", type=int, default=5, help="Number of storylines the pages are split into.")
+    parser.add_argument("--tags", type=int, default=20, help="Number of different tags.")
+    parser.add_argument("--tags-per-page", type=int, default=3, help="Number of tags on each page.")
+    parser.add_argument("--characters", type=int, default=10, help="Number of different characters.")
+    parser.add_argument("--characters-per-page", type=int, default=2, help="Number of characters on each page.")
+    parser.add_argument(
+        "--transcript-languages", type=lambda value: utils.str_to_list(value), default=[],
+        help="Comma-separated transcript languages to write for every page, e.g. 'English,French'.",
+    )
+    parser.add_argument(
+        "--image-sizes", type=lambda value: [parse_image_size(v) for v in utils.str_to_list(value)],
+        default=[(800, 1200)], help="Comma-separated sizes of the page images, e.g. '800x1200,1600x2400'.",
+    )
+    parser.add_argument("--images-per-page", type=int, default=1, help="Number of images on each page.")
+    parser.add_argument("--extra-comics", type=int, default=0, help="Number of extra comics.")
+    parser.add_argument("--extra-pages", type=int, default=10, help="Number of pages in each extra comic.")
+    parser.add_argument(
+        "--set", dest="settings", nargs=3, action="append", default=[], metavar=("SECTION", "OPTION", "VALUE"),
+        help="Set an option in the generated comic_info.ini. Can be used more than once.",
+    )
+    parser.add_argument("--workers", help="Passed to the build as the --workers option.")
+    parser.add_argument("--incremental", action="store_true", help="Run incremental builds.")
+    parser.add_argument("--builds", type=int, default=1, help="Number of times to build the comic.")
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help="Also measure peak Python memory use with tracemalloc. This slows the build down a lot.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the tags and characters on each page.")
+    parser.add_argument(
+        "--directory",
+        help="Empty folder to generate the comic in and keep afterwards. Defaults to a temporary folder.",
+    )
+    parser.add_argument("--output", help="File to write the JSON results to. Defaults to printing them.")
+    parser.add_argument("--verbose", action="store_true", help="Show the build's own output.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = json.dumps(run_load_test(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(results + "\n")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
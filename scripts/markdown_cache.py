@@ -0,0 +1,104 @@
+"""
+A persistent cache of Markdown conversions.
+
+Most of the Markdown converted in a build (post text, transcripts, the home page, and theme pages) is exactly the same
+as in the last build. When `Use build cache` is turned on in the [Comic Settings] section, the HTML for every
+conversion is saved in the build cache, keyed on a hash of the Markdown text and the markdown2 settings, so unchanged
+text skips markdown2 entirely on the next build.
+
+The cache is loaded once at the start of a build with load_markdown_cache() and saved at the end with
+save_markdown_cache(). Until it's loaded, CachedMarkdown converts everything normally.
+"""
+from configparser import RawConfigParser
+from dataclasses import dataclass, field
+from typing import Any
+
+import markdown2
+from markdown2 import Markdown, UnicodeWithAttrs
+
+from build_cache import get_cache_path, hash_bytes, hash_json, is_build_cache_enabled, load_json_cache, save_json_cache
+
+MARKDOWN_CACHE_FILENAME = "markdown.json"
+DEFAULT_MARKDOWN_CACHE_SIZE = 10000
+
+
+@dataclass(slots=True)
+class MarkdownCache:
+    path: str
+    max_size: int
+    # Which build this is, counting up from the first build that used the cache. Entries that haven't been used for
+    # the most builds are evicted first when the cache is full.
+    build_number: int
+    entries: dict[str, dict[str, Any]] = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+
+
+markdown_cache: MarkdownCache | None = None
+
+
+def load_markdown_cache(comic_info: RawConfigParser) -> None:
+    global markdown_cache
+    if not is_build_cache_enabled(comic_info):
+        markdown_cache = None
+        return
+    path = get_cache_path(comic_info, MARKDOWN_CACHE_FILENAME)
+    data = load_json_cache(path)
+    if data.get("markdown2_version") != markdown2.__version__:
+        # A different version of markdown2 might convert the same text differently
+        data = {}
+    markdown_cache = MarkdownCache(
+        path=path,
+        max_size=comic_info.getint("Comic Settings", "Markdown cache size", fallback=DEFAULT_MARKDOWN_CACHE_SIZE),
+        build_number=data.get("build_number", 0) + 1,
+        entries=data.get("entries", {}),
+    )
+
+
+def save_markdown_cache() -> None:
+    global markdown_cache
+    if markdown_cache is None:
+        return
+    entries = markdown_cache.entries
+    if len(entries) > markdown_cache.max_size:
+        keys = sorted(entries, key=lambda k: entries[k]["last_used"], reverse=True)
+        entries = {k: entries[k] for k in keys[:markdown_cache.max_size]}
+    save_json_cache(markdown_cache.path, {
+        "markdown2_version": markdown2.__version__,
+        "build_number": markdown_cache.build_number,
+        "entries": entries,
+    })
+    print(f"Markdown cache: {markdown_cache.hits} hits, {markdown_cache.misses} misses, {len(entries)} entries saved")
+    markdown_cache = None
+
+
+class CachedMarkdown:
+    """
+    A drop-in replacement for a markdown2.Markdown object whose convert() results are cached in the build cache.
+    """
+
+    def __init__(self, extras: list[str]):
+        self.extras = extras
+        self.markdown = Markdown(extras=extras)
+
+    def convert(self, text: str | bytes) -> UnicodeWithAttrs:
+        if markdown_cache is None:
+            return self.markdown.convert(text)
+        key = hash_json([hash_bytes(text.encode("utf-8") if isinstance(text, str) else text), self.extras])
+        entry = markdown_cache.entries.get(key)
+        if entry is not None:
+            markdown_cache.hits += 1
+            entry["last_used"] = markdown_cache.build_number
+            html = UnicodeWithAttrs(entry["html"])
+            html.metadata = dict(entry["metadata"]) if entry["metadata"] is not None else None
+            html.toc_html = entry["toc_html"]
+            return html
+        markdown_cache.misses += 1
+        html = self.markdown.convert(text)
+        markdown_cache.entries[key] = {
+            "html": str(html),
+            "metadata": html.metadata,
+            "toc_html": html.toc_html,
+            "last_used": markdown_cache.build_number,
+        }
+        return html
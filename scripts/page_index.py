@@ -0,0 +1,88 @@
+"""
+An in-memory index of the comic page folders, built with a single scan of the comics folder.
+
+Page discovery, thumbnails, transcripts, and social media lookups all need to know which files exist in each page
+folder. Rather than each of them checking the file system for every page, they share one PageIndex per comic folder.
+
+The index is a snapshot of the page folders from when it was built, so it doesn't know about files written later in
+the build (e.g. new thumbnails). Code that writes files into page folders should keep checking the file system for
+those files.
+"""
+import os
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class PageFolder:
+    name: str
+    # e.g. "your_content/comics/Page 1/"
+    path: str
+    entry: os.DirEntry
+    # Every file in the page folder, by filename
+    files: dict[str, os.DirEntry] = field(default_factory=dict)
+
+    def has_file(self, filename: str) -> bool:
+        return filename in self.files
+
+    def stat(self, filename: str | None = None) -> os.stat_result:
+        """
+        :return: The stat info for the given file in the page folder, or the page folder itself if no filename is
+        given. The stat info is cached, so asking for it again doesn't touch the file system.
+        """
+        return self.entry.stat() if filename is None else self.files[filename].stat()
+
+
+class PageIndex:
+
+    def __init__(self, comics_dir: str):
+        self.comics_dir = comics_dir
+        self.pages: dict[str, PageFolder] = {}
+        try:
+            page_entries = list(os.scandir(comics_dir))
+        except (FileNotFoundError, NotADirectoryError):
+            page_entries = []
+        for page_entry in page_entries:
+            # Match the folders that glob would find, i.e. no hidden folders
+            if page_entry.name.startswith(".") or not page_entry.is_dir():
+                continue
+            page_folder = PageFolder(page_entry.name, f"{comics_dir}/{page_entry.name}/", page_entry)
+            for entry in os.scandir(page_entry.path):
+                if entry.is_file():
+                    page_folder.files[entry.name] = entry
+            self.pages[page_entry.name] = page_folder
+
+    def is_page_path(self, path: str) -> bool:
+        """
+        :return: Whether the given path is directly inside a folder in the comics folder.
+        """
+        parent_dir = os.path.dirname(os.path.dirname(os.path.normpath(path)))
+        return os.path.normpath(parent_dir) == os.path.normpath(self.comics_dir)
+
+    def get_page_folder(self, path: str) -> tuple[PageFolder | None, str]:
+        """
+        Finds the page folder that directly contains the given path.
+        :return: The page folder, or None if the path isn't directly in one, and the path's filename.
+        """
+        dir_name, filename = os.path.split(os.path.normpath(path))
+        if not self.is_page_path(path):
+            return None, filename
+        return self.pages.get(os.path.basename(dir_name)), filename
+
+    def isfile(self, path: str) -> bool:
+        """
+        os.path.isfile(), answered from the index for files directly in a page folder.
+        """
+        page_folder, filename = self.get_page_folder(path)
+        if page_folder is None:
+            page_name = os.path.basename(os.path.dirname(os.path.normpath(path)))
+            if self.is_page_path(path) and not page_name.startswith("."):
+                # The comics folder was scanned, and there's no page folder with that name
+                return False
+            return os.path.isfile(path)
+        if page_folder.has_file(filename):
+            return True
+        # Only matches on a file system that isn't case-sensitive, so let the file system decide
+        lower_filename = filename.lower()
+        if any(name.lower() == lower_filename for name in page_folder.files):
+            return os.path.isfile(path)
+        return False
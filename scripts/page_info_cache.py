@@ -0,0 +1,93 @@
+"""
+A persistent cache of the parsed info.ini files for comic pages.
+
+When `Use build cache` is turned on in the [Comic Settings] section, the contents of every page's info.ini file are
+saved in the build cache, keyed on the file's modification time, size, and inode, and the inode of its page folder. On
+the next build, pages whose info.ini file hasn't changed reuse the saved contents instead of reading and parsing the file
+again. The file stats come from the PageIndex scan, so checking an unchanged page doesn't open any files.
+
+A file that's changed again within the same tick of the file system's clock as it was read keeps the same modification
+time, and possibly the same size. So files that were modified shortly before they were read are read again in the next
+build, the same way git handles "racily clean" files.
+"""
+import os
+import time
+from configparser import RawConfigParser
+from dataclasses import dataclass, field
+from typing import Any
+
+from build_cache import get_cache_path, is_build_cache_enabled, load_json_cache, save_json_cache
+from page_index import PageFolder, PageIndex
+from utils import read_info
+
+PAGE_INFO_CACHE_FILENAME = "page_info.json"
+# The coarsest modification time resolution of common file systems (FAT's is 2 seconds). Files modified less than this
+# long before they were read can't be told apart from a later change by their stats alone.
+MTIME_RESOLUTION_NS = 2_000_000_000
+
+
+@dataclass(slots=True)
+class PageInfoCache:
+    path: str
+    # Cached info.ini contents by info.ini path
+    entries: dict[str, dict[str, Any]] = field(default_factory=dict)
+    # The info.ini paths looked up and re-read in this build. Pages can be read on several threads, and appending to a
+    # list is safe to do from any of them.
+    used_paths: list[str] = field(default_factory=list)
+    missed_paths: list[str] = field(default_factory=list)
+
+    def read_page_info(self, page_folder: PageFolder) -> dict[str, str]:
+        """
+        :return: The contents of the page folder's info.ini file, from the cache if the file hasn't changed.
+        """
+        filepath = f"{page_folder.path}info.ini"
+        self.used_paths.append(filepath)
+        key = get_page_info_cache_key(page_folder)
+        entry = self.entries.get(filepath)
+        if entry is None or entry["key"] != key or is_racy_entry(entry):
+            self.missed_paths.append(filepath)
+            entry = {"key": key, "info": read_info(filepath, to_dict=True), "read_ns": time.time_ns()}
+            self.entries[filepath] = entry
+        # The page info gets modified while building the page, so don't hand out the cached dict itself
+        return dict(entry["info"])
+
+
+def get_page_info_cache_key(page_folder: PageFolder) -> list[int]:
+    info_stat = page_folder.stat("info.ini")
+    return [info_stat.st_mtime_ns, info_stat.st_size, info_stat.st_ino, page_folder.stat().st_ino]
+
+
+def is_racy_entry(entry: dict[str, Any]) -> bool:
+    """
+    :return: Whether the info.ini file was read so soon after it was modified that a later change might not have changed
+    its stats.
+    """
+    return entry.get("read_ns", 0) - entry["key"][0] < MTIME_RESOLUTION_NS
+
+
+def load_page_info_cache(comic_info: RawConfigParser) -> PageInfoCache | None:
+    """
+    :return: The page info cache, or None if the build cache is turned off.
+    """
+    if not is_build_cache_enabled(comic_info):
+        return None
+    path = get_cache_path(comic_info, PAGE_INFO_CACHE_FILENAME)
+    return PageInfoCache(path, load_json_cache(path))
+
+
+def save_page_info_cache(page_info_cache: PageInfoCache | None, page_index: PageIndex) -> None:
+    """
+    Saves the page info cache, dropping the entries for pages that are no longer in the given comics folder. Entries for
+    other comic folders are kept.
+    """
+    if page_info_cache is None:
+        return
+    used_paths = set(page_info_cache.used_paths)
+    comics_dir = os.path.normpath(page_index.comics_dir)
+    entries = {
+        filepath: entry for filepath, entry in page_info_cache.entries.items()
+        if filepath in used_paths or os.path.dirname(os.path.dirname(os.path.normpath(filepath))) != comics_dir
+    }
+    save_json_cache(page_info_cache.path, entries)
+    miss_count = len(page_info_cache.missed_paths)
+    print(f"Page info cache: {len(used_paths) - miss_count} hits, {miss_count} misses")
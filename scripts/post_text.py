@@ -0,0 +1,136 @@
+"""
+Builds the post text shown under each comic page.
+
+The post text for a page is the page's own `post.txt`, with the comic folder's `before post text` and `after post text`
+files (if they exist) added before and after it. The shared before and after files are read once per comic folder
+instead of once per page.
+
+By default, the combined Markdown is converted to HTML as a whole for every page. With `Convert post text separately`
+turned on in the [Comic Settings] section, the shared before and after text is converted once per comic folder, and
+only each page's own post.txt is converted per page. Any page whose post text uses Markdown that could depend on one of
+the other pieces, like reference-style link definitions, an HTML tag that's opened in one file and closed in another, or
+a list or indented code block at the start or end of a file that could run on into the next one, is still converted as
+a whole, so turning the option on never changes the output.
+"""
+import os
+import re
+from collections import Counter
+from configparser import RawConfigParser
+from dataclasses import dataclass
+
+from markdown2 import Markdown
+
+# HTML elements that never have a closing tag
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+}
+REFERENCE_DEFINITION_PATTERN = re.compile(r"^ {0,3}\[[^\]]+\]:", re.MULTILINE)
+CODE_FENCE_PATTERN = re.compile(r"^ {0,3}(```|~~~)", re.MULTILINE)
+OPENING_TAG_PATTERN = re.compile(r"<([a-zA-Z][\w-]*)\b[^>]*?(?<!/)>")
+CLOSING_TAG_PATTERN = re.compile(r"</([a-zA-Z][\w-]*)\s*>")
+# Lines that start or continue a list or an indented code block, which can join up with the same kind of block in the
+# piece of post text before or after
+LIST_ITEM_PATTERN = re.compile(r"^ {0,3}([*+-]|\d+[.)])(\s|$)")
+INDENTED_LINE_PATTERN = re.compile(r"^( {4}|\t)")
+BLANK_LINES_PATTERN = re.compile(r"\n[ \t]*\n")
+
+
+@dataclass(slots=True)
+class SharedPostText:
+    # The contents of the "before post text" and "after post text" files that exist, in the order they're added
+    before: list[str]
+    after: list[str]
+    # The before and after text converted to HTML, if it can be converted separately from each page's post.txt
+    before_html: str | None = None
+    after_html: str | None = None
+
+
+def is_convert_post_text_separately_enabled(comic_info: RawConfigParser) -> bool:
+    return comic_info.getboolean("Comic Settings", "Convert post text separately", fallback=False)
+
+
+def read_text_files(paths: list[str]) -> list[str]:
+    texts = []
+    for path in paths:
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                texts.append(f.read().decode("utf-8"))
+    return texts
+
+
+def is_list_or_indented_line(line: str) -> bool:
+    return bool(LIST_ITEM_PATTERN.match(line) or INDENTED_LINE_PATTERN.match(line))
+
+
+def has_open_block_at_edge(md: str) -> bool:
+    """
+    Checks whether a piece of post text starts with a list or indented block that could continue one from the piece
+    before it, or ends in a list or indented block that the piece after it could continue.
+    """
+    blocks = [block for block in BLANK_LINES_PATTERN.split(md.strip("\n")) if block.strip()]
+    if not blocks:
+        return False
+    return is_list_or_indented_line(blocks[0].split("\n")[0]) or any(
+        is_list_or_indented_line(line) for line in blocks[-1].split("\n")
+    )
+
+
+def is_self_contained(md: str) -> bool:
+    """
+    Checks whether a piece of post text converts to the same HTML on its own as it does as part of the full post text,
+    i.e. it doesn't define anything that other pieces could refer to, and it doesn't leave a block open that another
+    piece closes or continues.
+    """
+    if REFERENCE_DEFINITION_PATTERN.search(md) or "[^" in md:
+        return False
+    if has_open_block_at_edge(md):
+        return False
+    if len(CODE_FENCE_PATTERN.findall(md)) % 2:
+        return False
+    opening_tags = Counter(tag.lower() for tag in OPENING_TAG_PATTERN.findall(md) if tag.lower() not in VOID_ELEMENTS)
+    closing_tags = Counter(tag.lower() for tag in CLOSING_TAG_PATTERN.findall(md))
+    return opening_tags == closing_tags
+
+
+def convert_fragment(texts: list[str], markdown: Markdown) -> str | None:
+    """
+    Converts consecutive pieces of post text as one fragment, or returns None if the fragment isn't self-contained.
+    """
+    md = "\n\n".join(texts)
+    if not is_self_contained(md):
+        return None
+    # An empty fragment adds nothing to the full post text, but converts to an empty paragraph on its own
+    return markdown.convert(md) if md.strip() else ""
+
+
+def load_shared_post_text(comic_folder: str, comic_info: RawConfigParser, markdown: Markdown) -> SharedPostText:
+    shared_post_text = SharedPostText(
+        before=read_text_files([
+            f"your_content/{comic_folder}before post text.txt",
+            f"your_content/{comic_folder}before post text.html",
+        ]),
+        after=read_text_files([
+            f"your_content/{comic_folder}after post text.txt",
+            f"your_content/{comic_folder}after post text.html",
+        ]),
+    )
+    if is_convert_post_text_separately_enabled(comic_info):
+        shared_post_text.before_html = convert_fragment(shared_post_text.before, markdown)
+        shared_post_text.after_html = convert_fragment(shared_post_text.after, markdown)
+    return shared_post_text
+
+
+def build_post_text(shared_post_text: SharedPostText, post_text_path: str, markdown: Markdown) -> tuple[str, str]:
+    """
+    :return: The full post text Markdown for the page, and the same text converted to HTML.
+    """
+    page_texts = read_text_files([post_text_path])
+    post_md = "\n\n".join(shared_post_text.before + page_texts + shared_post_text.after)
+    if shared_post_text.before_html is not None and shared_post_text.after_html is not None:
+        page_html = convert_fragment(page_texts, markdown)
+        if page_html is not None:
+            html_parts = [html for html in (shared_post_text.before_html, page_html, shared_post_text.after_html)
+                          if html]
+            if html_parts:
+                return post_md, "\n".join(html_parts)
+    return post_md, markdown.convert(post_md)
@@ -0,0 +1,76 @@
+"""
+Writes a batch of pages from the same template, either serially or spread across worker processes.
+
+Every worker builds its own Jinja environment from the same template folders as the main process, so the files it
+writes are byte-identical to the ones the serial path would write.
+"""
+from configparser import RawConfigParser
+from typing import Any
+
+import utils
+from workers import get_worker_count, run_in_process_pool
+
+# Values shared by every page rendered by this worker process. Set once per worker by init_render_worker() so they
+# don't have to be sent over with every single page.
+shared_values: dict[str, Any] = {}
+
+
+def init_render_worker(comic_info: RawConfigParser, template_folders: list[str], base_directory: str,
+                       worker_shared_values: dict[str, Any]) -> None:
+    global shared_values
+    utils.BASE_DIRECTORY = base_directory
+    utils.build_jinja_environment(comic_info, template_folders)
+    utils.build_markdown_parser(comic_info)
+    shared_values = worker_shared_values
+
+
+def render_page(job: tuple[str, str, dict[str, Any]]) -> None:
+    template_name, html_path, page_values = job
+    data_dict = shared_values.copy()
+    data_dict.update(page_values)
+    utils.write_to_template(template_name, html_path, data_dict)
+
+
+def get_page_values(data_dict: dict[str, Any], values_to_share: dict[str, Any]) -> dict[str, Any]:
+    """
+    Strips out any value in the data dict that is the exact same object as one of the shared values, so it doesn't
+    get copied to the worker processes once per page.
+    """
+    return {
+        k: v for k, v in data_dict.items()
+        if k not in values_to_share or values_to_share[k] is not v
+    }
+
+
+def write_pages(comic_info: RawConfigParser, template_folders: list[str], template_name: str,
+                pages: list[tuple[str, dict[str, Any]]], values_to_share: dict[str, Any]) -> None:
+    """
+    Writes every page in `pages` using the given template.
+    :param comic_info: Config data for comic_info.ini file. The `Build workers` option decides how many worker
+    processes are used.
+    :param template_folders: The template folders the current Jinja environment was built from.
+    :param template_name: The name of the template to build every page with.
+    :param pages: A list of (html_path, data_dict) pairs.
+    :param values_to_share: Values that are included in every data dict, e.g. the global values. These are only sent
+    to each worker process once.
+    """
+    worker_count = min(get_worker_count(comic_info), len(pages))
+    if worker_count <= 1:
+        for html_path, data_dict in pages:
+            utils.write_to_template(template_name, html_path, data_dict)
+        return
+    print(f"Writing {len(pages)} '{template_name}' pages with {worker_count} worker processes")
+    jobs = [
+        (template_name, html_path, get_page_values(data_dict, values_to_share))
+        for html_path, data_dict in pages
+    ]
+    run_in_process_pool(
+        render_page,
+        jobs,
+        worker_count,
+        initializer=init_render_worker,
+        initargs=(comic_info, template_folders, utils.BASE_DIRECTORY, values_to_share),
+    )
+    # Match the serial path, where write_to_template() records the template name on each data dict
+    for _, data_dict in pages:
+        data_dict["template_name"] = template_name
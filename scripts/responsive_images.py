@@ -0,0 +1,288 @@
+"""
+Responsive comic images.
+
+When `Create responsive images` is turned on in the [Image Reprocessing] section, every comic image gets a set of
+smaller copies in modern formats (e.g. WebP or AVIF) plus JPEG fallbacks. The comic page template then serves them with
+`srcset`, so visitors on small screens don't download the full-size original.
+
+The copies are written next to the original image with a leading underscore (e.g. `_page1_png_800w.webp` for
+`page1.png`), so they're skipped when looking for comic images in a page folder, the same as `_thumbnail.jpg`. Copies
+that aren't needed anymore after the widths or formats are changed are deleted.
+
+When `Use build cache` is turned on in the [Comic Settings] section, the size of every comic image and the settings its
+copies were made with are saved in the build cache, and copies of unchanged images aren't encoded again.
+"""
+import os
+import re
+from configparser import RawConfigParser
+from dataclasses import dataclass, field
+from functools import partial
+from time import perf_counter_ns
+from typing import Any
+
+from PIL import Image, features
+
+import utils
+from build_cache import get_cache_path, hash_file, hash_json, is_build_cache_enabled, load_json_cache, save_json_cache
+from images import RESAMPLING_FILTERS, FAST_THUMBNAIL_REDUCING_GAP, get_resampling_filter
+from workers import get_worker_count, run_in_process_pool
+
+RESPONSIVE_IMAGE_CACHE_FILENAME = "responsive_images.json"
+# Formats that can be picked in the "Responsive image formats" option, and their MIME types
+MODERN_FORMATS = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+}
+# Comic images in any other format (e.g. GIFs or SVGs) are served as-is
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff")
+
+
+@dataclass(slots=True)
+class ResponsiveImageSettings:
+    widths: list[int]
+    formats: list[str]
+    quality: int
+    resample: Image.Resampling
+    sizes: str
+
+
+@dataclass(slots=True)
+class ImageVariant:
+    path: str
+    width: int
+    # The format from the "Responsive image formats" option, or "jpg" for the fallback images
+    format: str
+
+
+@dataclass(slots=True)
+class ResponsiveImageJob:
+    comic_page_path: str
+    # The cache entry from the last build that created images for this comic image, if any
+    cached_entry: dict[str, Any] | None = None
+
+
+@dataclass(slots=True)
+class ResponsiveImageResult:
+    comic_page_path: str
+    width: int
+    height: int
+    variants: list[ImageVariant] = field(default_factory=list)
+    created_count: int = 0
+    ms: float = 0
+    cache_key: str | None = None
+
+
+def is_responsive_images_enabled(comic_info: RawConfigParser) -> bool:
+    return comic_info.getboolean("Image Reprocessing", "Create responsive images", fallback=False)
+
+
+def get_responsive_image_settings(comic_info: RawConfigParser) -> ResponsiveImageSettings:
+    section = "Image Reprocessing"
+    widths_option = comic_info.get(section, "Responsive image widths", fallback="800, 1200")
+    try:
+        widths = sorted({int(w.strip().rstrip("w")) for w in utils.str_to_list(widths_option)})
+    except ValueError:
+        widths = []
+    if not widths or widths[0] < 1:
+        raise ValueError(
+            f"Invalid 'Responsive image widths' value in [Image Reprocessing]: {widths_option!r}\n"
+            f"Use a comma-separated list of widths in pixels, e.g. '800, 1200'."
+        )
+    formats = []
+    for image_format in utils.str_to_list(comic_info.get(section, "Responsive image formats", fallback="webp")):
+        image_format = image_format.lower()
+        if image_format not in MODERN_FORMATS:
+            raise ValueError(
+                f"Invalid 'Responsive image formats' value in [Image Reprocessing]: {image_format!r}\n"
+                f"Use one or more of: {', '.join(MODERN_FORMATS)}"
+            )
+        if not features.check(image_format):
+            print(f"Skipping {image_format} responsive images because this version of Pillow can't write them")
+            continue
+        formats.append(image_format)
+    return ResponsiveImageSettings(
+        widths=widths,
+        formats=formats,
+        quality=comic_info.getint(section, "Responsive image quality", fallback=80),
+        resample=get_resampling_filter(comic_info) or RESAMPLING_FILTERS["lanczos"],
+        sizes=comic_info.get(section, "Responsive image sizes", fallback=""),
+    )
+
+
+def get_variant_prefix(comic_page_path: str) -> str:
+    """
+    :return: The start of the filename of every image created from the comic image. The source extension is part of
+    it, so images with the same name in different formats (e.g. `page.png` and `page.jpg`) don't share their copies.
+    """
+    stem, extension = os.path.splitext(os.path.basename(comic_page_path))
+    return f"_{stem}_{extension.lstrip('.')}_"
+
+
+def get_variant_path(comic_page_path: str, width: int, image_format: str) -> str:
+    return os.path.join(
+        os.path.dirname(comic_page_path), f"{get_variant_prefix(comic_page_path)}{width}w.{image_format}"
+    )
+
+
+def remove_stale_variants(comic_page_path: str, variants: list[ImageVariant]) -> None:
+    """
+    Deletes the images created from the comic image in an earlier build that aren't part of the current set, e.g.
+    after a width or format was removed from the settings.
+    """
+    page_dir = os.path.dirname(comic_page_path)
+    variant_pattern = re.compile(
+        re.escape(get_variant_prefix(comic_page_path)) + r"\d+w\.(" + "|".join([*MODERN_FORMATS, "jpg"]) + ")"
+    )
+    current_filenames = {os.path.basename(variant.path) for variant in variants}
+    for filename in os.listdir(page_dir or "."):
+        if variant_pattern.fullmatch(filename) and filename not in current_filenames:
+            os.remove(os.path.join(page_dir, filename))
+
+
+def get_cache_key(settings: ResponsiveImageSettings, comic_page_path: str) -> str:
+    return hash_json([
+        hash_file(comic_page_path),
+        settings.widths,
+        settings.formats,
+        settings.quality,
+        int(settings.resample),
+    ])
+
+
+def get_variants(settings: ResponsiveImageSettings, comic_page_path: str, width: int) -> list[ImageVariant]:
+    """
+    Lists every image to create for a comic image of the given width. Images are never scaled up, so only the
+    configured widths smaller than the original are used. The modern formats also get a full-size copy, while the
+    JPEG fallbacks use the original image at full size.
+    """
+    smaller_widths = [w for w in settings.widths if w < width]
+    variants = [
+        ImageVariant(get_variant_path(comic_page_path, w, image_format), w, image_format)
+        for image_format in settings.formats
+        for w in smaller_widths + [width]
+    ]
+    variants.extend(ImageVariant(get_variant_path(comic_page_path, w, "jpg"), w, "jpg") for w in smaller_widths)
+    return variants
+
+
+def save_variant(im: Image, variant: ImageVariant, quality: int) -> None:
+    if variant.format == "jpg":
+        if im.mode in ("RGBA", "LA"):
+            # Get rid of transparency
+            bg = Image.new("RGB", im.size, "WHITE")
+            bg.paste(im, (0, 0), im)
+            im = bg
+        elif im.mode != "RGB":
+            im = im.convert("RGB")
+        im.save(variant.path, "JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        im.save(variant.path, variant.format.upper(), quality=quality)
+
+
+def run_responsive_image_job(settings: ResponsiveImageSettings, job: ResponsiveImageJob) -> ResponsiveImageResult:
+    start_time = perf_counter_ns()
+    cache_key = get_cache_key(settings, job.comic_page_path)
+    entry = job.cached_entry
+    if entry and entry.get("key") == cache_key:
+        variants = get_variants(settings, job.comic_page_path, entry["width"])
+        if all(os.path.isfile(variant.path) for variant in variants):
+            return ResponsiveImageResult(job.comic_page_path, entry["width"], entry["height"], variants,
+                                         cache_key=cache_key)
+    with Image.open(job.comic_page_path) as im:
+        if im.mode == "P":
+            im = im.convert("RGBA" if "transparency" in im.info else "RGB")
+        else:
+            im.load()
+        width, height = im.size
+        variants = get_variants(settings, job.comic_page_path, width)
+        resized_images = {width: im}
+        for variant in variants:
+            if variant.width not in resized_images:
+                resized_images[variant.width] = im.resize(
+                    (variant.width, max(1, round(height * variant.width / width))),
+                    settings.resample,
+                    reducing_gap=FAST_THUMBNAIL_REDUCING_GAP,
+                )
+            save_variant(resized_images[variant.width], variant, settings.quality)
+    remove_stale_variants(job.comic_page_path, variants)
+    return ResponsiveImageResult(job.comic_page_path, width, height, variants, len(variants),
+                                 (perf_counter_ns() - start_time) / 1_000_000, cache_key)
+
+
+def build_responsive_image(settings: ResponsiveImageSettings, result: ResponsiveImageResult) -> dict[str, Any]:
+    """
+    Builds the template data for one comic image. Every srcset is a list of {"path", "width"} dicts, from smallest to
+    largest.
+    """
+    sources = []
+    for image_format in settings.formats:
+        sources.append({
+            "type": MODERN_FORMATS[image_format],
+            "srcset": [{"path": v.path, "width": v.width} for v in result.variants if v.format == image_format],
+        })
+    fallback_srcset = [{"path": v.path, "width": v.width} for v in result.variants if v.format == "jpg"]
+    fallback_srcset.append({"path": result.comic_page_path, "width": result.width})
+    return {
+        "width": result.width,
+        "height": result.height,
+        "sources": sources,
+        "srcset": fallback_srcset,
+        # By default, the image is shown at its full size unless the screen is narrower than that
+        "sizes": settings.sizes or f"(max-width: {result.width}px) 100vw, {result.width}px",
+    }
+
+
+def process_responsive_images(comic_info: RawConfigParser, comic_data_dicts: list[dict]) -> None:
+    """
+    Creates the responsive versions of every comic image, and adds them to each comic data dict as
+    `responsive_images`, a dict from comic image path to its srcset data. Comic images that aren't resized, like GIFs,
+    aren't in that dict.
+    """
+    for comic_data in comic_data_dicts:
+        comic_data["responsive_images"] = {}
+    if not is_responsive_images_enabled(comic_info):
+        return
+    settings = get_responsive_image_settings(comic_info)
+    use_cache = is_build_cache_enabled(comic_info)
+    cache_path = get_cache_path(comic_info, RESPONSIVE_IMAGE_CACHE_FILENAME)
+    image_cache = load_json_cache(cache_path) if use_cache else {}
+    jobs = [
+        ResponsiveImageJob(comic_page_path, image_cache.get(comic_page_path))
+        for comic_data in comic_data_dicts
+        for comic_page_path in comic_data["comic_paths"]
+        if comic_page_path.lower().endswith(SOURCE_EXTENSIONS)
+    ]
+    worker_count = min(get_worker_count(comic_info), len(jobs))
+    if worker_count <= 1:
+        results = [run_responsive_image_job(settings, job) for job in jobs]
+    else:
+        print(f"Creating responsive images for {len(jobs)} comic images with {worker_count} worker processes")
+        results = run_in_process_pool(partial(run_responsive_image_job, settings), jobs, worker_count)
+
+    results_by_path = {result.comic_page_path: result for result in results}
+    for comic_data in comic_data_dicts:
+        for comic_page_path in comic_data["comic_paths"]:
+            if comic_page_path in results_by_path:
+                comic_data["responsive_images"][comic_page_path] = build_responsive_image(
+                    settings, results_by_path[comic_page_path]
+                )
+
+    created_results = [result for result in results if result.created_count]
+    if created_results:
+        total_ms = sum(result.ms for result in created_results)
+        print(f"Created {sum(result.created_count for result in created_results)} responsive images for "
+              f"{len(created_results)} comic images in {total_ms:.2f} ms of processing time")
+    if len(results) > len(created_results):
+        print(f"Kept existing responsive images for {len(results) - len(created_results)} comic images")
+    if use_cache:
+        # Only the images of this build's pages are kept, along with the ones for other comic folders
+        comics_dirs = {os.path.dirname(os.path.dirname(os.path.normpath(job.comic_page_path))) for job in jobs}
+        image_cache = {
+            comic_page_path: entry for comic_page_path, entry in image_cache.items()
+            if os.path.dirname(os.path.dirname(os.path.normpath(comic_page_path))) not in comics_dirs
+        }
+        for result in results:
+            image_cache[result.comic_page_path] = {
+                "key": result.cache_key, "width": result.width, "height": result.height
+            }
+        save_json_cache(cache_path, image_cache)
@@ -1,23 +1,45 @@
+import glob
+import hashlib
+import json
 import os
+import re
 from configparser import RawConfigParser
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from email.utils import formatdate
+from functools import partial
 from re import sub
 from string import Formatter
-from time import strptime, strftime
-from typing import Any
+from time import perf_counter_ns, strftime
+from typing import Any, Iterable, Iterator
 from urllib.parse import urljoin
 from xml.dom import minidom
 from xml.etree import ElementTree
 from xml.etree.ElementTree import register_namespace
 
+from build_cache import hash_file, hash_json
+from feed_item_cache import CachedFeedItems, FeedItemCache
 from models import ComicBuildResult
-from utils import get_comic_url
+from utils import checkpoint, get_comic_url, parse_post_date, record_processing_time
+from workers import run_in_process_pool
 
 DEFAULT_RSS_LANGUAGE = "en-us"
 DEFAULT_RSS_IMAGE = "your_content/images/banner.png"
 DEFAULT_RSS_IMAGE_WIDTH = "100"
 DEFAULT_RSS_IMAGE_HEIGHT = "36"
 
+ATOM_NAMESPACE = "http://www.w3.org/2005/Atom"
+DC_NAMESPACE = "http://purl.org/dc/elements/1.1/"
+# RFC 5005 feed history namespace, for marking archive documents
+FH_NAMESPACE = "http://purl.org/syndication/history/1.0"
+FEED_INDENT = "    "
+# pretty_xml() drops every newline in the serialized feed, along with any whitespace after it
+NEWLINE_INDENT_RE = re.compile(r"\n\s*")
+# Characters that aren't allowed in an XML document, which minidom refuses to parse
+INVALID_XML_CHARS_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+# Added to the feed path for the file that holds the feed's ETag and Last-Modified headers
+FEED_HEADERS_SUFFIX = ".headers.json"
+
 
 @dataclass(slots=True)
 class FeedJob:
@@ -26,6 +48,12 @@ class FeedJob:
     feed_relative_path: str = "feed.xml"
     comic_page_relative_path: str = "comic"
     build_enabled: bool = True
+    # Links to the other documents of an RFC 5005 archived feed, as (rel, feed relative path)
+    archive_links: list[tuple[str, str]] = field(default_factory=list)
+    # Whether this is one of the archive documents, rather than the feed that readers subscribe to
+    is_archive: bool = False
+    # The feed's items from the last build, or None if the build cache is turned off
+    cached_items: CachedFeedItems | None = None
 
 
 def add_base_tags_to_channel(channel: ElementTree.Element, feed_context: dict[str, Any]) -> None:
@@ -33,6 +61,13 @@ def add_base_tags_to_channel(channel: ElementTree.Element, feed_context: dict[st
     atom_link.set("href", feed_context["feed_self_url"])
     atom_link.set("rel", "self")
     atom_link.set("type", "application/rss+xml")
+    for archive_link in feed_context.get("archive_links", []):
+        atom_link = ElementTree.SubElement(channel, "{http://www.w3.org/2005/Atom}link")
+        atom_link.set("href", archive_link["href"])
+        atom_link.set("rel", archive_link["rel"])
+        atom_link.set("type", "application/rss+xml")
+    if feed_context.get("is_archive"):
+        ElementTree.SubElement(channel, f"{{{FH_NAMESPACE}}}archive")
 
     ElementTree.SubElement(channel, "title").text = feed_context["channel_title"]
     ElementTree.SubElement(channel, "description").text = feed_context["channel_description"]
@@ -59,19 +94,22 @@ def format_guid(direct_link: str) -> str:
     return direct_link.lower().replace(" ", "_").replace("&", "_")
 
 
-def parse_item_pub_date(comic_data: dict[str, Any], comic_info: RawConfigParser) -> str:
+def get_item_post_date(comic_data: dict[str, Any], comic_info: RawConfigParser) -> datetime:
     date_format = comic_info.get("Comic Settings", "Date format")
     try:
-        post_date = strptime(comic_data["_post_date"], date_format)
+        return parse_post_date(comic_data["_post_date"], date_format)
     except ValueError as e:
         raise ValueError(
             f"Invalid post date '{comic_data['_post_date']}' for page '{comic_data['page_name']}'\n"
             f"The date format is '{date_format}'. Ensure the date matches this format."
         ) from e
-    return strftime("%a, %d %b %Y %H:%M:%S +0000", post_date)
 
 
-def build_rss_post(comic_url: str, comic_paths: list[str], alt_text: str | None, post_html: str) -> str:
+def parse_item_pub_date(comic_data: dict[str, Any], comic_info: RawConfigParser) -> str:
+    return strftime("%a, %d %b %Y %H:%M:%S +0000", get_item_post_date(comic_data, comic_info).timetuple())
+
+
+def build_rss_images_html(comic_url: str, comic_paths: list[str], alt_text: str | None) -> str:
     comic_images = []
     for comic_path in comic_paths:
         comic_images.append(
@@ -80,7 +118,11 @@ def build_rss_post(comic_url: str, comic_paths: list[str], alt_text: str | None,
                 ' alt_text="{}"'.format(alt_text.replace(r'"', r'\"')) if alt_text else ""
             )
         )
-    return "\n".join(comic_images) + "\n\n<hr>\n\n{}".format(post_html)
+    return "\n".join(comic_images)
+
+
+def build_rss_post(comic_url: str, comic_paths: list[str], alt_text: str | None, post_html: str) -> str:
+    return build_rss_images_html(comic_url, comic_paths, alt_text) + "\n\n<hr>\n\n{}".format(post_html)
 
 
 def pretty_xml(element: ElementTree.Element) -> str:
@@ -128,35 +170,89 @@ def get_item_comic_page_relative_path(comic_data: dict[str, Any], default_comic_
     return comic_data.get("rss_comic_page_relative_path", default_comic_page_relative_path)
 
 
-def normalize_feed_item(
+def normalize_feed_item_links(
         comic_data: dict[str, Any],
         comic_info: RawConfigParser,
         comic_url: str,
         comic_page_relative_path: str,
-        item_index: int,
-) -> dict[str, Any]:
+) -> dict[str, str]:
+    """
+    Works out the parts of a feed item that need URLs joined or the post date parsed, which take most of the time
+    spent normalizing an item. These are what the feed item cache saves.
+    """
     direct_link = build_item_link(
         comic_url,
         get_item_comic_page_relative_path(comic_data, comic_page_relative_path),
         comic_data["page_name"],
     )
     return {
-        "title": comic_data["_title"],
-        "author": comic_info.get("Comic Info", "Author"),
         "pub_date": parse_item_pub_date(comic_data, comic_info),
         "link": direct_link,
-        "guid": format_guid(direct_link),
+        "images_html": build_rss_images_html(comic_url, comic_data["comic_paths"], comic_data.get("escaped_alt_text")),
+    }
+
+
+def build_feed_item(
+        comic_data: dict[str, Any],
+        author: str,
+        item_links: dict[str, str],
+        item_index: int,
+) -> dict[str, Any]:
+    return {
+        "title": comic_data["_title"],
+        "author": author,
+        "pub_date": item_links["pub_date"],
+        "link": item_links["link"],
+        "guid": format_guid(item_links["link"]),
         "categories": normalize_item_categories(comic_data),
         "description_placeholder_key": f"rss_cdata_{item_index}",
-        "description_html": build_rss_post(
-            comic_url,
-            comic_data["comic_paths"],
-            comic_data.get("escaped_alt_text"),
-            comic_data["post_html"],
-        ),
+        "description_html": item_links["images_html"] + "\n\n<hr>\n\n{}".format(comic_data["post_html"]),
     }
 
 
+def normalize_feed_item(
+        comic_data: dict[str, Any],
+        comic_info: RawConfigParser,
+        comic_url: str,
+        comic_page_relative_path: str,
+        item_index: int,
+) -> dict[str, Any]:
+    return build_feed_item(
+        comic_data,
+        comic_info.get("Comic Info", "Author"),
+        normalize_feed_item_links(comic_data, comic_info, comic_url, comic_page_relative_path),
+        item_index,
+    )
+
+
+def get_feed_item_settings_key(comic_info: RawConfigParser, comic_url: str, comic_page_relative_path: str) -> str:
+    """
+    Hashes the feed settings that normalize_feed_item_links() reads, so that changing any of them invalidates every
+    cached item in the feed.
+    """
+    return hash_json([comic_url, comic_page_relative_path, comic_info.get("Comic Settings", "Date format")])
+
+
+def get_feed_item_id(comic_data: dict[str, Any], comic_page_relative_path: str) -> str:
+    """
+    The item's comic page path, which the cache is keyed on. Page names alone aren't unique in the main feed, which has
+    the pages of every extra comic too.
+    """
+    return f"{get_item_comic_page_relative_path(comic_data, comic_page_relative_path)}/{comic_data['page_name']}"
+
+
+def get_feed_item_key(comic_data: dict[str, Any]) -> list[Any]:
+    """
+    The other comic page fields that normalize_feed_item_links() reads. They're short, so they're compared as they are
+    instead of being hashed, which would take about as long as normalizing the item.
+    """
+    return [
+        comic_data["_post_date"],
+        comic_data["comic_paths"],
+        comic_data.get("escaped_alt_text"),
+    ]
+
+
 def normalize_channel_context(
         comic_info: RawConfigParser,
         comic_url: str,
@@ -189,15 +285,43 @@ def build_feed_context(
         comic_data_dicts: list[dict[str, Any]],
         feed_relative_path: str = "feed.xml",
         comic_page_relative_path: str = "comic",
+        archive_links: list[tuple[str, str]] | None = None,
+        is_archive: bool = False,
+        cached_items: CachedFeedItems | None = None,
 ) -> dict[str, Any]:
+    """
+    :param cached_items: The feed's items from the last build. Only pages that are new or have changed since then are
+    normalized, and the rest of the items come from the cache.
+    """
     comic_url, _ = get_comic_url(comic_info)
     if not comic_url.endswith("/"):
         comic_url += "/"
 
     ordered_comic_data_dicts = order_comic_data_dicts(comic_info, comic_data_dicts)
     feed_context = normalize_channel_context(comic_info, comic_url, feed_relative_path)
+    feed_context["archive_links"] = [
+        {"rel": rel, "href": urljoin(comic_url, relative_path)} for rel, relative_path in archive_links or []
+    ]
+    feed_context["is_archive"] = is_archive
+    if cached_items is None:
+        feed_context["items"] = [
+            normalize_feed_item(comic_data, comic_info, comic_url, comic_page_relative_path, item_index)
+            for item_index, comic_data in enumerate(ordered_comic_data_dicts)
+        ]
+        return feed_context
+    cached_items.set_settings_key(get_feed_item_settings_key(comic_info, comic_url, comic_page_relative_path))
+    author = comic_info.get("Comic Info", "Author")
     feed_context["items"] = [
-        normalize_feed_item(comic_data, comic_info, comic_url, comic_page_relative_path, item_index)
+        build_feed_item(
+            comic_data,
+            author,
+            cached_items.get_item(
+                get_feed_item_id(comic_data, comic_page_relative_path),
+                get_feed_item_key(comic_data),
+                partial(normalize_feed_item_links, comic_data, comic_info, comic_url, comic_page_relative_path),
+            ),
+            item_index,
+        )
         for item_index, comic_data in enumerate(ordered_comic_data_dicts)
     ]
     return feed_context
@@ -226,6 +350,7 @@ def add_item(
 def build_feed_xml(feed_context: dict[str, Any]) -> tuple[ElementTree.Element, dict[str, str]]:
     register_namespace("atom", "http://www.w3.org/2005/Atom")
     register_namespace("dc", "http://purl.org/dc/elements/1.1/")
+    register_namespace("fh", FH_NAMESPACE)
     root = ElementTree.Element("rss")
     root.set("version", "2.0")
     channel = ElementTree.SubElement(root, "channel")
@@ -244,10 +369,184 @@ def serialize_feed_xml(root: ElementTree.Element, cdata_map: dict[str, str]) ->
     return pretty_string.format(**cdata_map)
 
 
-def write_feed_xml(feed_output_path: str, xml_text: str) -> None:
+def get_minidom_escapes() -> tuple[bool, bool]:
+    """
+    How minidom escapes text changed in Python 3.13, and iter_feed_xml() has to match whichever version is running.
+    :return: Whether minidom escapes double quotes in text, and whether it escapes whitespace characters in attributes.
+    """
+    xml_text = minidom.parseString('<a b="&#10;">"</a>').documentElement.toxml()
+    return "&quot;" in xml_text.split(">", 1)[1], "&#10;" in xml_text
+
+
+MINIDOM_ESCAPES_QUOTES_IN_TEXT, MINIDOM_ESCAPES_WHITESPACE_IN_ATTRIBUTES = get_minidom_escapes()
+
+
+def check_xml_chars(text: str) -> None:
+    match = INVALID_XML_CHARS_RE.search(text)
+    if match:
+        raise ValueError(
+            f"Invalid character {match.group()!r} in RSS feed text: {text!r}\n"
+            f"Remove the character from the comic's info.ini or comic_info.ini file."
+        )
+
+
+def escape_feed_text(text: str | None) -> str:
+    """
+    Escapes element text the same way the ElementTree -> pretty_xml() round trip does: newlines and the whitespace
+    after them are dropped, carriage returns are read back in as newlines, and special characters are escaped like
+    minidom escapes them.
+    """
+    if not text:
+        return ""
+    check_xml_chars(text)
+    text = NEWLINE_INDENT_RE.sub("", text).replace("\r", "\n")
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    if MINIDOM_ESCAPES_QUOTES_IN_TEXT:
+        text = text.replace('"', "&quot;")
+    return text
+
+
+def escape_feed_attribute(value: str) -> str:
+    check_xml_chars(value)
+    value = value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+    if MINIDOM_ESCAPES_WHITESPACE_IN_ATTRIBUTES:
+        value = value.replace("\r", "&#13;").replace("\n", "&#10;").replace("\t", "&#9;")
+    return value
+
+
+def format_text_element(indent: str, tag: str, text: str | None, attributes: Iterable[tuple[str, str]] = ()) -> str:
+    attributes_text = "".join(f' {name}="{escape_feed_attribute(value)}"' for name, value in attributes)
+    text = escape_feed_text(text)
+    if not text:
+        return f"{indent}<{tag}{attributes_text}/>\n"
+    return f"{indent}<{tag}{attributes_text}>{text}</{tag}>\n"
+
+
+def format_item_xml(item_context: dict[str, Any]) -> str:
+    indent = FEED_INDENT * 3
+    lines = [
+        f"{FEED_INDENT * 2}<item>\n",
+        format_text_element(indent, "title", item_context["title"]),
+        format_text_element(indent, "dc:creator", item_context["author"]),
+        format_text_element(indent, "pubDate", item_context["pub_date"]),
+        format_text_element(indent, "link", item_context["link"]),
+        format_text_element(indent, "guid", item_context["guid"], [("isPermaLink", "true")]),
+    ]
+    for category in item_context["categories"]:
+        lines.append(format_text_element(indent, "category", category["text"], [("type", category["type"])]))
+    lines.append(f"{indent}<description><![CDATA[{item_context['description_html']}]]></description>\n")
+    lines.append(f"{FEED_INDENT * 2}</item>\n")
+    return "".join(lines)
+
+
+def iter_feed_xml(feed_context: dict[str, Any]) -> Iterator[str]:
+    """
+    Writes out the feed one item at a time, without building the whole document in memory. The output is exactly the
+    same as serialize_feed_xml(*build_feed_xml(feed_context)).
+    """
+    indent = FEED_INDENT * 2
+    is_archive = feed_context.get("is_archive", False)
+    fh_namespace = f' xmlns:fh="{FH_NAMESPACE}"' if is_archive else ""
+    yield (
+        f'<?xml version="1.0" ?>\n'
+        f'<rss xmlns:atom="{ATOM_NAMESPACE}" xmlns:dc="{DC_NAMESPACE}"{fh_namespace} version="2.0">\n'
+        f"{FEED_INDENT}<channel>\n"
+        + format_text_element(indent, "atom:link", None, [
+            ("href", feed_context["feed_self_url"]), ("rel", "self"), ("type", "application/rss+xml"),
+        ])
+        + "".join(
+            format_text_element(indent, "atom:link", None, [
+                ("href", archive_link["href"]), ("rel", archive_link["rel"]), ("type", "application/rss+xml"),
+            ])
+            for archive_link in feed_context.get("archive_links", [])
+        )
+        + (format_text_element(indent, "fh:archive", None) if is_archive else "")
+        + format_text_element(indent, "title", feed_context["channel_title"])
+        + format_text_element(indent, "description", feed_context["channel_description"])
+        + format_text_element(indent, "link", feed_context["comic_url"])
+        + format_text_element(indent, "dc:creator", feed_context["channel_author"])
+        + format_text_element(indent, "language", feed_context["channel_language"])
+        + f"{indent}<image>\n"
+        + format_text_element(indent + FEED_INDENT, "title", feed_context["channel_title"])
+        + format_text_element(indent + FEED_INDENT, "link", feed_context["comic_url"])
+        + format_text_element(indent + FEED_INDENT, "url", feed_context["channel_image_url"])
+        + format_text_element(indent + FEED_INDENT, "width", feed_context["channel_image_width"])
+        + format_text_element(indent + FEED_INDENT, "height", feed_context["channel_image_height"])
+        + f"{indent}</image>\n"
+    )
+    for item_context in feed_context["items"]:
+        yield format_item_xml(item_context)
+    yield f"{FEED_INDENT}</channel>\n</rss>\n"
+
+
+def is_keep_unchanged_feeds_enabled(comic_info: RawConfigParser) -> bool:
+    return comic_info.getboolean("RSS Feed", "Keep unchanged feeds", fallback=False)
+
+
+def get_feed_headers_path(feed_output_path: str) -> str:
+    return feed_output_path + FEED_HEADERS_SUFFIX
+
+
+def read_feed_headers(feed_output_path: str) -> dict[str, str] | None:
+    """
+    :return: The ETag and Last-Modified headers saved next to the feed, or None if there aren't any.
+    """
     try:
-        with open(feed_output_path, 'wb') as f:
-            f.write(bytes(xml_text, "utf-8"))
+        with open(get_feed_headers_path(feed_output_path), "rb") as f:
+            headers = json.loads(f.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+    return headers if isinstance(headers, dict) else None
+
+
+def write_feed_headers(feed_output_path: str, feed_digest: str) -> None:
+    """
+    Saves the headers a web server should send with the feed. The Last-Modified date comes from the feed file, so it
+    only moves when the feed actually changes.
+    """
+    headers = {
+        "ETag": f'"{feed_digest}"',
+        "Last-Modified": formatdate(os.stat(feed_output_path).st_mtime, usegmt=True),
+    }
+    if read_feed_headers(feed_output_path) == headers:
+        return
+    with open(get_feed_headers_path(feed_output_path), "wb") as f:
+        f.write(bytes(json.dumps(headers, indent=2), "utf-8"))
+
+
+def replace_changed_feed(temp_path: str, feed_output_path: str, feed_digest: str) -> bool:
+    """
+    Moves the newly written feed into place, unless the feed that's already there has the same contents.
+    :return: Whether the feed file was replaced.
+    """
+    if os.path.isfile(feed_output_path):
+        if hash_file(feed_output_path) == feed_digest:
+            os.remove(temp_path)
+            return False
+    os.replace(temp_path, feed_output_path)
+    return True
+
+
+def write_feed_xml(feed_output_path: str, xml_text: str | Iterable[str], keep_unchanged: bool = False) -> None:
+    """
+    Writes the feed to the given path, either as one string or as the chunks of text from iter_feed_xml().
+    :param keep_unchanged: Leave the existing feed file untouched if the new feed is the same, so that its modification
+    time, and the feed's Last-Modified and ETag headers, only change when the feed does.
+    """
+    if isinstance(xml_text, str):
+        xml_text = [xml_text]
+    write_path = feed_output_path + ".tmp" if keep_unchanged else feed_output_path
+    digest = hashlib.sha256()
+    try:
+        with open(write_path, 'wb') as f:
+            for chunk in xml_text:
+                data = bytes(chunk, "utf-8")
+                if keep_unchanged:
+                    digest.update(data)
+                f.write(data)
+        if keep_unchanged:
+            replace_changed_feed(write_path, feed_output_path, digest.hexdigest())
+            write_feed_headers(feed_output_path, digest.hexdigest())
     except (OSError, IOError) as e:
         raise ValueError(
             f"Could not write RSS feed to {feed_output_path}\n"
@@ -288,10 +587,85 @@ def build_rss_feed_from_job(feed_job: FeedJob) -> None:
         feed_job.comic_data_dicts,
         feed_relative_path=feed_job.feed_relative_path,
         comic_page_relative_path=feed_job.comic_page_relative_path,
+        archive_links=feed_job.archive_links,
+        is_archive=feed_job.is_archive,
+        cached_items=feed_job.cached_items,
+    )
+    write_feed_xml(
+        feed_context["feed_output_path"],
+        iter_feed_xml(feed_context),
+        keep_unchanged=is_keep_unchanged_feeds_enabled(feed_job.comic_info),
     )
-    root, cdata_map = build_feed_xml(feed_context)
-    xml_text = serialize_feed_xml(root, cdata_map)
-    write_feed_xml(feed_context["feed_output_path"], xml_text)
+
+
+@dataclass(slots=True)
+class FeedResult:
+    feed_relative_path: str
+    ms: float
+    # The job's cached items, with the items used in this build. Worker processes get their own copy of the job, so
+    # this is how the items make it back to the main process.
+    cached_items: CachedFeedItems | None = None
+
+
+def build_timed_rss_feed_from_job(feed_job: FeedJob) -> FeedResult:
+    start_time = perf_counter_ns()
+    build_rss_feed_from_job(feed_job)
+    return FeedResult(feed_job.feed_relative_path, (perf_counter_ns() - start_time) / 1_000_000, feed_job.cached_items)
+
+
+def build_rss_feeds(
+        feed_jobs: list[FeedJob],
+        worker_count: int,
+        feed_item_cache: FeedItemCache | None = None,
+) -> list[FeedResult]:
+    """
+    Builds every enabled feed job. Each feed is written independently of the others, so when there's more than one
+    feed to build and more than one worker, the feeds are spread across worker processes.
+    :param feed_item_cache: The feed item cache to build the feeds from and to update, or None if it's turned off.
+    """
+    feed_jobs = [feed_job for feed_job in feed_jobs if feed_job.build_enabled]
+    if feed_item_cache is not None:
+        feed_jobs = [
+            replace(feed_job, cached_items=feed_item_cache.get_cached_items(feed_job.feed_relative_path))
+            for feed_job in feed_jobs
+        ]
+    worker_count = min(worker_count, len(feed_jobs))
+    if worker_count <= 1:
+        feed_results = [build_timed_rss_feed_from_job(feed_job) for feed_job in feed_jobs]
+    else:
+        print(f"Building {len(feed_jobs)} RSS feeds with {worker_count} worker processes")
+        feed_results = run_in_process_pool(build_timed_rss_feed_from_job, feed_jobs, worker_count)
+    for feed_result in feed_results:
+        record_processing_time(f"RSS feed {feed_result.feed_relative_path}", feed_result.ms)
+    checkpoint(f"Build {len(feed_jobs)} RSS feeds")
+    if feed_item_cache is not None:
+        for feed_result in feed_results:
+            feed_item_cache.update(feed_result.feed_relative_path, feed_result.cached_items)
+    return feed_results
+
+
+def remove_stale_feeds(feed_jobs: list[FeedJob], kept_feed_paths: list[str]) -> None:
+    """
+    Feeds that are kept between builds with `Keep unchanged feeds` aren't cleaned out of the output directory, so any
+    kept feed or headers file that wasn't written by this build is deleted here. That covers archive documents that are
+    no longer part of their feed (e.g. after raising `Max items`), and feeds that aren't built anymore (e.g. after
+    turning off `Build RSS feed`, or combining an extra comic's feed with the main feed).
+    :param kept_feed_paths: The glob patterns, relative to the output directory, of the feed files that were kept.
+    """
+    if not kept_feed_paths:
+        return
+    written_paths = set()
+    for feed_job in feed_jobs:
+        if not feed_job.build_enabled:
+            continue
+        written_paths.add(os.path.normpath(feed_job.feed_relative_path))
+        if is_keep_unchanged_feeds_enabled(feed_job.comic_info):
+            written_paths.add(os.path.normpath(get_feed_headers_path(feed_job.feed_relative_path)))
+    output_dir = os.getenv("OUTPUT_DIR", "")
+    for pattern in kept_feed_paths:
+        for path in glob.glob(pattern, root_dir=output_dir or None):
+            if os.path.normpath(path) not in written_paths:
+                os.remove(os.path.join(output_dir, path))
 
 
 def build_rss_feed(
@@ -420,6 +794,80 @@ def build_main_rss_feed_job(
     )
 
 
+def get_max_feed_items(comic_info: RawConfigParser) -> int:
+    """
+    Reads the `Max items` option in the [RSS Feed] section. 0, the default, puts every comic page in the feed.
+    """
+    value = comic_info.get("RSS Feed", "Max items", fallback="").strip()
+    if not value:
+        return 0
+    try:
+        max_items = int(value)
+    except ValueError:
+        max_items = -1
+    if max_items < 0:
+        raise ValueError(
+            f"Invalid 'Max items' value in [RSS Feed]: {value!r}\n"
+            f"Use a whole number of items, or 0 to put every comic page in the feed."
+        )
+    return max_items
+
+
+def get_archive_feed_relative_path(feed_relative_path: str, archive_number: int) -> str:
+    root, ext = os.path.splitext(feed_relative_path)
+    return f"{root}-{archive_number}{ext}"
+
+
+def paginate_feed_job(feed_job: FeedJob) -> list[FeedJob]:
+    """
+    Limits the feed to the newest `Max items` comic pages. If `Archive feeds` is turned on in the [RSS Feed] section,
+    the older comic pages are put in RFC 5005 archive documents, so feed readers can still page back through the whole
+    comic. No page is in both the feed and an archive document. Archive documents are numbered from the oldest,
+    starting at `feed-1.xml`, and each one holds `Max items` pages. Only the newest one can have fewer, and it fills up
+    as pages move out of the feed, so an archive document never changes once it's full.
+
+    A combined main feed lists the main comic's pages before the pages of each Extra Comic, so the pages are sorted by
+    post date first to keep the newest posts in the feed itself.
+    :return: The job for the feed itself, followed by the jobs for any archive documents.
+    """
+    max_items = get_max_feed_items(feed_job.comic_info)
+    comic_data_dicts = feed_job.comic_data_dicts
+    if not feed_job.build_enabled or not max_items or len(comic_data_dicts) <= max_items:
+        return [feed_job]
+    # Check the whole feed, since each document only checks its own pages
+    validate_comic_data_dicts(comic_data_dicts)
+    comic_data_dicts = sorted(
+        comic_data_dicts, key=lambda comic_data: get_item_post_date(comic_data, feed_job.comic_info)
+    )
+    archived_comic_data_dicts = comic_data_dicts[:-max_items]
+    archive_count = 0
+    if feed_job.comic_info.getboolean("RSS Feed", "Archive feeds", fallback=False):
+        archive_count = -(-len(archived_comic_data_dicts) // max_items)
+    archive_paths = [
+        get_archive_feed_relative_path(feed_job.feed_relative_path, archive_number)
+        for archive_number in range(1, archive_count + 1)
+    ]
+    feed_jobs = [replace(
+        feed_job,
+        comic_data_dicts=comic_data_dicts[-max_items:],
+        archive_links=[("prev-archive", archive_paths[-1])] if archive_paths else [],
+    )]
+    for i, archive_path in enumerate(archive_paths):
+        archive_links = [("current", feed_job.feed_relative_path)]
+        if i > 0:
+            archive_links.append(("prev-archive", archive_paths[i - 1]))
+        if i < len(archive_paths) - 1:
+            archive_links.append(("next-archive", archive_paths[i + 1]))
+        feed_jobs.append(replace(
+            feed_job,
+            comic_data_dicts=archived_comic_data_dicts[i * max_items:(i + 1) * max_items],
+            feed_relative_path=archive_path,
+            archive_links=archive_links,
+            is_archive=True,
+        ))
+    return feed_jobs
+
+
 def get_rss_feed_jobs(comic_results: list[ComicBuildResult]) -> list[FeedJob]:
     main_comic_result = get_main_comic_result(comic_results)
     extra_comic_results_to_combine = []
@@ -444,4 +892,4 @@ def get_rss_feed_jobs(comic_results: list[ComicBuildResult]) -> list[FeedJob]:
         build_rss_feed_job_for_comic_result(comic_result)
         for comic_result in extra_comic_results_with_independent_feeds
     ])
-    return feed_jobs
+    return [paginated_job for feed_job in feed_jobs for paginated_job in paginate_feed_job(feed_job)]
@@ -0,0 +1,131 @@
+"""
+Finds and loads the transcripts for each comic page.
+
+Transcripts are looked up in two places: the comic page's own folder (e.g. `your_content/comics/Page 1/English.txt`)
+and, if one is set, the `Transcripts folder` from the [Transcripts] section (e.g. `transcripts/Page 1/English.md`).
+"""
+import os
+from collections import OrderedDict
+from configparser import RawConfigParser
+from typing import Iterable
+
+from markdown2 import Markdown
+
+from page_index import PageIndex
+
+TRANSCRIPT_EXTENSIONS = [".txt", ".md"]
+
+
+class TranscriptIndex:
+    """
+    Keeps track of which transcript files exist for each page, so the files only have to be looked up once per build
+    even though the transcript languages are needed when the page info is read and the transcripts themselves are
+    needed when the comic data is built. Listing the languages for a page never reads or converts the transcripts.
+
+    Each transcripts folder is scanned once, the first time a page's transcripts are looked up, and every lookup after
+    that is served from memory.
+    """
+
+    def __init__(self, comic_folder: str, comic_info: RawConfigParser, page_index: PageIndex | None = None):
+        self.enabled = comic_info.getboolean("Transcripts", "Enable transcripts")
+        self.transcript_dirs = []
+        if comic_info.getboolean("Transcripts", "Load transcripts from comic folder", fallback=True):
+            self.transcript_dirs.append(f"your_content/{comic_folder}comics")
+        transcripts_dir = comic_info.get("Transcripts", "Transcripts folder", fallback="")
+        if transcripts_dir:
+            self.transcript_dirs.append(transcripts_dir)
+        self.default_language = comic_info.get("Transcripts", "Default language", fallback="English")
+        self.page_index = page_index
+        self._transcript_paths: dict[str, OrderedDict[str, str]] = {}
+        self._transcript_dir_indexes: dict[str, dict[str, dict[str, str]]] = {}
+
+    def get_transcript_dir_index(self, transcripts_dir: str) -> dict[str, dict[str, str]]:
+        if transcripts_dir not in self._transcript_dir_indexes:
+            if self.page_index is not None and transcripts_dir == self.page_index.comics_dir:
+                # The comics folder has already been scanned
+                self._transcript_dir_indexes[transcripts_dir] = get_transcript_files_index(
+                    transcripts_dir,
+                    ((page_folder.name, list(page_folder.files)) for page_folder in self.page_index.pages.values()),
+                )
+            else:
+                self._transcript_dir_indexes[transcripts_dir] = index_transcript_files(transcripts_dir)
+        return self._transcript_dir_indexes[transcripts_dir]
+
+    def get_transcript_paths(self, page_name: str) -> OrderedDict[str, str]:
+        """
+        :return: The path of the transcript file for each language available for the given page, with the default
+        language first.
+        """
+        if page_name not in self._transcript_paths:
+            transcript_paths = OrderedDict()
+            if self.enabled:
+                for transcripts_dir in self.transcript_dirs:
+                    transcript_paths.update(self.get_transcript_dir_index(transcripts_dir).get(page_name, {}))
+                if self.default_language in transcript_paths:
+                    transcript_paths.move_to_end(self.default_language, last=False)
+            self._transcript_paths[page_name] = transcript_paths
+        return self._transcript_paths[page_name]
+
+    def get_languages(self, page_name: str) -> list[str]:
+        return list(self.get_transcript_paths(page_name).keys())
+
+    def get_transcripts(self, page_name: str, markdown: Markdown) -> OrderedDict[str, str]:
+        """
+        :return: The transcript for each language available for the given page, converted to HTML.
+        """
+        return OrderedDict(
+            (language, markdown.convert(read_transcript(transcript_path)))
+            for language, transcript_path in self.get_transcript_paths(page_name).items()
+        )
+
+
+def index_transcript_files(transcripts_dir: str) -> dict[str, dict[str, str]]:
+    """
+    Walks the transcripts folder once and finds both *.txt and *.md files in every page folder in it. If two files
+    exist with the same name (e.g. English.txt and English.md), then the *.md file will take precedence.
+    :return: A dict of page name to a dict of language to transcript path.
+    """
+    try:
+        page_entries = list(os.scandir(transcripts_dir))
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+    return get_transcript_files_index(
+        transcripts_dir,
+        (
+            (page_entry.name, [entry.name for entry in os.scandir(page_entry.path) if entry.is_file()])
+            for page_entry in page_entries
+            if page_entry.is_dir()
+        ),
+    )
+
+
+def get_transcript_files_index(transcripts_dir: str,
+                               page_files: Iterable[tuple[str, list[str]]]) -> dict[str, dict[str, str]]:
+    """
+    :param transcripts_dir: The transcripts folder the page folders are in.
+    :param page_files: The name of each page folder in the transcripts folder, and the names of the files in it.
+    :return: A dict of page name to a dict of language to transcript path.
+    """
+    index = {}
+    for page_name, filenames in page_files:
+        filenames = sorted(filenames)
+        transcript_paths = {}
+        for ext in TRANSCRIPT_EXTENSIONS:
+            for filename in filenames:
+                # Match the files glob would find, i.e. no hidden files, and ignore the post.txt in the comic folders
+                if filename.startswith(".") or not filename.endswith(ext) or filename.endswith("post.txt"):
+                    continue
+                language = os.path.splitext(filename)[0]
+                transcript_paths[language] = os.path.join(transcripts_dir, page_name, filename)
+        if transcript_paths:
+            index[page_name] = transcript_paths
+    return index
+
+
+def read_transcript(transcript_path: str) -> str:
+    with open(transcript_path, "rb") as f:
+        text = f.read()
+    try:
+        return text.decode("utf-8")
+    except UnicodeDecodeError:
+        return text.decode("latin-1")
@@ -4,17 +4,31 @@ import os
 import re
 from configparser import RawConfigParser
 from copy import deepcopy
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
 from urllib.parse import urljoin
 
-from jinja2 import Environment, FileSystemLoader, StrictUndefined, TemplateNotFound
-from markdown2 import Markdown
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined, Template, TemplateNotFound
 from time import strftime, perf_counter_ns
 
+from build_cache import get_cache_path, is_build_cache_enabled
+from markdown_cache import CachedMarkdown
+
 BASE_DIRECTORY = ""
-PROCESSING_TIMES: list[tuple[str, float]] = []
+# Each entry is a name, the time it was recorded at, and for work that was timed separately with
+# record_processing_time(), how long it took in ms. Entries from checkpoint() have None instead, and the time between
+# two checkpoints is how long the later one's phase took.
+PROCESSING_TIMES: list[tuple[str, int, float | None]] = []
+
+JINJA_BYTECODE_CACHE_DIRECTORY = "jinja"
 
 jinja_environment: Environment | None = None
-markdown_parser: Markdown | None = None
+markdown_parser: CachedMarkdown | None = None
+# Every Jinja environment and Markdown parser built so far, so they can be reused by other comic folders
+jinja_environments: dict[tuple, Environment] = {}
+markdown_parsers: dict[tuple, CachedMarkdown] = {}
+template_index: "TemplateIndex | None" = None
 social_media_data_by_comic: dict[str, dict] = {}
 
 
@@ -25,23 +39,47 @@ def web_path(rel_path: str) -> str:
 
 
 def build_jinja_environment(comic_info: RawConfigParser, template_folders: list[str]) -> None:
-    global jinja_environment
-    try:
-        if comic_info.getboolean("Comic Settings", "Allow missing variables in templates", fallback=False):
-            jinja_environment = Environment(loader=FileSystemLoader(template_folders))  # noqa
-        else:
-            jinja_environment = Environment(loader=FileSystemLoader(template_folders), undefined=StrictUndefined)  # noqa
-    except Exception as e:
-        raise ValueError(
-            f"Error initializing Jinja2 environment with template folders: {template_folders}\n"
-            f"Verify all template folders exist and are readable. {e}"
-        ) from e
+    """
+    Sets the Jinja environment to use for the given template folders. Environments are shared by every comic folder
+    that uses the same template folders and settings, so each template is only compiled once per build. With
+    `Use build cache` turned on, compiled templates are also saved in the build cache, and only recompiled on the next
+    build if the template's source has changed.
+    """
+    global jinja_environment, template_index
+    allow_missing_variables = comic_info.getboolean(
+        "Comic Settings", "Allow missing variables in templates", fallback=False
+    )
+    bytecode_cache_dir = None
+    if is_build_cache_enabled(comic_info):
+        bytecode_cache_dir = get_cache_path(comic_info, JINJA_BYTECODE_CACHE_DIRECTORY)
+    # Key on absolute paths, because the loader looks up relative template folders from the current directory
+    key = (tuple(os.path.abspath(folder) for folder in template_folders), allow_missing_variables, bytecode_cache_dir)
+    if key not in jinja_environments:
+        try:
+            options = {"loader": FileSystemLoader(template_folders)}
+            if not allow_missing_variables:
+                options["undefined"] = StrictUndefined
+            if bytecode_cache_dir is not None:
+                os.makedirs(bytecode_cache_dir, exist_ok=True)
+                options["bytecode_cache"] = FileSystemBytecodeCache(bytecode_cache_dir)
+            jinja_environments[key] = Environment(**options)  # noqa
+        except Exception as e:
+            raise ValueError(
+                f"Error initializing Jinja2 environment with template folders: {template_folders}\n"
+                f"Verify all template folders exist and are readable. {e}"
+            ) from e
+    jinja_environment = jinja_environments[key]
+    # Templates and pages may have been added since the template index was built, so build it again when needed
+    template_index = None
 
 
 def build_markdown_parser(comic_info: RawConfigParser) -> None:
     global markdown_parser
-    extras = comic_info.get("Comic Settings", "Markdown extras", fallback="")
-    markdown_parser = Markdown(extras=["metadata"] + str_to_list(extras))
+    extras = ["metadata"] + str_to_list(comic_info.get("Comic Settings", "Markdown extras", fallback=""))
+    key = tuple(extras)
+    if key not in markdown_parsers:
+        markdown_parsers[key] = CachedMarkdown(extras=extras)
+    markdown_parser = markdown_parsers[key]
 
 
 def get_comic_url(comic_info: RawConfigParser) -> tuple[str, str]:
@@ -102,6 +140,60 @@ def find_project_root():
                                     "running this script from within the comic_git repository.")
 
 
+@dataclass(slots=True)
+class TemplateIndex:
+    environment: Environment
+    theme: str
+    # Names of the Markdown pages in the theme's `pages` folder, minus the `.md` file extension
+    md_pages: set[str]
+    # Names of every template the Jinja environment can load, or None if its loader can't list them
+    jinja_templates: set[str] | None
+
+
+def get_template_index(theme: str) -> TemplateIndex:
+    """
+    Returns the index of which Markdown pages and templates exist, so finding the file to build each page from doesn't
+    have to touch the file system. The index is built the first time it's needed after the Jinja environment is set.
+    """
+    global template_index
+    if template_index is None or template_index.environment is not jinja_environment or template_index.theme != theme:
+        md_pages = set()
+        pages_dir = f"your_content/themes/{theme}/pages"
+        for dir_path, _, filenames in os.walk(pages_dir):
+            rel_dir = os.path.relpath(dir_path, pages_dir).replace("\\", "/")
+            for filename in filenames:
+                name, ext = os.path.splitext(filename)
+                if ext == ".md":
+                    md_pages.add(name if rel_dir == "." else f"{rel_dir}/{name}")
+        try:
+            jinja_templates = set(jinja_environment.list_templates())
+        except TypeError:
+            jinja_templates = None
+        template_index = TemplateIndex(jinja_environment, theme, md_pages, jinja_templates)
+    return template_index
+
+
+def get_jinja_template(index: TemplateIndex, template_name: str) -> Template:
+    """
+    Finds the HTML or TPL template named `template_name`, preferring an HTML file over a TPL file.
+    """
+    if index.jinja_templates is not None:
+        for ext in (".html", ".tpl"):
+            if template_name + ext in index.jinja_templates:
+                return jinja_environment.get_template(template_name + ext)
+    # Not in the index, so search the template folders to be sure, e.g. in case it's in a symlinked folder
+    for ext in (".html", ".tpl"):
+        try:
+            return jinja_environment.get_template(template_name + ext)
+        except TemplateNotFound:
+            pass
+    raise TemplateNotFound(
+        f"Template matching '{template_name}' not found\n"
+        f"Verify the template file exists in your theme's templates folder or the default templates folder, "
+        f"and that the filename matches (case-sensitive)."
+    )
+
+
 def build_md_page(template_name: str, data_dict: dict | None = None) -> str | None:
     """
     Searches in the `pages` directory in the given theme directory for a file named {template_name}.md. If it doesn't
@@ -158,20 +250,10 @@ def write_to_template(template_name: str, html_path: str, data_dict: dict | None
     if data_dict is None:
         data_dict = {}
     data_dict["template_name"] = template_name
-    file_contents = build_md_page(template_name, data_dict)
+    index = get_template_index(data_dict["theme"])
+    file_contents = build_md_page(template_name, data_dict) if template_name in index.md_pages else None
     if file_contents is None:
-        for ext in (".html", ".tpl"):
-            try:
-                file_contents = jinja_environment.get_template(template_name + ext).render(**data_dict)
-                break
-            except TemplateNotFound:
-                pass
-        else:
-            raise TemplateNotFound(
-                f"Template matching '{template_name}' not found\n"
-                f"Verify the template file exists in your theme's templates folder or the default templates folder, "
-                f"and that the filename matches (case-sensitive)."
-            )
+        file_contents = get_jinja_template(index, template_name).render(**data_dict)
 
     output_dir = os.getenv("OUTPUT_DIR", "")
     if output_dir:
@@ -203,6 +285,10 @@ def read_info(filepath, to_dict=False):
     try:
         if not re.search(r"^\[.*?]", info_string):
             # print(filepath + " has no section")
+            if to_dict:
+                info_dict = parse_flat_info(info_string)
+                if info_dict is not None:
+                    return info_dict
             info_string = "[DEFAULT]\n" + info_string
         info = RawConfigParser()
         info.optionxform = str
@@ -220,6 +306,54 @@ def read_info(filepath, to_dict=False):
         ) from e
 
 
+@lru_cache(maxsize=None)
+def parse_post_date(post_date: str, date_format: str) -> datetime:
+    """
+    Parses a page's Post date with the Date format from the [Comic Settings] section. Each post date is needed to
+    schedule, sort, and archive the page and for its RSS item, so the result is memoized and strptime only runs once per
+    date. The memoized dates are cleared at the start of every build. Raises the same ValueError as datetime.strptime()
+    for dates that don't match the format.
+    """
+    return datetime.strptime(post_date, date_format)
+
+
+def parse_flat_info(info_string: str) -> dict[str, str] | None:
+    """
+    A fast parser for info.ini files without any section headers, like the info.ini files for comic pages. It gives the
+    same result as reading the file with a RawConfigParser (with optionxform = str) and taking its DEFAULT section,
+    including comments, empty lines, and indented continuation lines, without the overhead of building a parser.
+    :return: The options in the file, or None if the file has anything RawConfigParser would handle differently or
+    reject (section headers, lines without a delimiter, duplicate options), so it should be read with RawConfigParser.
+    """
+    info: dict[str, list[str]] = {}
+    optname = None
+    indent_level = 0
+    for line in info_string.split("\n"):
+        value = line.strip()
+        if value.startswith(("#", ";")):
+            continue
+        if not value:
+            # Empty lines are kept in multiline values, and stripped from the end of the value later
+            if optname is not None:
+                info[optname].append("")
+            continue
+        cur_indent_level = RawConfigParser.NONSPACECRE.search(line).start()
+        if optname is not None and cur_indent_level > indent_level:
+            info[optname].append(value)
+            continue
+        indent_level = cur_indent_level
+        if RawConfigParser.SECTCRE.match(value):
+            return None
+        mo = RawConfigParser.OPTCRE.match(value)
+        if not mo or not mo.group("option"):
+            return None
+        optname = mo.group("option").rstrip()
+        if optname in info:
+            return None
+        info[optname] = [mo.group("value").strip()]
+    return {k: "\n".join(v).rstrip() for k, v in info.items()}
+
+
 def pick_data(social_media_data: dict, template_name: str) -> dict:
     # If the template name isn't defined, use `base` instead
     if template_name not in social_media_data:
@@ -329,16 +463,42 @@ def get_social_media_data(
 def checkpoint(s: str, clear: bool = False) -> None:
     global PROCESSING_TIMES
     if clear:
-        PROCESSING_TIMES = [(s, perf_counter_ns())]
+        PROCESSING_TIMES = [(s, perf_counter_ns(), None)]
     else:
-        PROCESSING_TIMES.append((s, perf_counter_ns()))
+        PROCESSING_TIMES.append((s, perf_counter_ns(), None))
 
 
-def print_processing_times() -> None:
+def record_processing_time(s: str, ms: float) -> None:
+    """
+    Records how long a part of the current phase took, for work that's timed on its own, e.g. in a worker process. It's
+    reported under the phase of the next checkpoint, and doesn't start a new phase.
+    """
+    PROCESSING_TIMES.append((s, perf_counter_ns(), ms))
+
+
+def get_processing_times() -> list[tuple[str, float, list[tuple[str, float]]]]:
+    """
+    :return: The name and duration in ms of every phase after the first checkpoint, along with the names and durations
+    of the parts of that phase that were recorded with record_processing_time().
+    """
+    phases = []
+    parts = []
     last_processed_time = None
-    print("")
-    for name, t in PROCESSING_TIMES:
+    for name, t, ms in PROCESSING_TIMES:
+        if ms is not None:
+            parts.append((name, ms))
+            continue
         if last_processed_time is not None:
-            print("{}: {:.2f} ms".format(name, (t - last_processed_time) / 1_000_000))
+            phases.append((name, (t - last_processed_time) / 1_000_000, parts))
+            parts = []
         last_processed_time = t
+    return phases
+
+
+def print_processing_times() -> None:
+    print("")
+    for name, ms, parts in get_processing_times():
+        print("{}: {:.2f} ms".format(name, ms))
+        for part_name, part_ms in parts:
+            print("    {}: {:.2f} ms".format(part_name, part_ms))
     print("{}: {:.2f} ms".format("Total time", (PROCESSING_TIMES[-1][1] - PROCESSING_TIMES[0][1]) / 1_000_000))
@@ -0,0 +1,71 @@
+"""
+Helpers for spreading independent pieces of build work across worker processes.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from configparser import RawConfigParser
+from typing import Any, Callable, Iterable, Iterator
+
+
+def get_worker_count(comic_info: RawConfigParser) -> int:
+    """
+    Reads the number of worker processes to use from the `Build workers` option in the [Comic Settings] section.
+    Defaults to 1, i.e. everything is built serially in the main process. `auto` uses one worker per CPU core.
+    """
+    return parse_worker_count(comic_info, "Build workers", os.cpu_count() or 1)
+
+
+def get_page_discovery_thread_count(comic_info: RawConfigParser) -> int:
+    """
+    Reads the number of threads to read the comic pages' info.ini files with from the `Page discovery threads` option in
+    the [Comic Settings] section. Defaults to 1, i.e. the files are read one at a time. Reading files is mostly waiting
+    on the disk, so `auto` uses a few more threads than there are CPU cores.
+    """
+    return parse_worker_count(comic_info, "Page discovery threads", min(32, (os.cpu_count() or 1) + 4))
+
+
+def parse_worker_count(comic_info: RawConfigParser, option: str, auto_count: int) -> int:
+    value = comic_info.get("Comic Settings", option, fallback="1").strip()
+    if value.lower() == "auto":
+        return auto_count
+    try:
+        worker_count = int(value)
+    except ValueError:
+        worker_count = 0
+    if worker_count < 1:
+        raise ValueError(
+            f"Invalid '{option}' value in [Comic Settings]: {value!r}\n"
+            f"Use a whole number of 1 or more, or 'auto' to pick a number based on the number of CPU cores."
+        )
+    return worker_count
+
+
+def run_in_process_pool(
+        func: Callable[[Any], Any],
+        items: Iterable[Any],
+        worker_count: int,
+        initializer: Callable[..., None] | None = None,
+        initargs: tuple = (),
+) -> list[Any]:
+    """
+    Calls `func` on every item using a pool of worker processes, and returns the results in the same order as the
+    items. `func`, `initializer`, and every item must be picklable.
+    """
+    items = list(items)
+    # Send work over in chunks so the overhead of passing items between processes stays small for big archives
+    chunksize = max(1, len(items) // (worker_count * 4))
+    with ProcessPoolExecutor(max_workers=worker_count, initializer=initializer, initargs=initargs) as executor:
+        return list(executor.map(func, items, chunksize=chunksize))
+
+
+def map_in_thread_pool(func: Callable[[Any], Any], items: Iterable[Any], thread_count: int) -> Iterator[Any]:
+    """
+    Calls `func` on every item using a pool of threads, and yields the results in the same order as the items. If
+    `func` raises an exception for an item, it's raised when that item's result is reached, just like it would be if
+    the items were processed one at a time. With a single thread, items are processed lazily in the calling thread.
+    """
+    if thread_count <= 1:
+        yield from map(func, items)
+        return
+    with ThreadPoolExecutor(max_workers=thread_count) as executor:
+        yield from executor.map(func, items)
@@ -33,7 +33,7 @@
         {% else %}
         <a href="{{ comic_base_dir }}/comic/{{ next_id }}/#comic-page">
         {% endif %}
-            <img class="comic-image" src="{{ base_dir }}/{{ comic_path }}" title="{{ escaped_alt_text }}"/>
+            {% include "comic_image.tpl" %}
         </a>
         {%- endfor %}
     </div>
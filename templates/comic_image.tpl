@@ -0,0 +1,16 @@
+{#- One comic image on the comic page. If responsive images are turned on, smaller copies of the image in modern
+    formats are offered with `srcset`, and the browser picks the best one for the visitor's screen. -#}
+{%- set responsive_image = responsive_images.get(comic_path) if responsive_images is defined else none -%}
+{%- if responsive_image -%}
+<picture>
+    {%- for source in responsive_image.sources %}
+    <source type="{{ source.type }}" sizes="{{ responsive_image.sizes }}"
+            srcset="{% for image in source.srcset %}{{ base_dir }}/{{ image.path | urlencode }} {{ image.width }}w{% if not loop.last %}, {% endif %}{% endfor %}"/>
+    {%- endfor %}
+    <img class="comic-image" src="{{ base_dir }}/{{ comic_path }}" title="{{ escaped_alt_text }}"
+         width="{{ responsive_image.width }}" height="{{ responsive_image.height }}" sizes="{{ responsive_image.sizes }}"
+         srcset="{% for image in responsive_image.srcset %}{{ base_dir }}/{{ image.path | urlencode }} {{ image.width }}w{% if not loop.last %}, {% endif %}{% endfor %}"/>
+</picture>
+{%- else -%}
+<img class="comic-image" src="{{ base_dir }}/{{ comic_path }}" title="{{ escaped_alt_text }}"/>
+{%- endif -%}
@@ -0,0 +1,122 @@
+import os
+import tempfile
+from configparser import RawConfigParser
+from unittest import TestCase
+from unittest.mock import patch
+
+from jinja2 import DictLoader, Environment
+
+import build_manifest
+import utils
+
+TEMPLATES = {
+    "base.tpl": "<title>{{ _title }}</title>{% block content %}{% endblock %}",
+    "comic.tpl": '{% extends "base.tpl" %}{% block content %}{% include "nav.tpl" %}{{ post_html }}{% endblock %}',
+    "nav.tpl": "{% for link in links %}{{ link.url }}{% endfor %}{{ next_id }}",
+    "dynamic.tpl": "{% include template_to_include %}",
+    "archive.tpl": "{{ storylines }}",
+}
+
+
+class TestPageTemplate(TestCase):
+
+    def setUp(self):
+        self.old_environment = utils.jinja_environment
+        utils.jinja_environment = Environment(loader=DictLoader(TEMPLATES))
+
+    def tearDown(self):
+        utils.jinja_environment = self.old_environment
+
+    def test_get_template_variables_follows_extends_and_includes(self):
+        self.assertEqual(
+            {"_title", "post_html", "links", "next_id"},
+            build_manifest.get_template_variables(utils.jinja_environment, "comic.tpl"),
+        )
+
+    def test_get_template_variables_returns_none_for_dynamic_includes(self):
+        self.assertIsNone(build_manifest.get_template_variables(utils.jinja_environment, "dynamic.tpl"))
+
+    def test_fingerprint_ignores_variables_the_template_does_not_read(self):
+        page_template = build_manifest.get_page_template("comic", "default")
+        data_dict = {"_title": "Page 1", "post_html": "<p>Hi</p>", "links": [], "next_id": "Page 2",
+                     "storylines": {"Chapter 1": ["Page 1"]}}
+        fingerprint = build_manifest.fingerprint_page(page_template, data_dict)
+        data_dict["storylines"] = {"Chapter 1": ["Page 1", "Page 2"]}
+        self.assertEqual(fingerprint, build_manifest.fingerprint_page(page_template, data_dict))
+        data_dict["next_id"] = "Page 3"
+        self.assertNotEqual(fingerprint, build_manifest.fingerprint_page(page_template, data_dict))
+
+    def test_fingerprint_changes_when_templates_change(self):
+        data_dict = {"_title": "Page 1", "post_html": "<p>Hi</p>", "links": [], "next_id": "Page 2"}
+        fingerprint = build_manifest.fingerprint_page(build_manifest.get_page_template("comic", "default"), data_dict)
+        templates = dict(TEMPLATES, **{"nav.tpl": "{{ next_id }}"})
+        utils.jinja_environment = Environment(loader=DictLoader(templates))
+        self.assertNotEqual(
+            fingerprint,
+            build_manifest.fingerprint_page(build_manifest.get_page_template("comic", "default"), data_dict),
+        )
+
+
+class TestBuildManifest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.comic_info = RawConfigParser()
+        self.comic_info.add_section("Comic Settings")
+        self.comic_info.set("Comic Settings", "Cache directory", os.path.join(self.temp_dir.name, "cache"))
+        env_patcher = patch.dict(os.environ, {"OUTPUT_DIR": os.path.join(self.temp_dir.name, "output")})
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+
+    def write_page(self, html_path):
+        output_path = build_manifest.get_output_path(html_path)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "w") as f:
+            f.write("<html></html>")
+        return output_path
+
+    def test_incremental_build_disabled_by_default(self):
+        self.assertFalse(build_manifest.is_incremental_build_enabled(self.comic_info))
+
+    def test_missing_manifest_means_no_previous_build(self):
+        manifest = build_manifest.load_build_manifest(self.comic_info)
+        self.assertFalse(build_manifest.has_previous_build(manifest))
+        self.assertFalse(build_manifest.has_previous_build(None))
+
+    def test_unchanged_page_is_skipped_on_the_next_build(self):
+        manifest = build_manifest.load_build_manifest(self.comic_info)
+        self.assertTrue(build_manifest.should_write_page(manifest, "comic/Page 1/index.html", "abc"))
+        self.write_page("comic/Page 1/index.html")
+        build_manifest.save_build_manifest(manifest)
+
+        manifest = build_manifest.load_build_manifest(self.comic_info)
+        self.assertTrue(build_manifest.has_previous_build(manifest))
+        self.assertFalse(build_manifest.should_write_page(manifest, "comic/Page 1/index.html", "abc"))
+        self.assertTrue(build_manifest.should_write_page(manifest, "comic/Page 2/index.html", "abc"))
+
+    def test_changed_or_missing_page_is_written_again(self):
+        manifest = build_manifest.load_build_manifest(self.comic_info)
+        build_manifest.should_write_page(manifest, "comic/Page 1/index.html", "abc")
+        build_manifest.should_write_page(manifest, "comic/Page 2/index.html", "abc")
+        self.write_page("comic/Page 1/index.html")
+        build_manifest.save_build_manifest(manifest)
+
+        manifest = build_manifest.load_build_manifest(self.comic_info)
+        self.assertTrue(build_manifest.should_write_page(manifest, "comic/Page 1/index.html", "def"))
+        # Page 2 was never written to disk
+        self.assertTrue(build_manifest.should_write_page(manifest, "comic/Page 2/index.html", "abc"))
+
+    def test_remove_stale_pages(self):
+        manifest = build_manifest.load_build_manifest(self.comic_info)
+        build_manifest.should_write_page(manifest, "comic/Page 1/index.html", "abc")
+        build_manifest.should_write_page(manifest, "comic/Page 2/index.html", "abc")
+        self.write_page("comic/Page 1/index.html")
+        page_2_path = self.write_page("comic/Page 2/index.html")
+        build_manifest.save_build_manifest(manifest)
+
+        manifest = build_manifest.load_build_manifest(self.comic_info)
+        build_manifest.should_write_page(manifest, "comic/Page 1/index.html", "abc")
+        build_manifest.remove_stale_pages(manifest)
+        self.assertTrue(os.path.isfile(build_manifest.get_output_path("comic/Page 1/index.html")))
+        self.assertFalse(os.path.exists(os.path.dirname(page_2_path)))
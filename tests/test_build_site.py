@@ -1,3 +1,5 @@
+import os
+import tempfile
 from configparser import RawConfigParser
 from unittest import TestCase
 from unittest.mock import patch, MagicMock
@@ -255,9 +257,147 @@ class TestLoadWebringData(TestCase):
         )
 
 
+class TestOutputFileSpace(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.output_dir = self.temp_dir.name
+        for rel_path in ("index.html", "comic/page_info_list.json", "comic/Page 1/index.html",
+                         "extra/comic/Page 1/index.html", "extra/archive/index.html"):
+            path = os.path.join(self.output_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write("")
+
+    def remaining_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.output_dir).replace("\\", "/")
+            for root, _, names in os.walk(self.output_dir)
+            for name in names
+        )
+
+    def test_delete_output_file_space_keeps_matching_files(self):
+        comic_info = RawConfigParser()
+        comic_info.add_section("Comic Settings")
+        comic_info.set("Comic Settings", "Extra comics", "extra")
+        keep = build_site.get_preserved_output_paths(comic_info, keep_comic_pages=True)
+        with patch.dict(os.environ, {"OUTPUT_DIR": self.output_dir}):
+            build_site.delete_output_file_space(comic_info, keep)
+        self.assertEqual(["comic/Page 1/index.html", "extra/comic/Page 1/index.html"], self.remaining_files())
+
+    def test_delete_output_file_space_keeps_feeds_that_are_only_rewritten_when_changed(self):
+        for rel_path in ("feed.xml", "feed.xml.headers.json", "feed-1.xml", "feed.xml.tmp", "extra/feed.xml"):
+            open(os.path.join(self.output_dir, rel_path), "w").close()
+        comic_info = RawConfigParser()
+        comic_info.add_section("Comic Settings")
+        comic_info.set("Comic Settings", "Extra comics", "extra")
+        comic_info.add_section("RSS Feed")
+        comic_info.set("RSS Feed", "Keep unchanged feeds", "True")
+        keep = build_site.get_preserved_output_paths(comic_info, keep_comic_pages=False)
+        with patch.dict(os.environ, {"OUTPUT_DIR": self.output_dir}):
+            build_site.delete_output_file_space(comic_info, keep)
+        self.assertEqual(
+            ["extra/feed.xml", "feed-1.xml", "feed.xml", "feed.xml.headers.json"],
+            self.remaining_files(),
+        )
+
+    def test_delete_output_file_space_deletes_everything_by_default(self):
+        comic_info = RawConfigParser()
+        comic_info.add_section("Comic Settings")
+        self.assertEqual([], build_site.get_preserved_output_paths(comic_info, keep_comic_pages=False))
+        with patch.dict(os.environ, {"OUTPUT_DIR": self.output_dir}):
+            build_site.delete_output_file_space(comic_info, [])
+        self.assertFalse(os.path.exists(self.output_dir))
+
+
+class TestGetPageInfoList(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        old_cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        self.addCleanup(os.chdir, old_cwd)
+        self.comic_info = RawConfigParser()
+        self.comic_info.add_section("Comic Settings")
+        self.comic_info.set("Comic Settings", "Date format", "%B %d, %Y")
+        self.comic_info.set("Comic Settings", "Timezone", "UTC")
+        self.comic_info.add_section("Transcripts")
+        self.comic_info.set("Transcripts", "Enable transcripts", "False")
+        for i in range(1, 21):
+            self.write_page(f"Page {i}", f"Title = Page {i}\nPost date = January {i}, 2020\n")
+        os.makedirs("your_content/comics/No info")
+
+    def write_page(self, page_name, info):
+        os.makedirs(f"your_content/comics/{page_name}", exist_ok=True)
+        with open(f"your_content/comics/{page_name}/info.ini", "w") as f:
+            f.write(info)
+        with open(f"your_content/comics/{page_name}/page.png", "w") as f:
+            f.write("")
+
+    def get_page_info_list(self, threads):
+        self.comic_info.set("Comic Settings", "Page discovery threads", threads)
+        return build_site.get_page_info_list("", self.comic_info, False, False)
+
+    def test_threaded_discovery_matches_serial_discovery(self):
+        page_info_list, scheduled_post_count = self.get_page_info_list("1")
+        self.assertEqual(20, len(page_info_list))
+        self.assertEqual(0, scheduled_post_count)
+        self.assertEqual((page_info_list, scheduled_post_count), self.get_page_info_list("8"))
+
+    def test_threaded_discovery_raises_same_error(self):
+        self.write_page("Page 7", "Post date = Smarch 7, 2020\n")
+        self.write_page("Page 9", "Post date = January 9, 2020\n[Extra]\nHi = There\n")
+        errors = []
+        for threads in ("1", "8"):
+            with self.assertRaises(ValueError) as cm:
+                self.get_page_info_list(threads)
+            errors.append(str(cm.exception))
+        self.assertEqual(errors[0], errors[1])
+
+
+@patch(MUT + "load_shared_post_text")
+@patch(MUT + "create_comic_data")
+@patch(MUT + "run_hook")
+@patch(MUT + "has_hook")
+class TestBatchHooks(TestCase):
+
+    def setUp(self):
+        self.comic_info = RawConfigParser()
+        self.comic_info.add_section("Comic Settings")
+        self.comic_info.set("Comic Settings", "Theme", "default")
+        self.page_info_list = [{"page_name": "Page 1"}, {"page_name": "Page 2"}]
+
+    def test_comic_dict_hook_runs_per_page_without_batch_hook(
+            self, mock_has_hook, mock_run_hook, mock_create_comic_data, _mock_load_shared_post_text
+    ):
+        mock_has_hook.return_value = False
+        mock_create_comic_data.side_effect = lambda *args, **kwargs: {"page_name": args[2]["page_name"]}
+        comic_data_dicts = build_site.build_comic_data_dicts("", self.comic_info, self.page_info_list, MagicMock())
+        self.assertEqual([{"page_name": "Page 1"}, {"page_name": "Page 2"}], comic_data_dicts)
+        for c in mock_create_comic_data.call_args_list:
+            self.assertTrue(c.kwargs["run_comic_dict_hook"])
+        mock_run_hook.assert_not_called()
+
+    def test_batch_comic_dicts_hook_replaces_per_page_hook(
+            self, mock_has_hook, mock_run_hook, mock_create_comic_data, _mock_load_shared_post_text
+    ):
+        mock_has_hook.side_effect = lambda theme, func: func == "extra_comic_data_dicts_processing"
+        mock_create_comic_data.side_effect = lambda *args, **kwargs: {"page_name": args[2]["page_name"]}
+        mock_run_hook.side_effect = lambda theme, func, args: [dict(d, hooked=True) for d in args[2]]
+        comic_data_dicts = build_site.build_comic_data_dicts("", self.comic_info, self.page_info_list, MagicMock())
+        self.assertEqual([{"page_name": "Page 1", "hooked": True}, {"page_name": "Page 2", "hooked": True}],
+                         comic_data_dicts)
+        for c in mock_create_comic_data.call_args_list:
+            self.assertFalse(c.kwargs["run_comic_dict_hook"])
+        mock_run_hook.assert_called_once()
+        self.assertEqual("extra_comic_data_dicts_processing", mock_run_hook.call_args.args[1])
+
+
 @patch(MUT + "print_processing_times")
 @patch(MUT + "checkpoint")
-@patch(MUT + "build_rss_feed_from_job")
+@patch(MUT + "build_rss_feeds")
 @patch(MUT + "get_rss_feed_jobs")
 @patch(MUT + "build_and_publish_comic_pages")
 @patch(MUT + "get_extra_comics_list", return_value=[])
@@ -280,7 +420,7 @@ class TestMain(TestCase):
             _mock_get_extra_comics_list,
             mock_build_and_publish_comic_pages,
             mock_get_rss_feed_jobs,
-            mock_build_rss_feed_from_job,
+            mock_build_rss_feeds,
             _mock_checkpoint,
             _mock_print_processing_times,
     ):
@@ -297,12 +437,16 @@ class TestMain(TestCase):
         feed_job = object()
         mock_get_rss_feed_jobs.return_value = [feed_job]
 
+        build_site.utils.parse_post_date("January 1, 2020", "%B %d, %Y")
+
         build_site.main()
 
+        # Dates memoized by an earlier build in the same process are dropped
+        self.assertEqual(0, build_site.utils.parse_post_date.cache_info().currsize)
         mock_get_rss_feed_jobs.assert_called_once()
         self.assertEqual(
             ([models.ComicBuildResult("", comic_info, comic_data_dicts, global_values)],),
             mock_get_rss_feed_jobs.call_args.args,
         )
-        mock_build_rss_feed_from_job.assert_called_once_with(feed_job)
+        mock_build_rss_feeds.assert_called_once_with([feed_job], 1, None)
 
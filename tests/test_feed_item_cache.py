@@ -0,0 +1,139 @@
+import os
+import tempfile
+from configparser import RawConfigParser
+from unittest import TestCase
+from unittest.mock import patch
+
+import feed_item_cache
+from scripts import rss
+
+
+class TestFeedItemCache(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        old_cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        self.addCleanup(os.chdir, old_cwd)
+        self.comic_info = RawConfigParser()
+        self.comic_info.read_string(
+            "[Comic Info]\nComic name = Test Comic\nAuthor = Tester\nDescription = A comic\n"
+            "[Comic Settings]\nComic domain = example.com\nComic subdirectory =\nDate format = %B %d, %Y\n"
+            "Use build cache = True\n"
+        )
+        self.comic_data_dicts = [self.make_comic_data(i) for i in range(1, 4)]
+
+    @staticmethod
+    def make_comic_data(i, **overrides):
+        comic_data = {
+            "_title": f"Page {i}",
+            "_post_date": f"January {i}, 2020",
+            "page_name": f"Page {i}",
+            "comic_paths": [f"your_content/comics/Page {i}/page{i}.png"],
+            "_tags": ["tag"],
+            "post_html": f"<p>Post {i}</p>",
+        }
+        comic_data.update(overrides)
+        return comic_data
+
+    def build_feeds(self, feeds):
+        """
+        Builds the context of each feed the way a build does, loading the cache beforehand and saving it afterwards.
+        :param feeds: A dict from feed relative path to the keyword arguments for build_feed_context().
+        :return: The items of each feed, and the number of items that had to be normalized.
+        """
+        cache = feed_item_cache.load_feed_item_cache(self.comic_info)
+        items = {}
+        with (
+            patch("builtins.print"),
+            patch("scripts.rss.normalize_feed_item_links", wraps=rss.normalize_feed_item_links) as mock_normalize,
+        ):
+            for feed_relative_path, kwargs in feeds.items():
+                cached_items = cache.get_cached_items(feed_relative_path)
+                items[feed_relative_path] = rss.build_feed_context(
+                    self.comic_info, feed_relative_path=feed_relative_path, cached_items=cached_items, **kwargs
+                )["items"]
+                cache.update(feed_relative_path, cached_items)
+            feed_item_cache.save_feed_item_cache(cache)
+        return items, mock_normalize.call_count
+
+    def build_items(self, comic_data_dicts):
+        items, normalize_count = self.build_feeds({"feed.xml": {"comic_data_dicts": comic_data_dicts}})
+        return items["feed.xml"], normalize_count
+
+    def build_uncached_items(self, comic_data_dicts, **kwargs):
+        with patch("builtins.print"):
+            return rss.build_feed_context(self.comic_info, comic_data_dicts, **kwargs)["items"]
+
+    def test_unchanged_items_are_not_normalized_again(self):
+        items, normalize_count = self.build_items(self.comic_data_dicts)
+        self.assertEqual(3, normalize_count)
+        self.assertEqual(self.build_uncached_items(self.comic_data_dicts), items)
+        cached_items, normalize_count = self.build_items(self.comic_data_dicts)
+        self.assertEqual(0, normalize_count)
+        self.assertEqual(items, cached_items)
+
+    def test_new_page_is_spliced_into_cached_items(self):
+        self.build_items(self.comic_data_dicts)
+        comic_data_dicts = self.comic_data_dicts + [self.make_comic_data(4)]
+        items, normalize_count = self.build_items(comic_data_dicts)
+        self.assertEqual(1, normalize_count)
+        self.assertEqual(self.build_uncached_items(comic_data_dicts), items)
+
+    def test_changed_page_is_normalized_again(self):
+        self.build_items(self.comic_data_dicts)
+        self.comic_data_dicts[1] = self.make_comic_data(2, _post_date="February 2, 2020")
+        items, normalize_count = self.build_items(self.comic_data_dicts)
+        self.assertEqual(1, normalize_count)
+        self.assertEqual("Sun, 02 Feb 2020 00:00:00 +0000", items[1]["pub_date"])
+
+    def test_fields_outside_the_cached_item_are_always_current(self):
+        self.build_items(self.comic_data_dicts)
+        self.comic_data_dicts[0] = self.make_comic_data(1, _title="New title", _tags=[], post_html="<p>New</p>")
+        items, normalize_count = self.build_items(self.comic_data_dicts)
+        self.assertEqual(0, normalize_count)
+        self.assertEqual(self.build_uncached_items(self.comic_data_dicts), items)
+
+    def test_changed_feed_settings_invalidate_every_item(self):
+        self.build_items(self.comic_data_dicts)
+        self.comic_info.set("Comic Settings", "Comic domain", "example.org")
+        items, normalize_count = self.build_items(self.comic_data_dicts)
+        self.assertEqual(3, normalize_count)
+        self.assertEqual("https://example.org/comic/Page 1/", items[0]["link"])
+
+    def test_feeds_with_the_same_pages_are_cached_separately(self):
+        feeds = {
+            "feed.xml": {"comic_data_dicts": self.comic_data_dicts},
+            "extra/feed.xml": {"comic_data_dicts": self.comic_data_dicts, "comic_page_relative_path": "extra/comic"},
+        }
+        self.build_feeds(feeds)
+        items, normalize_count = self.build_feeds(feeds)
+        self.assertEqual(0, normalize_count)
+        self.assertEqual(self.build_uncached_items(self.comic_data_dicts), items["feed.xml"])
+        self.assertEqual(
+            self.build_uncached_items(self.comic_data_dicts, comic_page_relative_path="extra/comic"),
+            items["extra/feed.xml"],
+        )
+
+    def test_pages_with_the_same_name_from_different_comics_are_cached_separately(self):
+        # The main feed has the pages of every extra comic too, and their page names can be the same
+        comic_data_dicts = self.comic_data_dicts + [
+            self.make_comic_data(i, rss_comic_page_relative_path="extra/comic", comic_paths=[f"extra{i}.png"])
+            for i in range(1, 4)
+        ]
+        self.build_items(comic_data_dicts)
+        items, normalize_count = self.build_items(comic_data_dicts)
+        self.assertEqual(0, normalize_count)
+        self.assertEqual(self.build_uncached_items(comic_data_dicts), items)
+        self.assertEqual("https://example.com/extra/comic/Page 1/", items[3]["link"])
+
+    def test_removed_pages_are_dropped(self):
+        self.build_items(self.comic_data_dicts)
+        self.build_items(self.comic_data_dicts[:1])
+        cache = feed_item_cache.load_feed_item_cache(self.comic_info)
+        self.assertEqual(["comic/Page 1"], list(cache.get_cached_items("feed.xml").entries))
+
+    def test_disabled_cache(self):
+        self.comic_info.set("Comic Settings", "Use build cache", "False")
+        self.assertIsNone(feed_item_cache.load_feed_item_cache(self.comic_info))
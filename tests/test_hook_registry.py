@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import hook_registry
+
+HOOKS_PY = """
+calls = []
+
+
+def extra_comic_dict_processing(comic_folder, comic_info, d):
+    calls.append(d)
+    return dict(d, hooked=True)
+"""
+
+
+class TestHookRegistry(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        old_cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        self.addCleanup(os.chdir, old_cwd)
+        self.addCleanup(setattr, sys, "path", sys.path.copy())
+        # Each test gets its own theme name, so the hooks module isn't reused from sys.modules
+        self.theme = f"hook_test_{self.id().rsplit('.', 1)[-1]}"
+        os.makedirs(f"your_content/themes/{self.theme}/scripts")
+        with open(f"your_content/themes/{self.theme}/scripts/hooks.py", "w") as f:
+            f.write(HOOKS_PY)
+        hook_registry.reset_hook_registry()
+        self.addCleanup(hook_registry.reset_hook_registry)
+
+    def test_call_hook(self):
+        self.assertEqual({"a": 1, "hooked": True},
+                         hook_registry.call_hook(self.theme, "extra_comic_dict_processing", ["", None, {"a": 1}]))
+        self.assertIsNone(hook_registry.call_hook(self.theme, "preprocess", [None]))
+        self.assertIsNone(hook_registry.call_hook("no_such_theme", "preprocess", [None]))
+
+    def test_hooks_are_only_looked_up_once(self):
+        with (
+            patch("hook_registry.import_module", wraps=hook_registry.import_module) as mock_import,
+            patch("hook_registry.os.path.exists", wraps=os.path.exists) as mock_exists,
+        ):
+            for i in range(3):
+                hook_registry.call_hook(self.theme, "extra_comic_dict_processing", ["", None, {"i": i}])
+                hook_registry.call_hook(self.theme, "preprocess", [None])
+                hook_registry.call_hook("no_such_theme", "preprocess", [None])
+        self.assertEqual(1, mock_import.call_count)
+        self.assertEqual(2, mock_exists.call_count)
+
+    def test_hook_calls_are_counted_and_timed(self):
+        for i in range(3):
+            hook_registry.call_hook(self.theme, "extra_comic_dict_processing", ["", None, {"i": i}])
+        hook_registry.call_hook(self.theme, "preprocess", [None])
+        self.assertEqual([(self.theme, "extra_comic_dict_processing")], list(hook_registry.hook_stats))
+        stats = hook_registry.hook_stats[(self.theme, "extra_comic_dict_processing")]
+        self.assertEqual(3, stats.calls)
+        self.assertGreater(stats.ns, 0)
@@ -0,0 +1,166 @@
+import os
+import tempfile
+from configparser import RawConfigParser
+from unittest import TestCase
+from unittest.mock import patch
+
+from PIL import Image
+
+import images
+from build_cache import load_json_cache, save_json_cache
+
+
+class TestProcessComicImages(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.comic_info = RawConfigParser()
+        self.comic_info.add_section("Comic Settings")
+        self.comic_info.add_section("Image Reprocessing")
+        self.comic_info.set("Image Reprocessing", "Create thumbnails", "True")
+        self.comic_info.set("Image Reprocessing", "Overwrite existing images", "False")
+        self.comic_info.set("Image Reprocessing", "Thumbnail size", "50w")
+        self.comic_data_dicts = []
+        for i in range(1, 5):
+            page_dir = os.path.join(self.temp_dir.name, f"Page {i}")
+            os.makedirs(page_dir)
+            comic_path = os.path.join(page_dir, "page.png")
+            Image.new("RGBA", (100, 200), (255, 0, 0, 128)).save(comic_path)
+            self.comic_data_dicts.append({"page_name": f"Page {i}", "comic_paths": [comic_path]})
+
+    def get_thumbnail_path(self, i):
+        return os.path.join(self.temp_dir.name, f"Page {i}", "_thumbnail.jpg")
+
+    def test_process_comic_images_creates_thumbnails(self):
+        images.process_comic_images(self.comic_info, self.comic_data_dicts)
+        for i in range(1, 5):
+            with Image.open(self.get_thumbnail_path(i)) as im:
+                self.assertEqual((50, 100), im.size)
+                self.assertEqual("RGB", im.mode)
+
+    def test_process_comic_images_in_worker_processes(self):
+        self.comic_info.set("Comic Settings", "Build workers", "2")
+        images.process_comic_images(self.comic_info, self.comic_data_dicts)
+        for i in range(1, 5):
+            with Image.open(self.get_thumbnail_path(i)) as im:
+                self.assertEqual((50, 100), im.size)
+
+    def test_existing_thumbnails_are_kept_unless_overwriting(self):
+        Image.new("RGB", (10, 10)).save(self.get_thumbnail_path(1))
+        self.comic_info.set("Comic Settings", "Build workers", "2")
+        images.process_comic_images(self.comic_info, self.comic_data_dicts)
+        with Image.open(self.get_thumbnail_path(1)) as im:
+            self.assertEqual((10, 10), im.size)
+
+        self.comic_info.set("Image Reprocessing", "Overwrite existing images", "True")
+        images.process_comic_images(self.comic_info, self.comic_data_dicts)
+        with Image.open(self.get_thumbnail_path(1)) as im:
+            self.assertEqual((50, 100), im.size)
+
+    def test_pages_without_images_raise_helpful_error(self):
+        self.comic_data_dicts[1]["comic_paths"] = []
+        with self.assertRaisesRegex(ValueError, "No images found for page 'Page 2'"):
+            images.process_comic_images(self.comic_info, self.comic_data_dicts)
+
+    def test_thumbnail_cache_only_recreates_changed_thumbnails(self):
+        self.comic_info.set("Comic Settings", "Cache directory", os.path.join(self.temp_dir.name, "cache"))
+        self.comic_info.set("Image Reprocessing", "Overwrite existing images", "True")
+        self.comic_info.set("Image Reprocessing", "Cache thumbnails", "True")
+        images.process_comic_images(self.comic_info, self.comic_data_dicts)
+
+        # Replace the image for page 2 and delete the thumbnail for page 3
+        Image.new("RGB", (100, 100)).save(self.comic_data_dicts[1]["comic_paths"][0])
+        os.remove(self.get_thumbnail_path(3))
+        with patch("images.create_comic_thumbnail", wraps=images.create_comic_thumbnail) as mock_create:
+            images.process_comic_images(self.comic_info, self.comic_data_dicts)
+        self.assertEqual(
+            [self.comic_data_dicts[1]["comic_paths"][0], self.comic_data_dicts[2]["comic_paths"][0]],
+            [c.args[1] for c in mock_create.call_args_list],
+        )
+        with Image.open(self.get_thumbnail_path(2)) as im:
+            self.assertEqual((50, 50), im.size)
+
+        # Changing the thumbnail size invalidates every cached thumbnail
+        self.comic_info.set("Image Reprocessing", "Thumbnail size", "25w")
+        with patch("images.create_comic_thumbnail", wraps=images.create_comic_thumbnail) as mock_create:
+            images.process_comic_images(self.comic_info, self.comic_data_dicts)
+        self.assertEqual(4, mock_create.call_count)
+
+    def test_thumbnail_cache_recreates_edited_images_without_overwriting(self):
+        self.comic_info.set("Comic Settings", "Cache directory", os.path.join(self.temp_dir.name, "cache"))
+        self.comic_info.set("Image Reprocessing", "Overwrite existing images", "False")
+        self.comic_info.set("Image Reprocessing", "Cache thumbnails", "True")
+        # A thumbnail that was already there before the cache was turned on, and is older than its image, could have
+        # been made by hand
+        Image.new("RGB", (10, 10)).save(self.get_thumbnail_path(1))
+        os.utime(self.get_thumbnail_path(1), ns=(0, 0))
+        images.process_comic_images(self.comic_info, self.comic_data_dicts)
+
+        Image.new("RGB", (100, 100)).save(self.comic_data_dicts[1]["comic_paths"][0])
+        with patch("images.create_comic_thumbnail", wraps=images.create_comic_thumbnail) as mock_create:
+            images.process_comic_images(self.comic_info, self.comic_data_dicts)
+        self.assertEqual(
+            [(self.comic_data_dicts[0]["comic_paths"][0], False), (self.comic_data_dicts[1]["comic_paths"][0], True)],
+            [(c.args[1], c.kwargs["force"]) for c in mock_create.call_args_list],
+        )
+        with Image.open(self.get_thumbnail_path(2)) as im:
+            self.assertEqual((50, 50), im.size)
+        with Image.open(self.get_thumbnail_path(1)) as im:
+            self.assertEqual((10, 10), im.size)
+
+    def test_thumbnail_cache_adopts_existing_thumbnails(self):
+        # Thumbnails from builds before the cache was turned on
+        images.process_comic_images(self.comic_info, self.comic_data_dicts)
+        self.comic_info.set("Comic Settings", "Cache directory", os.path.join(self.temp_dir.name, "cache"))
+        self.comic_info.set("Image Reprocessing", "Cache thumbnails", "True")
+        with patch("images.create_comic_thumbnail", wraps=images.create_comic_thumbnail) as mock_create:
+            images.process_comic_images(self.comic_info, self.comic_data_dicts)
+        self.assertEqual(4, mock_create.call_count)
+        self.assertEqual(4, len(load_json_cache(os.path.join(self.temp_dir.name, "cache", "thumbnails.json"))))
+
+        Image.new("RGB", (100, 100)).save(self.comic_data_dicts[1]["comic_paths"][0])
+        images.process_comic_images(self.comic_info, self.comic_data_dicts)
+        with Image.open(self.get_thumbnail_path(2)) as im:
+            self.assertEqual((50, 50), im.size)
+
+    def test_thumbnail_cache_drops_deleted_pages(self):
+        cache_path = os.path.join(self.temp_dir.name, "cache", "thumbnails.json")
+        self.comic_info.set("Comic Settings", "Cache directory", os.path.dirname(cache_path))
+        self.comic_info.set("Image Reprocessing", "Cache thumbnails", "True")
+        other_comic_thumbnail_path = os.path.join("your_content", "extra", "comics", "Page 1", "_thumbnail.jpg")
+        save_json_cache(cache_path, {other_comic_thumbnail_path: "key"})
+        images.process_comic_images(self.comic_info, self.comic_data_dicts)
+        images.process_comic_images(self.comic_info, self.comic_data_dicts[:2])
+        self.assertEqual(
+            sorted([other_comic_thumbnail_path, self.get_thumbnail_path(1), self.get_thumbnail_path(2)]),
+            sorted(load_json_cache(cache_path)),
+        )
+
+
+class TestThumbnailResizing(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.comic_info = RawConfigParser()
+        self.comic_info.add_section("Image Reprocessing")
+
+    def test_fast_resize_matches_resize_dimensions(self):
+        jpg_path = os.path.join(self.temp_dir.name, "page.jpg")
+        Image.new("RGB", (1000, 3000), (0, 128, 255)).save(jpg_path)
+        for size in ("100w", "150h", "10%", "120, 80"):
+            with Image.open(jpg_path) as im:
+                expected = images.resize(im, size)
+            with Image.open(jpg_path) as im:
+                actual = images.fast_resize(im, size)
+            self.assertEqual(expected.size, actual.size)
+            self.assertEqual("RGB", actual.mode)
+
+    def test_get_resampling_filter(self):
+        self.assertIsNone(images.get_resampling_filter(self.comic_info))
+        self.comic_info.set("Image Reprocessing", "Thumbnail resampling", "Lanczos")
+        self.assertEqual(Image.Resampling.LANCZOS, images.get_resampling_filter(self.comic_info))
+        self.comic_info.set("Image Reprocessing", "Thumbnail resampling", "blurry")
+        with self.assertRaises(ValueError):
+            images.get_resampling_filter(self.comic_info)
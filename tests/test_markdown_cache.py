@@ -0,0 +1,65 @@
+import os
+import tempfile
+from configparser import RawConfigParser
+from unittest import TestCase
+from unittest.mock import patch
+
+import markdown_cache
+from build_cache import load_json_cache
+from markdown_cache import CachedMarkdown
+
+
+class TestMarkdownCache(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.comic_info = RawConfigParser()
+        self.comic_info.add_section("Comic Settings")
+        self.comic_info.set("Comic Settings", "Cache directory", self.temp_dir.name)
+        self.comic_info.set("Comic Settings", "Use build cache", "True")
+        self.cache_path = os.path.join(self.temp_dir.name, markdown_cache.MARKDOWN_CACHE_FILENAME)
+        self.addCleanup(setattr, markdown_cache, "markdown_cache", None)
+        self.markdown = CachedMarkdown(extras=["metadata"])
+
+    def convert_in_build(self, *texts):
+        markdown_cache.load_markdown_cache(self.comic_info)
+        with patch.object(self.markdown.markdown, "convert", wraps=self.markdown.markdown.convert) as mock_convert:
+            results = [self.markdown.convert(text) for text in texts]
+        markdown_cache.save_markdown_cache()
+        return results, mock_convert.call_count
+
+    def test_unchanged_text_is_not_converted_again(self):
+        (html,), convert_count = self.convert_in_build("---\ntemplate: page.tpl\n---\n*Hi*")
+        self.assertEqual(1, convert_count)
+        (cached_html,), convert_count = self.convert_in_build(b"---\ntemplate: page.tpl\n---\n*Hi*")
+        self.assertEqual(0, convert_count)
+        self.assertEqual(html, cached_html)
+        self.assertEqual({"template": "page.tpl"}, cached_html.metadata)
+
+    def test_extras_are_part_of_the_key(self):
+        self.convert_in_build("~~struck~~")
+        self.markdown = CachedMarkdown(extras=["metadata", "strike"])
+        (html,), convert_count = self.convert_in_build("~~struck~~")
+        self.assertEqual(1, convert_count)
+        self.assertIn("<s>", html)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.comic_info.set("Comic Settings", "Markdown cache size", "2")
+        self.convert_in_build("one", "two")
+        self.convert_in_build("two", "three")
+        _, convert_count = self.convert_in_build("two", "three", "one")
+        self.assertEqual(1, convert_count)
+        self.assertEqual(2, len(load_json_cache(self.cache_path)["entries"]))
+
+    def test_disabled_cache_is_not_saved(self):
+        self.comic_info.set("Comic Settings", "Use build cache", "False")
+        _, convert_count = self.convert_in_build("one", "one")
+        self.assertEqual(2, convert_count)
+        self.assertFalse(os.path.exists(self.cache_path))
+
+    def test_cache_from_other_markdown2_version_is_ignored(self):
+        self.convert_in_build("one")
+        with patch("markdown_cache.markdown2.__version__", "0.0.1"):
+            _, convert_count = self.convert_in_build("one")
+        self.assertEqual(1, convert_count)
@@ -0,0 +1,56 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from page_index import PageIndex
+
+
+class TestPageIndex(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        old_cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        self.addCleanup(os.chdir, old_cwd)
+        for page_name, filenames in {
+            "Page 1": ["info.ini", "page1.png", "_thumbnail.jpg"],
+            "Page 2": ["info.ini", "page2.png", "en.md"],
+            ".hidden": ["info.ini"],
+        }.items():
+            os.makedirs(f"your_content/comics/{page_name}")
+            for filename in filenames:
+                open(f"your_content/comics/{page_name}/{filename}", "w").close()
+        open("your_content/comics/not_a_page.txt", "w").close()
+
+    def test_pages_are_indexed(self):
+        page_index = PageIndex("your_content/comics")
+        self.assertEqual(["Page 1", "Page 2"], sorted(page_index.pages))
+        page_folder = page_index.pages["Page 2"]
+        self.assertEqual("your_content/comics/Page 2/", page_folder.path)
+        self.assertEqual(["en.md", "info.ini", "page2.png"], sorted(page_folder.files))
+        self.assertTrue(page_folder.has_file("info.ini"))
+        self.assertEqual(os.stat("your_content/comics/Page 2/info.ini").st_size, page_folder.stat("info.ini").st_size)
+
+    def test_missing_comics_folder(self):
+        self.assertEqual({}, PageIndex("your_content/other_comics").pages)
+
+    def test_isfile_is_answered_from_the_index(self):
+        page_index = PageIndex("your_content/comics")
+        with patch("page_index.os.path.isfile") as mock_isfile:
+            self.assertTrue(page_index.isfile("your_content/comics/Page 1/_thumbnail.jpg"))
+            self.assertTrue(page_index.isfile(os.path.join("your_content/comics/Page 2/", "page2.png")))
+            self.assertFalse(page_index.isfile("your_content/comics/Page 2/_thumbnail.jpg"))
+            self.assertFalse(page_index.isfile("your_content/comics/Page 3/info.ini"))
+        mock_isfile.assert_not_called()
+
+    def test_isfile_falls_back_to_file_system(self):
+        page_index = PageIndex("your_content/comics")
+        # Files outside of the page folders aren't in the index
+        self.assertTrue(page_index.isfile("your_content/comics/not_a_page.txt"))
+        self.assertTrue(page_index.isfile("your_content/comics/.hidden/info.ini"))
+        # Only the file system knows whether a different case matches
+        with patch("page_index.os.path.isfile", return_value=False) as mock_isfile:
+            self.assertFalse(page_index.isfile("your_content/comics/Page 1/PAGE1.PNG"))
+        mock_isfile.assert_called_once_with("your_content/comics/Page 1/PAGE1.PNG")
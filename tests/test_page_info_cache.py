@@ -0,0 +1,93 @@
+import os
+import tempfile
+import time
+from configparser import RawConfigParser
+from unittest import TestCase
+from unittest.mock import patch
+
+import page_info_cache
+from build_cache import load_json_cache
+from page_index import PageIndex
+
+
+class TestPageInfoCache(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        old_cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        self.addCleanup(os.chdir, old_cwd)
+        self.comic_info = RawConfigParser()
+        self.comic_info.add_section("Comic Settings")
+        self.comic_info.set("Comic Settings", "Use build cache", "True")
+        self.write_info("Page 1", "Title = Page 1\n")
+        self.write_info("Page 2", "Title = Page 2\n")
+
+    def write_info(self, page_name, text, mtime_ns=None):
+        """
+        Writes the page's info.ini file. It's given a modification time a minute ago unless another one is given, so
+        it's not read again because it was modified just before the build.
+        """
+        filepath = f"your_content/comics/{page_name}/info.ini"
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "w") as f:
+            f.write(text)
+        mtime_ns = mtime_ns or time.time_ns() - 60_000_000_000
+        os.utime(filepath, ns=(mtime_ns, mtime_ns))
+
+    def read_in_build(self):
+        cache = page_info_cache.load_page_info_cache(self.comic_info)
+        page_index = PageIndex("your_content/comics")
+        with patch("page_info_cache.read_info", wraps=page_info_cache.read_info) as mock_read_info:
+            page_infos = {name: cache.read_page_info(page_folder) for name, page_folder in page_index.pages.items()}
+        page_info_cache.save_page_info_cache(cache, page_index)
+        return page_infos, mock_read_info.call_count
+
+    def test_unchanged_pages_are_not_read_again(self):
+        page_infos, read_count = self.read_in_build()
+        self.assertEqual({"Page 1": {"Title": "Page 1"}, "Page 2": {"Title": "Page 2"}}, page_infos)
+        self.assertEqual(2, read_count)
+        cached_page_infos, read_count = self.read_in_build()
+        self.assertEqual(page_infos, cached_page_infos)
+        self.assertEqual(0, read_count)
+
+    def test_changed_pages_are_read_again(self):
+        self.read_in_build()
+        self.write_info("Page 2", "Title = Page Two\n")
+        page_infos, read_count = self.read_in_build()
+        self.assertEqual({"Title": "Page Two"}, page_infos["Page 2"])
+        self.assertEqual(1, read_count)
+
+    def test_pages_changed_within_the_same_mtime_tick_are_read_again(self):
+        mtime_ns = time.time_ns()
+        self.write_info("Page 2", "Title = Page 2\n", mtime_ns)
+        self.read_in_build()
+        # Same size and modification time, as after an edit right after the last build on a coarse clock
+        self.write_info("Page 2", "Title = Page X\n", mtime_ns)
+        page_infos, read_count = self.read_in_build()
+        self.assertEqual({"Title": "Page X"}, page_infos["Page 2"])
+        self.assertEqual(1, read_count)
+        # Once it's been read long enough after it was modified, it's trusted again
+        with patch("page_info_cache.time.time_ns", return_value=mtime_ns + page_info_cache.MTIME_RESOLUTION_NS):
+            self.read_in_build()
+        _, read_count = self.read_in_build()
+        self.assertEqual(0, read_count)
+
+    def test_cached_page_info_is_not_modified(self):
+        page_infos, _ = self.read_in_build()
+        page_infos["Page 1"]["Title"] = "Changed"
+        page_infos, _ = self.read_in_build()
+        self.assertEqual({"Title": "Page 1"}, page_infos["Page 1"])
+
+    def test_deleted_pages_are_dropped(self):
+        self.read_in_build()
+        os.remove("your_content/comics/Page 2/info.ini")
+        os.rmdir("your_content/comics/Page 2")
+        self.read_in_build()
+        cache_path = os.path.join(".comic_git_cache", page_info_cache.PAGE_INFO_CACHE_FILENAME)
+        self.assertEqual(["your_content/comics/Page 1/info.ini"], list(load_json_cache(cache_path)))
+
+    def test_disabled_cache(self):
+        self.comic_info.set("Comic Settings", "Use build cache", "False")
+        self.assertIsNone(page_info_cache.load_page_info_cache(self.comic_info))
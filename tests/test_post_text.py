@@ -0,0 +1,93 @@
+import os
+import tempfile
+from configparser import RawConfigParser
+from unittest import TestCase
+from unittest.mock import patch
+
+from markdown2 import Markdown
+
+import post_text
+
+MARKDOWN = Markdown(extras=["strike", "break-on-newline", "markdown-in-html"])
+
+
+class TestPostText(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        old_cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        self.addCleanup(os.chdir, old_cwd)
+        self.comic_info = RawConfigParser()
+        self.comic_info.add_section("Comic Settings")
+        os.makedirs("your_content/comics/Page 1")
+        self.write_file("your_content/comics/Page 1/post.txt", "Page *one*\n\n* a\n* b\n\nThe end")
+        self.write_file("your_content/before post text.txt", "# Before")
+        self.write_file("your_content/after post text.html", "<div>\nAfter\n</div>")
+
+    def write_file(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self):
+        shared_post_text = post_text.load_shared_post_text("", self.comic_info, MARKDOWN)
+        return post_text.build_post_text(shared_post_text, "your_content/comics/Page 1/post.txt", MARKDOWN)
+
+    def test_post_text_is_combined_with_before_and_after_text(self):
+        post_md, post_html = self.build()
+        self.assertEqual("# Before\n\nPage *one*\n\n* a\n* b\n\nThe end\n\n<div>\nAfter\n</div>", post_md)
+        self.assertEqual(MARKDOWN.convert(post_md), post_html)
+
+    def test_converting_separately_matches_converting_as_a_whole(self):
+        expected = self.build()
+        self.comic_info.set("Comic Settings", "Convert post text separately", "True")
+        shared_post_text = post_text.load_shared_post_text("", self.comic_info, MARKDOWN)
+        self.assertIsNotNone(shared_post_text.before_html)
+        with patch.object(MARKDOWN, "convert", wraps=MARKDOWN.convert) as mock_convert:
+            actual = post_text.build_post_text(shared_post_text, "your_content/comics/Page 1/post.txt", MARKDOWN)
+        mock_convert.assert_called_once_with("Page *one*\n\n* a\n* b\n\nThe end")
+        self.assertEqual(expected, actual)
+
+    def test_missing_post_txt_when_converting_separately(self):
+        os.remove("your_content/comics/Page 1/post.txt")
+        expected = self.build()
+        self.comic_info.set("Comic Settings", "Convert post text separately", "True")
+        self.assertEqual(expected, self.build())
+
+    def test_text_spanning_files_is_converted_as_a_whole(self):
+        self.write_file("your_content/before post text.txt", '<div class="post">\n\n</div>')
+        self.write_file("your_content/after post text.html", "[patreon]: https://example.com")
+        self.write_file("your_content/comics/Page 1/post.txt", "Support me on [Patreon][patreon]")
+        expected = self.build()
+        self.comic_info.set("Comic Settings", "Convert post text separately", "True")
+        shared_post_text = post_text.load_shared_post_text("", self.comic_info, MARKDOWN)
+        self.assertIsNone(shared_post_text.after_html)
+        self.assertIn('href="https://example.com"', expected[1])
+        self.assertEqual(expected, self.build())
+
+    def test_is_self_contained(self):
+        self.assertTrue(post_text.is_self_contained("Some *text*<br>\n\n<div><img src='a.png'/></div>"))
+        self.assertFalse(post_text.is_self_contained("<div>"))
+        self.assertFalse(post_text.is_self_contained("[link]: https://example.com"))
+        self.assertFalse(post_text.is_self_contained("```\ncode"))
+        self.assertTrue(post_text.is_self_contained("Intro\n\n- a\n- b\n\nOutro"))
+        self.assertFalse(post_text.is_self_contained("- a\n\n- b"))
+        self.assertFalse(post_text.is_self_contained("1. a\n\nOutro"))
+        self.assertFalse(post_text.is_self_contained("Intro\n\n    code"))
+        self.assertFalse(post_text.is_self_contained("    continued item\n\nOutro"))
+
+    def test_lists_and_indented_blocks_spanning_files_are_converted_as_a_whole(self):
+        self.comic_info.set("Comic Settings", "Convert post text separately", "True")
+        for before, page, after in [
+            ("- a\n\n- b", "- c", "After"),
+            ("1. a", "2. b", "After"),
+            ("Before", "    code", "    more code"),
+            ("- a", "    continued", "After"),
+        ]:
+            with self.subTest(before=before, page=page, after=after):
+                self.write_file("your_content/before post text.txt", before)
+                self.write_file("your_content/comics/Page 1/post.txt", page)
+                self.write_file("your_content/after post text.html", after)
+                post_md, post_html = self.build()
+                self.assertEqual(MARKDOWN.convert(post_md), post_html)
@@ -0,0 +1,59 @@
+import os
+import tempfile
+from configparser import RawConfigParser
+from unittest import TestCase
+from unittest.mock import patch
+
+import rendering
+import utils
+
+
+class TestWritePages(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.template_folder = os.path.join(self.temp_dir.name, "templates")
+        os.makedirs(self.template_folder)
+        with open(os.path.join(self.template_folder, "comic.tpl"), "w") as f:
+            f.write("<h1>{{ comic_title }}</h1>{{ page_name }} {{ next_id }}")
+        self.comic_info = RawConfigParser()
+        self.comic_info.add_section("Comic Settings")
+        utils.build_jinja_environment(self.comic_info, [self.template_folder])
+        utils.build_markdown_parser(self.comic_info)
+        self.global_values = {"comic_title": "My Comic", "theme": "default"}
+
+    def make_pages(self):
+        pages = []
+        for i in range(1, 6):
+            data_dict = {"page_name": f"Page {i}", "next_id": f"Page {i + 1}"}
+            data_dict.update(self.global_values)
+            pages.append((f"comic/Page {i}/index.html", data_dict))
+        return pages
+
+    def write_pages(self, output_dir, build_workers):
+        self.comic_info.set("Comic Settings", "Build workers", build_workers)
+        pages = self.make_pages()
+        with patch.dict(os.environ, {"OUTPUT_DIR": output_dir}):
+            rendering.write_pages(self.comic_info, [self.template_folder], "comic", pages, self.global_values)
+        contents = {}
+        for html_path, data_dict in pages:
+            self.assertEqual("comic", data_dict["template_name"])
+            with open(os.path.join(output_dir, html_path), "rb") as f:
+                contents[html_path] = f.read()
+        return contents
+
+    def test_parallel_output_matches_serial_output(self):
+        serial = self.write_pages(os.path.join(self.temp_dir.name, "serial"), "1")
+        parallel = self.write_pages(os.path.join(self.temp_dir.name, "parallel"), "3")
+        self.assertEqual(serial, parallel)
+        self.assertEqual(b"<h1>My Comic</h1>Page 2 Page 3", serial["comic/Page 2/index.html"])
+
+    def test_get_page_values_strips_shared_values(self):
+        shared = {"storylines": {"Chapter 1": []}, "comic_title": "My Comic"}
+        data_dict = {"page_name": "Page 1", "comic_title": "Overridden"}
+        data_dict["storylines"] = shared["storylines"]
+        self.assertEqual(
+            {"page_name": "Page 1", "comic_title": "Overridden"},
+            rendering.get_page_values(data_dict, shared),
+        )
@@ -0,0 +1,122 @@
+import os
+import tempfile
+from configparser import RawConfigParser
+from unittest import TestCase
+from unittest.mock import patch
+
+from PIL import Image
+
+import responsive_images
+from build_cache import load_json_cache, save_json_cache
+
+
+class TestResponsiveImages(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.comic_info = RawConfigParser()
+        self.comic_info.add_section("Comic Settings")
+        self.comic_info.set("Comic Settings", "Cache directory", os.path.join(self.temp_dir.name, "cache"))
+        self.comic_info.set("Comic Settings", "Use build cache", "True")
+        self.cache_path = os.path.join(self.temp_dir.name, "cache", responsive_images.RESPONSIVE_IMAGE_CACHE_FILENAME)
+        self.comic_info.add_section("Image Reprocessing")
+        self.comic_info.set("Image Reprocessing", "Create responsive images", "True")
+        self.comic_info.set("Image Reprocessing", "Responsive image widths", "50, 100, 400")
+        self.comic_info.set("Image Reprocessing", "Responsive image formats", "webp")
+        self.page_dir = os.path.join(self.temp_dir.name, "Page 1")
+        os.makedirs(self.page_dir)
+        self.comic_path = os.path.join(self.page_dir, "page.png")
+        Image.new("RGBA", (200, 300), (255, 0, 0, 128)).save(self.comic_path)
+        self.gif_path = os.path.join(self.page_dir, "bonus.gif")
+        Image.new("P", (10, 10)).save(self.gif_path)
+        self.comic_data_dicts = [{"page_name": "Page 1", "comic_paths": [self.comic_path, self.gif_path]}]
+
+    def test_disabled_by_default(self):
+        self.comic_info.remove_option("Image Reprocessing", "Create responsive images")
+        responsive_images.process_responsive_images(self.comic_info, self.comic_data_dicts)
+        self.assertEqual({}, self.comic_data_dicts[0]["responsive_images"])
+        self.assertEqual(["bonus.gif", "page.png"], sorted(os.listdir(self.page_dir)))
+
+    def test_creates_smaller_images_and_srcset_data(self):
+        responsive_images.process_responsive_images(self.comic_info, self.comic_data_dicts)
+        self.assertEqual(
+            ["_page_png_100w.jpg", "_page_png_100w.webp", "_page_png_200w.webp", "_page_png_50w.jpg",
+             "_page_png_50w.webp", "bonus.gif", "page.png"],
+            sorted(os.listdir(self.page_dir)),
+        )
+        with Image.open(os.path.join(self.page_dir, "_page_png_100w.jpg")) as im:
+            self.assertEqual((100, 150), im.size)
+        responsive_image = self.comic_data_dicts[0]["responsive_images"][self.comic_path]
+        self.assertEqual((200, 300), (responsive_image["width"], responsive_image["height"]))
+        self.assertEqual("(max-width: 200px) 100vw, 200px", responsive_image["sizes"])
+        self.assertEqual("image/webp", responsive_image["sources"][0]["type"])
+        self.assertEqual([50, 100, 200], [image["width"] for image in responsive_image["sources"][0]["srcset"]])
+        self.assertEqual(self.comic_path, responsive_image["srcset"][-1]["path"])
+        self.assertNotIn(self.gif_path, self.comic_data_dicts[0]["responsive_images"])
+
+    def test_unchanged_images_are_not_encoded_again(self):
+        responsive_images.process_responsive_images(self.comic_info, self.comic_data_dicts)
+        with patch("responsive_images.save_variant") as mock_save_variant:
+            responsive_images.process_responsive_images(self.comic_info, self.comic_data_dicts)
+            mock_save_variant.assert_not_called()
+
+            os.remove(os.path.join(self.page_dir, "_page_png_50w.webp"))
+            responsive_images.process_responsive_images(self.comic_info, self.comic_data_dicts)
+            self.assertEqual(5, mock_save_variant.call_count)
+        self.assertIn(self.comic_path, self.comic_data_dicts[0]["responsive_images"])
+
+    def test_images_with_the_same_name_in_different_formats_get_their_own_copies(self):
+        jpg_path = os.path.join(self.page_dir, "page.jpg")
+        Image.new("RGB", (100, 50)).save(jpg_path)
+        self.comic_data_dicts[0]["comic_paths"].append(jpg_path)
+        responsive_images.process_responsive_images(self.comic_info, self.comic_data_dicts)
+        responsive_image_sets = self.comic_data_dicts[0]["responsive_images"]
+        png_paths = {image["path"] for image in responsive_image_sets[self.comic_path]["sources"][0]["srcset"]}
+        jpg_paths = {image["path"] for image in responsive_image_sets[jpg_path]["sources"][0]["srcset"]}
+        self.assertFalse(png_paths & jpg_paths)
+        with Image.open(os.path.join(self.page_dir, "_page_png_100w.webp")) as im:
+            self.assertEqual((100, 150), im.size)
+        with Image.open(os.path.join(self.page_dir, "_page_jpg_100w.webp")) as im:
+            self.assertEqual((100, 50), im.size)
+
+    def test_images_outside_the_current_widths_and_formats_are_deleted(self):
+        other_image_variant = os.path.join(self.page_dir, "_page_jpg_50w.webp")
+        Image.new("RGB", (50, 75)).save(other_image_variant)
+        responsive_images.process_responsive_images(self.comic_info, self.comic_data_dicts)
+        self.comic_info.set("Image Reprocessing", "Responsive image widths", "100")
+        responsive_images.process_responsive_images(self.comic_info, self.comic_data_dicts)
+        self.assertEqual(
+            ["_page_jpg_50w.webp", "_page_png_100w.jpg", "_page_png_100w.webp", "_page_png_200w.webp", "bonus.gif",
+             "page.png"],
+            sorted(os.listdir(self.page_dir)),
+        )
+
+    def test_images_are_encoded_again_without_the_build_cache(self):
+        self.comic_info.set("Comic Settings", "Use build cache", "False")
+        responsive_images.process_responsive_images(self.comic_info, self.comic_data_dicts)
+        with patch("responsive_images.save_variant") as mock_save_variant:
+            responsive_images.process_responsive_images(self.comic_info, self.comic_data_dicts)
+        self.assertEqual(5, mock_save_variant.call_count)
+        self.assertFalse(os.path.exists(self.cache_path))
+
+    def test_cache_drops_deleted_images(self):
+        other_comic_path = os.path.join("your_content", "extra", "comics", "Page 1", "page.png")
+        save_json_cache(self.cache_path, {other_comic_path: {"key": "key", "width": 1, "height": 1}})
+        responsive_images.process_responsive_images(self.comic_info, self.comic_data_dicts)
+        page_2_dir = os.path.join(self.temp_dir.name, "Page 2")
+        os.makedirs(page_2_dir)
+        page_2_path = os.path.join(page_2_dir, "page.png")
+        Image.new("RGB", (20, 30)).save(page_2_path)
+        comic_data_dicts = [{"page_name": "Page 2", "comic_paths": [page_2_path]}]
+        responsive_images.process_responsive_images(self.comic_info, comic_data_dicts)
+        self.assertEqual(sorted([other_comic_path, page_2_path]), sorted(load_json_cache(self.cache_path)))
+
+    def test_invalid_settings(self):
+        self.comic_info.set("Image Reprocessing", "Responsive image formats", "gif")
+        with self.assertRaisesRegex(ValueError, "Responsive image formats"):
+            responsive_images.get_responsive_image_settings(self.comic_info)
+        self.comic_info.set("Image Reprocessing", "Responsive image formats", "webp")
+        self.comic_info.set("Image Reprocessing", "Responsive image widths", "big")
+        with self.assertRaisesRegex(ValueError, "Responsive image widths"):
+            responsive_images.get_responsive_image_settings(self.comic_info)
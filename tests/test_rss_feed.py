@@ -1,4 +1,6 @@
 import os
+import random
+import tempfile
 from configparser import RawConfigParser
 from copy import deepcopy
 from unittest import TestCase
@@ -6,6 +8,8 @@ from unittest.mock import mock_open, patch
 from xml.etree import ElementTree
 
 import models
+from build_cache import hash_bytes
+from feed_item_cache import FeedItemCache
 from scripts import rss
 
 
@@ -73,10 +77,15 @@ class TestRssFeed(TestCase):
             return None, None, open_mock
         return (
             open_mock.call_args.args[0],
-            open_mock().write.call_args.args[0].decode("utf-8"),
+            self.get_written_text(open_mock),
             open_mock,
         )
 
+    @staticmethod
+    def get_written_text(open_mock):
+        # The feed is written out in several chunks
+        return b"".join(c.args[0] for c in open_mock().write.call_args_list).decode("utf-8")
+
     @staticmethod
     def parse_feed(xml_text):
         return ElementTree.fromstring(xml_text)
@@ -247,6 +256,32 @@ class TestRssFeed(TestCase):
             items[1].find("link").text,
         )
 
+    def test_build_rss_feed_from_job_writes_archive_document(self):
+        feed_job = rss.build_feed_job(
+            comic_info=deepcopy(self.comic_info),
+            comic_data_dicts=[self.make_comic_data()],
+            feed_relative_path="feed-1.xml",
+        )
+        feed_job.archive_links = [("current", "feed.xml"), ("next-archive", "feed-2.xml")]
+        feed_job.is_archive = True
+
+        with patch("builtins.open", new_callable=mock_open) as open_mock:
+            rss.build_rss_feed_from_job(feed_job)
+
+        channel = self.parse_feed(self.get_written_text(open_mock)).find("channel")
+        self.assertEqual(
+            [
+                ("self", "https://www.tamberlanecomic.com/feed-1.xml"),
+                ("current", "https://www.tamberlanecomic.com/feed.xml"),
+                ("next-archive", "https://www.tamberlanecomic.com/feed-2.xml"),
+            ],
+            [
+                (link.attrib["rel"], link.attrib["href"])
+                for link in channel.findall("{http://www.w3.org/2005/Atom}link")
+            ],
+        )
+        self.assertIsNotNone(channel.find("{http://purl.org/syndication/history/1.0}archive"))
+
     def test_build_rss_feed_from_job_uses_explicit_job_settings(self):
         feed_job = rss.build_feed_job(
             comic_info=deepcopy(self.comic_info),
@@ -260,7 +295,7 @@ class TestRssFeed(TestCase):
                 rss.build_rss_feed_from_job(feed_job)
 
         feed_path = open_mock.call_args.args[0]
-        output = open_mock().write.call_args.args[0].decode("utf-8")
+        output = self.get_written_text(open_mock)
         root = self.parse_feed(output)
         channel = root.find("channel")
         atom_link = channel.find("{http://www.w3.org/2005/Atom}link")
@@ -482,6 +517,146 @@ class TestRssFeed(TestCase):
         self.assertIn(f"Could not write RSS feed to {feed_path}", str(cm.exception))
         self.assertIn("Verify the output directory exists and has write permissions.", str(cm.exception))
 
+    def build_feeds_in_temp_dir(self, feed_jobs, worker_count):
+        with tempfile.TemporaryDirectory() as output_dir:
+            with (
+                patch.dict(os.environ, {"OUTPUT_DIR": output_dir}, clear=False),
+                patch("scripts.rss.checkpoint") as mock_checkpoint,
+                patch("scripts.rss.record_processing_time") as mock_record_processing_time,
+            ):
+                feed_results = rss.build_rss_feeds(feed_jobs, worker_count)
+            self.assertEqual(
+                [feed_result.feed_relative_path for feed_result in feed_results],
+                [args[0].removeprefix("RSS feed ") for args, _ in mock_record_processing_time.call_args_list],
+            )
+            mock_checkpoint.assert_called_once_with(f"Build {len(feed_results)} RSS feeds")
+            feed_texts = {}
+            for feed_relative_path in sorted(os.listdir(output_dir)):
+                with open(os.path.join(output_dir, feed_relative_path), "rb") as f:
+                    feed_texts[feed_relative_path] = f.read()
+        return [feed_result.feed_relative_path for feed_result in feed_results], feed_texts
+
+    def test_build_rss_feeds_in_worker_processes_matches_serial_build(self):
+        feed_jobs = [
+            rss.build_feed_job(
+                comic_info=deepcopy(self.comic_info),
+                comic_data_dicts=[self.make_comic_data(page_name=f"Page {i}")],
+                feed_relative_path=f"feed-{i}.xml",
+            )
+            for i in range(1, 4)
+        ]
+        feed_jobs.append(rss.build_feed_job(
+            comic_info=deepcopy(self.comic_info),
+            comic_data_dicts=[self.make_comic_data()],
+            feed_relative_path="disabled.xml",
+            build_enabled=False,
+        ))
+
+        serial_paths, serial_texts = self.build_feeds_in_temp_dir(feed_jobs, 1)
+        with patch("builtins.print"):
+            parallel_paths, parallel_texts = self.build_feeds_in_temp_dir(feed_jobs, 2)
+
+        self.assertEqual(["feed-1.xml", "feed-2.xml", "feed-3.xml"], serial_paths)
+        self.assertEqual(serial_paths, parallel_paths)
+        self.assertEqual(["feed-1.xml", "feed-2.xml", "feed-3.xml"], list(serial_texts))
+        self.assertEqual(serial_texts, parallel_texts)
+
+    def test_build_rss_feeds_in_worker_processes_updates_feed_item_cache(self):
+        feed_jobs = [
+            rss.build_feed_job(
+                comic_info=deepcopy(self.comic_info),
+                comic_data_dicts=[self.make_comic_data(page_name=f"Page {i}")],
+                feed_relative_path=f"feed-{i}.xml",
+            )
+            for i in range(1, 3)
+        ]
+        feed_item_cache = FeedItemCache("feed_items.json", {})
+        with tempfile.TemporaryDirectory() as output_dir:
+            with (
+                patch.dict(os.environ, {"OUTPUT_DIR": output_dir}, clear=False),
+                patch("scripts.rss.checkpoint"),
+                patch("builtins.print"),
+            ):
+                rss.build_rss_feeds(feed_jobs, 2, feed_item_cache)
+        self.assertEqual((0, 2), (feed_item_cache.hits, feed_item_cache.misses))
+        self.assertEqual(
+            {"feed-1.xml": ["comic/Page 1"], "feed-2.xml": ["comic/Page 2"]},
+            {path: list(feed["items"]) for path, feed in feed_item_cache.used_feeds.items()},
+        )
+
+
+class TestKeepUnchangedFeeds(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.feed_path = os.path.join(self.temp_dir.name, "feed.xml")
+
+    def write_feed(self, xml_text):
+        rss.write_feed_xml(self.feed_path, iter([xml_text]), keep_unchanged=True)
+
+    def test_unchanged_feed_is_not_rewritten(self):
+        self.write_feed("<rss>1</rss>")
+        os.utime(self.feed_path, ns=(1_000_000_000, 1_000_000_000))
+        with patch("scripts.rss.os.replace") as mock_replace:
+            self.write_feed("<rss>1</rss>")
+        mock_replace.assert_not_called()
+        self.assertEqual(1_000_000_000, os.stat(self.feed_path).st_mtime_ns)
+        self.assertEqual(["feed.xml", "feed.xml.headers.json"], sorted(os.listdir(self.temp_dir.name)))
+        self.assertEqual(
+            {"ETag": f'"{hash_bytes(b"<rss>1</rss>")}"', "Last-Modified": "Thu, 01 Jan 1970 00:00:01 GMT"},
+            rss.read_feed_headers(self.feed_path),
+        )
+
+    def test_changed_feed_is_rewritten(self):
+        self.write_feed("<rss>1</rss>")
+        os.utime(self.feed_path, ns=(1_000_000_000, 1_000_000_000))
+        self.write_feed("<rss>2</rss>")
+        with open(self.feed_path, "rb") as f:
+            self.assertEqual(b"<rss>2</rss>", f.read())
+        self.assertNotEqual(1_000_000_000, os.stat(self.feed_path).st_mtime_ns)
+        self.assertEqual(f'"{hash_bytes(b"<rss>2</rss>")}"', rss.read_feed_headers(self.feed_path)["ETag"])
+
+    def test_feed_headers_are_not_written_by_default(self):
+        rss.write_feed_xml(self.feed_path, "<rss>1</rss>")
+        self.assertEqual(["feed.xml"], os.listdir(self.temp_dir.name))
+        self.assertIsNone(rss.read_feed_headers(self.feed_path))
+
+    def test_stale_archive_feeds_are_removed(self):
+        comic_info = RawConfigParser()
+        comic_info.add_section("RSS Feed")
+        comic_info.set("RSS Feed", "Keep unchanged feeds", "True")
+        for name in ["feed.xml", "feed.xml.headers.json", "feed-1.xml", "feed-2.xml", "feed-2.xml.headers.json"]:
+            open(os.path.join(self.temp_dir.name, name), "w").close()
+        feed_jobs = [
+            rss.FeedJob(comic_info, []),
+            rss.FeedJob(comic_info, [], feed_relative_path="feed-1.xml", is_archive=True),
+        ]
+        with patch.dict(os.environ, {"OUTPUT_DIR": self.temp_dir.name}, clear=False):
+            rss.remove_stale_feeds(feed_jobs, ["feed*.xml", "feed*.xml.headers.json"])
+        self.assertEqual(["feed-1.xml", "feed.xml", "feed.xml.headers.json"], sorted(os.listdir(self.temp_dir.name)))
+
+    def test_feeds_that_are_not_built_anymore_are_removed(self):
+        comic_info = RawConfigParser()
+        comic_info.add_section("RSS Feed")
+        comic_info.set("RSS Feed", "Keep unchanged feeds", "True")
+        os.makedirs(os.path.join(self.temp_dir.name, "extra"))
+        for name in ["feed.xml", "feed.xml.headers.json", "extra/feed.xml", "extra/feed.xml.headers.json"]:
+            open(os.path.join(self.temp_dir.name, name), "w").close()
+        kept_feed_paths = ["feed*.xml", "feed*.xml.headers.json", "extra/feed*.xml", "extra/feed*.xml.headers.json"]
+        # The extra comic's feed is combined with the main feed now
+        feed_jobs = [rss.FeedJob(comic_info, [])]
+        with patch.dict(os.environ, {"OUTPUT_DIR": self.temp_dir.name}, clear=False):
+            rss.remove_stale_feeds(feed_jobs, kept_feed_paths)
+        self.assertEqual([], os.listdir(os.path.join(self.temp_dir.name, "extra")))
+        self.assertEqual(["extra", "feed.xml", "feed.xml.headers.json"], sorted(os.listdir(self.temp_dir.name)))
+
+        # And the main feed isn't built anymore either
+        feed_jobs = [rss.FeedJob(comic_info, [], build_enabled=False)]
+        with patch.dict(os.environ, {"OUTPUT_DIR": self.temp_dir.name}, clear=False):
+            rss.remove_stale_feeds(feed_jobs, kept_feed_paths)
+        self.assertEqual(["extra"], os.listdir(self.temp_dir.name))
+
 
 class TestRssFeedJobs(TestCase):
 
@@ -810,3 +985,152 @@ class TestRssFeedJobs(TestCase):
         feed_jobs = rss.get_rss_feed_jobs([extra_result, main_result])
 
         self.assertEqual(0, len(feed_jobs))
+
+    def make_paged_comic_result(self, page_count, max_items, archive_feeds, comic_info=None):
+        comic_info = comic_info or self.make_comic_info()
+        comic_info.add_section("Comic Settings")
+        comic_info.set("Comic Settings", "Date format", "%Y-%m-%d")
+        comic_info.set("RSS Feed", "Max items", str(max_items))
+        comic_info.set("RSS Feed", "Archive feeds", str(archive_feeds))
+        return models.ComicBuildResult(
+            comic_folder="",
+            comic_info=comic_info,
+            comic_data_dicts=[
+                {"page_name": f"Page {i}", "_title": f"Page {i}", "_post_date": f"2020-01-{i:02d}"}
+                for i in range(1, page_count + 1)
+            ],
+            global_values={},
+        )
+
+    @staticmethod
+    def get_page_names(feed_job):
+        return [comic_data["page_name"] for comic_data in feed_job.comic_data_dicts]
+
+    def test_get_rss_feed_jobs_limits_feed_to_newest_pages(self):
+        feed_jobs = rss.get_rss_feed_jobs([self.make_paged_comic_result(5, 2, False)])
+
+        self.assertEqual(1, len(feed_jobs))
+        self.assertEqual(["Page 4", "Page 5"], self.get_page_names(feed_jobs[0]))
+        self.assertEqual([], feed_jobs[0].archive_links)
+
+    def test_get_rss_feed_jobs_adds_archive_feeds(self):
+        feed_jobs = rss.get_rss_feed_jobs([self.make_paged_comic_result(7, 3, True)])
+
+        self.assertEqual(
+            [
+                ("feed.xml", ["Page 5", "Page 6", "Page 7"], [("prev-archive", "feed-2.xml")], False),
+                ("feed-1.xml", ["Page 1", "Page 2", "Page 3"],
+                 [("current", "feed.xml"), ("next-archive", "feed-2.xml")], True),
+                ("feed-2.xml", ["Page 4"],
+                 [("current", "feed.xml"), ("prev-archive", "feed-1.xml")], True),
+            ],
+            [
+                (job.feed_relative_path, self.get_page_names(job), job.archive_links, job.is_archive)
+                for job in feed_jobs
+            ],
+        )
+
+    def test_get_rss_feed_jobs_paginates_combined_feed_by_post_date(self):
+        main_comic_result = self.make_paged_comic_result(
+            3, 2, True, comic_info=self.make_root_comic_info(combine_with_main_rss_feed=True),
+        )
+        # The Extra Comic's pages were posted in between the main comic's pages
+        extra_comic_result = models.ComicBuildResult(
+            comic_folder="extra/",
+            comic_info=self.make_inherited_extra_comic_info(main_comic_result.comic_info, comic_name="Extra"),
+            comic_data_dicts=[
+                {"page_name": "Extra 1", "_title": "Extra 1", "_post_date": "2020-01-01"},
+                {"page_name": "Extra 2", "_title": "Extra 2", "_post_date": "2020-01-02"},
+                {"page_name": "Extra 4", "_title": "Extra 4", "_post_date": "2020-01-04"},
+            ],
+            global_values={},
+        )
+
+        feed_jobs = rss.get_rss_feed_jobs([main_comic_result, extra_comic_result])
+
+        self.assertEqual(
+            [
+                ("feed.xml", ["Page 3", "Extra 4"]),
+                ("feed-1.xml", ["Page 1", "Extra 1"]),
+                ("feed-2.xml", ["Page 2", "Extra 2"]),
+            ],
+            [(job.feed_relative_path, self.get_page_names(job)) for job in feed_jobs],
+        )
+
+    def test_get_rss_feed_jobs_archives_only_pages_older_than_the_feed(self):
+        feed_jobs = rss.get_rss_feed_jobs([self.make_paged_comic_result(6, 3, True)])
+
+        self.assertEqual(
+            [("feed.xml", ["Page 4", "Page 5", "Page 6"]), ("feed-1.xml", ["Page 1", "Page 2", "Page 3"])],
+            [(job.feed_relative_path, self.get_page_names(job)) for job in feed_jobs],
+        )
+
+    def test_get_rss_feed_jobs_does_not_paginate_short_feeds(self):
+        feed_jobs = rss.get_rss_feed_jobs([self.make_paged_comic_result(3, 3, True)])
+
+        self.assertEqual(1, len(feed_jobs))
+        self.assertEqual(["Page 1", "Page 2", "Page 3"], self.get_page_names(feed_jobs[0]))
+
+    def test_get_rss_feed_jobs_rejects_invalid_max_items(self):
+        comic_result = self.make_paged_comic_result(3, 3, True)
+        comic_result.comic_info.set("RSS Feed", "Max items", "lots")
+
+        with self.assertRaisesRegex(ValueError, "Invalid 'Max items' value in \\[RSS Feed\\]"):
+            rss.get_rss_feed_jobs([comic_result])
+
+
+class TestFeedXmlWriter(TestCase):
+    TEXT_PIECES = [
+        "a", "&", "<", ">", '"', "'", "\n", "  ", "\t", "\r", "\r\n", "\xa0", "é", "]]>", "x y", "\n\t z", "",
+    ]
+
+    def make_feed_context(self, make_text, item_count):
+        return {
+            "feed_self_url": make_text(),
+            "channel_title": make_text(),
+            "channel_description": make_text(),
+            "comic_url": make_text(),
+            "channel_author": make_text(),
+            "channel_language": make_text(),
+            "channel_image_url": make_text(),
+            "channel_image_width": make_text(),
+            "channel_image_height": make_text(),
+            "archive_links": [{"rel": "prev-archive", "href": make_text()}] * (item_count % 2),
+            "is_archive": item_count > 1,
+            "items": [
+                {
+                    "title": make_text(),
+                    "author": make_text(),
+                    "pub_date": make_text(),
+                    "link": make_text(),
+                    "guid": make_text(),
+                    "categories": [{"type": make_text(), "text": make_text()} for _ in range(i % 3)],
+                    "description_placeholder_key": f"rss_cdata_{i}",
+                    "description_html": make_text() + "<p>{not a placeholder}</p>",
+                }
+                for i in range(item_count)
+            ],
+        }
+
+    def assert_matches_pretty_xml(self, feed_context):
+        expected = rss.serialize_feed_xml(*rss.build_feed_xml(feed_context))
+        self.assertEqual(expected, "".join(rss.iter_feed_xml(feed_context)))
+
+    def test_matches_pretty_xml(self):
+        texts = iter(["Title & <friends>", "\n    Indented\n    lines\n", "", "  ", 'Say "hi"', "a\r\nb\rc"] * 20)
+        self.assert_matches_pretty_xml(self.make_feed_context(lambda: next(texts), 3))
+
+    def test_matches_pretty_xml_for_random_text(self):
+        rng = random.Random(0)
+
+        def make_text():
+            return "".join(rng.choice(self.TEXT_PIECES) for _ in range(rng.randint(0, 6)))
+
+        for _ in range(300):
+            self.assert_matches_pretty_xml(self.make_feed_context(make_text, rng.randint(0, 3)))
+
+    def test_invalid_characters_raise_helpful_error(self):
+        feed_context = self.make_feed_context(lambda: "text", 1)
+        feed_context["items"][0]["title"] = "Bad \x0b title"
+        with self.assertRaisesRegex(ValueError, "Invalid character '\\\\x0b' in RSS feed text"):
+            "".join(rss.iter_feed_xml(feed_context))
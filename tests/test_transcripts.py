@@ -0,0 +1,85 @@
+import os
+import tempfile
+from configparser import RawConfigParser
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import transcripts
+from transcripts import TranscriptIndex
+
+
+class TestTranscriptIndex(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        old_cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        self.addCleanup(os.chdir, old_cwd)
+        self.comic_info = RawConfigParser()
+        self.comic_info.add_section("Transcripts")
+        self.comic_info.set("Transcripts", "Enable transcripts", "True")
+        self.comic_info.set("Transcripts", "Default language", "French")
+        self.write_file("your_content/comics/Page 1/post.txt", "Post")
+        self.write_file("your_content/comics/Page 1/English.txt", "English txt")
+        self.write_file("your_content/comics/Page 1/English.md", "English md")
+        self.write_file("your_content/comics/Page 1/French.txt", "French")
+        self.write_file("transcripts/Page 1/Spanish.md", "Spanish")
+        self.write_file("transcripts/Page 1/English.txt", "English from transcripts folder")
+
+    def write_file(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_languages_have_default_language_first(self):
+        index = TranscriptIndex("", self.comic_info)
+        self.assertEqual(["French", "English"], index.get_languages("Page 1"))
+        self.assertEqual([], index.get_languages("Page 2"))
+
+    def test_md_files_take_precedence_over_txt_files(self):
+        markdown = MagicMock()
+        markdown.convert.side_effect = lambda text: text
+        index = TranscriptIndex("", self.comic_info)
+        self.assertEqual({"French": "French", "English": "English md"}, index.get_transcripts("Page 1", markdown))
+
+    def test_transcripts_folder_is_loaded_after_comic_folder(self):
+        self.comic_info.set("Transcripts", "Transcripts folder", "transcripts")
+        markdown = MagicMock()
+        markdown.convert.side_effect = lambda text: text
+        index = TranscriptIndex("", self.comic_info)
+        self.assertEqual(
+            {"French": "French", "English": "English from transcripts folder", "Spanish": "Spanish"},
+            index.get_transcripts("Page 1", markdown),
+        )
+        self.comic_info.set("Transcripts", "Load transcripts from comic folder", "False")
+        self.assertEqual(["English", "Spanish"], TranscriptIndex("", self.comic_info).get_languages("Page 1"))
+
+    def test_listing_languages_does_not_convert_transcripts(self):
+        markdown = MagicMock()
+        markdown.convert.side_effect = lambda text: text
+        index = TranscriptIndex("", self.comic_info)
+        index.get_languages("Page 1")
+        markdown.convert.assert_not_called()
+        index.get_transcripts("Page 1", markdown)
+        self.assertEqual(2, markdown.convert.call_count)
+
+    def test_disabled_transcripts(self):
+        self.comic_info.set("Transcripts", "Enable transcripts", "False")
+        self.assertEqual([], TranscriptIndex("", self.comic_info).get_languages("Page 1"))
+
+    def test_each_transcripts_folder_is_scanned_once(self):
+        self.write_file("your_content/comics/Page 2/English.txt", "English")
+        self.write_file("your_content/comics/.hidden/English.txt", "English")
+        self.write_file("your_content/comics/Page 2/.English.txt", "Hidden")
+        self.comic_info.set("Transcripts", "Transcripts folder", "transcripts")
+        index = TranscriptIndex("", self.comic_info)
+        with patch("transcripts.index_transcript_files", wraps=transcripts.index_transcript_files) as mock_index:
+            self.assertEqual(["French", "English", "Spanish"], index.get_languages("Page 1"))
+            self.assertEqual(["English"], index.get_languages("Page 2"))
+            self.assertEqual([], index.get_languages("Page 3"))
+        self.assertEqual(2, mock_index.call_count)
+
+    def test_missing_transcripts_folder(self):
+        self.comic_info.set("Transcripts", "Transcripts folder", "no such folder")
+        self.assertEqual(["French", "English"], TranscriptIndex("", self.comic_info).get_languages("Page 1"))
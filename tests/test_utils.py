@@ -1,9 +1,15 @@
 import json
+import os
+import random
+import tempfile
 from configparser import RawConfigParser
 from copy import deepcopy
+from datetime import datetime
 from unittest import TestCase
 from unittest.mock import patch, mock_open, call
 
+from jinja2 import StrictUndefined, TemplateNotFound
+
 import utils
 
 
@@ -412,3 +418,197 @@ class TestGetSocialMediaData(TestCase):
             "comic/001/index.html",
         )
         self.assertEqual(expected, actual)
+
+
+class TestBuildJinjaEnvironment(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.template_folder = os.path.join(self.temp_dir.name, "templates")
+        os.makedirs(self.template_folder)
+        with open(os.path.join(self.template_folder, "page.tpl"), "w") as f:
+            f.write("Hello {{ name }}")
+        self.comic_info = RawConfigParser()
+        self.comic_info.add_section("Comic Settings")
+        self.comic_info.set("Comic Settings", "Cache directory", os.path.join(self.temp_dir.name, "cache"))
+        self.old_environment = utils.jinja_environment
+        self.addCleanup(setattr, utils, "jinja_environment", self.old_environment)
+
+    def test_environment_is_shared_for_the_same_settings(self):
+        utils.build_jinja_environment(self.comic_info, [self.template_folder])
+        environment = utils.jinja_environment
+        self.assertIs(StrictUndefined, environment.undefined)
+        utils.build_jinja_environment(self.comic_info, [self.template_folder])
+        self.assertIs(environment, utils.jinja_environment)
+
+        self.comic_info.set("Comic Settings", "Allow missing variables in templates", "True")
+        utils.build_jinja_environment(self.comic_info, [self.template_folder])
+        self.assertIsNot(environment, utils.jinja_environment)
+        self.assertIsNot(StrictUndefined, utils.jinja_environment.undefined)
+
+    def test_compiled_templates_are_saved_in_build_cache(self):
+        self.comic_info.set("Comic Settings", "Use build cache", "True")
+        utils.build_jinja_environment(self.comic_info, [self.template_folder])
+        self.assertEqual("Hello you", utils.jinja_environment.get_template("page.tpl").render(name="you"))
+        self.assertEqual(1, len(os.listdir(os.path.join(self.temp_dir.name, "cache", "jinja"))))
+
+
+class TestWriteToTemplate(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        old_cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        self.addCleanup(os.chdir, old_cwd)
+        self.write_file("templates/comic.tpl", "tpl {{ name }}")
+        self.write_file("templates/comic.html", "html {{ name }}")
+        self.write_file("templates/archive.tpl", "archive")
+        self.write_file("templates/md_page.tpl", "md {{ text }}")
+        self.write_file("your_content/themes/test/pages/about.md", "*About*")
+        self.write_file("your_content/themes/test/pages/extra/faq.md", "FAQ")
+        comic_info = RawConfigParser()
+        comic_info.add_section("Comic Settings")
+        old_environment, old_markdown_parser = utils.jinja_environment, utils.markdown_parser
+        self.addCleanup(setattr, utils, "jinja_environment", old_environment)
+        self.addCleanup(setattr, utils, "markdown_parser", old_markdown_parser)
+        utils.build_jinja_environment(comic_info, ["templates"])
+        utils.build_markdown_parser(comic_info)
+
+    def write_file(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def render(self, template_name):
+        utils.write_to_template(template_name, "out.html", {"theme": "test", "name": "Page 1"})
+        with open("out.html") as f:
+            return f.read()
+
+    def test_templates_are_resolved_from_the_index(self):
+        with patch("utils.os.walk", wraps=os.walk) as mock_walk:
+            self.assertEqual("html Page 1", self.render("comic"))
+            self.assertEqual("archive", self.render("archive"))
+            self.assertEqual("md <p><em>About</em></p>\n", self.render("about"))
+            self.assertEqual("md <p>FAQ</p>\n", self.render("extra/faq"))
+        # The pages folder is only scanned for the first page
+        self.assertEqual(1, len([c for c in mock_walk.call_args_list if "pages" in c.args[0]]))
+
+    def test_missing_template(self):
+        with self.assertRaisesRegex(TemplateNotFound, "Template matching 'nope' not found"):
+            self.render("nope")
+
+
+class TestParseFlatInfo(TestCase):
+    LINES = [
+        "Title = Page 1", "Post date = January 1, 2020", "Tags: a, b", "  continued", "\tcontinued with a tab", "",
+        "   ", "# comment", "; comment", "  # indented comment", "[Section]", "  [not a section]", "no delimiter",
+        "= no name", "Title=duplicate", "key = value = more", "key2 :  spaced  ", "Ünïcode = ✓", "cr = a\r",
+        "  indented = key",
+    ]
+
+    @staticmethod
+    def read_with_config_parser(info_string):
+        info = RawConfigParser()
+        info.optionxform = str
+        try:
+            info.read_string("[DEFAULT]\n" + info_string)
+        except Exception:
+            return None
+        if list(info.keys()) != ["DEFAULT"]:
+            return None
+        return dict(info["DEFAULT"])
+
+    def test_matches_raw_config_parser(self):
+        for info_string in (
+            "Title = Page 1\nPost date = January 1, 2020\n",
+            "Filenames = page1.png,\n    page2.png\n\n    page3.png\n\n# Done\n",
+            "Post text = Hello\n  # Not a continuation\n  there\nTags:a,b",
+            "Title=",
+        ):
+            self.assertEqual(self.read_with_config_parser(info_string), utils.parse_flat_info(info_string))
+
+    def test_unsupported_files_are_left_to_raw_config_parser(self):
+        for info_string in ("Title = 1\n[Extra]\nA = b", "Title = 1\nTitle = 2", "Title 1"):
+            self.assertIsNone(utils.parse_flat_info(info_string))
+
+    def test_matches_raw_config_parser_for_random_files(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            info_string = "\n".join(rng.choice(self.LINES) for _ in range(rng.randint(0, 8)))
+            self.assertEqual(self.read_with_config_parser(info_string), utils.parse_flat_info(info_string),
+                             repr(info_string))
+
+    def test_read_info_uses_fast_parser_for_flat_files(self):
+        with (
+            patch("builtins.open", mock_open(read_data=b"Title = Page 1\n  continued\n")),
+            patch("utils.RawConfigParser.read_string") as mock_read_string,
+        ):
+            self.assertEqual({"Title": "Page 1\ncontinued"}, utils.read_info("info.ini", to_dict=True))
+        mock_read_string.assert_not_called()
+
+    def test_read_info_falls_back_to_raw_config_parser(self):
+        with patch("builtins.open", mock_open(read_data=b"Title = Page 1\n[Extra]\nA = b\n")):
+            with self.assertRaisesRegex(ValueError, "Error parsing configuration file info.ini"):
+                utils.read_info("info.ini", to_dict=True)
+
+
+class TestParsePostDate(TestCase):
+
+    def setUp(self):
+        utils.parse_post_date.cache_clear()
+
+    def test_parse_post_date(self):
+        self.assertEqual(datetime(2020, 1, 2), utils.parse_post_date("January 2, 2020", "%B %d, %Y"))
+
+    def test_each_date_is_only_parsed_once(self):
+        with patch("utils.datetime", wraps=datetime) as mock_datetime:
+            for _ in range(3):
+                utils.parse_post_date("January 2, 2020", "%B %d, %Y")
+        self.assertEqual(1, mock_datetime.strptime.call_count)
+
+    def test_invalid_date(self):
+        with self.assertRaises(ValueError):
+            utils.parse_post_date("Smarch 2, 2020", "%B %d, %Y")
+
+
+class TestProcessingTimes(TestCase):
+
+    def setUp(self):
+        self.addCleanup(setattr, utils, "PROCESSING_TIMES", utils.PROCESSING_TIMES)
+
+    def test_recorded_times_are_reported_under_their_phase(self):
+        utils.PROCESSING_TIMES = [
+            ("Start", 0, None),
+            ("Load pages", 2_000_000, None),
+            ("RSS feed feed.xml", 3_000_000, 1.5),
+            ("RSS feed tags/Tag.xml", 3_500_000, 0.75),
+            ("Build 2 RSS feeds", 5_000_000, None),
+        ]
+        self.assertEqual(
+            [
+                ("Load pages", 2.0, []),
+                ("Build 2 RSS feeds", 3.0, [("RSS feed feed.xml", 1.5), ("RSS feed tags/Tag.xml", 0.75)]),
+            ],
+            utils.get_processing_times(),
+        )
+        with patch("builtins.print") as mock_print:
+            utils.print_processing_times()
+        self.assertEqual(
+            [
+                call(""),
+                call("Load pages: 2.00 ms"),
+                call("Build 2 RSS feeds: 3.00 ms"),
+                call("    RSS feed feed.xml: 1.50 ms"),
+                call("    RSS feed tags/Tag.xml: 0.75 ms"),
+                call("Total time: 5.00 ms"),
+            ],
+            mock_print.call_args_list,
+        )
+
+    def test_record_processing_time_does_not_start_a_phase(self):
+        utils.checkpoint("Start", clear=True)
+        utils.record_processing_time("RSS feed feed.xml", 1.0)
+        utils.checkpoint("Build 1 RSS feeds")
+        self.assertEqual(["Build 1 RSS feeds"], [name for name, _, _ in utils.get_processing_times()])
@@ -0,0 +1,62 @@
+from configparser import RawConfigParser
+from unittest import TestCase
+from unittest.mock import patch
+
+import workers
+
+
+class TestWorkers(TestCase):
+
+    def make_comic_info(self, build_workers=None):
+        comic_info = RawConfigParser()
+        comic_info.add_section("Comic Settings")
+        if build_workers is not None:
+            comic_info.set("Comic Settings", "Build workers", build_workers)
+        return comic_info
+
+    def test_get_worker_count_defaults_to_serial(self):
+        self.assertEqual(1, workers.get_worker_count(self.make_comic_info()))
+
+    def test_get_worker_count(self):
+        self.assertEqual(4, workers.get_worker_count(self.make_comic_info(" 4 ")))
+
+    @patch("workers.os.cpu_count", return_value=8)
+    def test_get_worker_count_auto(self, _mock_cpu_count):
+        self.assertEqual(8, workers.get_worker_count(self.make_comic_info("Auto")))
+
+    def test_get_worker_count_rejects_invalid_values(self):
+        for value in ("0", "-2", "lots"):
+            with self.assertRaisesRegex(ValueError, "Invalid 'Build workers' value"):
+                workers.get_worker_count(self.make_comic_info(value))
+
+    def test_run_in_process_pool_preserves_order(self):
+        self.assertEqual(
+            [5, 4, 3, 2, 1, 0, 1, 2, 3],
+            workers.run_in_process_pool(abs, range(-5, 4), 3),
+        )
+
+    def test_get_page_discovery_thread_count(self):
+        comic_info = self.make_comic_info()
+        self.assertEqual(1, workers.get_page_discovery_thread_count(comic_info))
+        comic_info.set("Comic Settings", "Page discovery threads", "6")
+        self.assertEqual(6, workers.get_page_discovery_thread_count(comic_info))
+        comic_info.set("Comic Settings", "Page discovery threads", "none")
+        with self.assertRaisesRegex(ValueError, "Invalid 'Page discovery threads' value"):
+            workers.get_page_discovery_thread_count(comic_info)
+
+    def test_map_in_thread_pool_preserves_order(self):
+        for thread_count in (1, 4):
+            self.assertEqual(
+                [5, 4, 3, 2, 1, 0, 1, 2, 3],
+                list(workers.map_in_thread_pool(abs, range(-5, 4), thread_count)),
+            )
+
+    def test_map_in_thread_pool_raises_errors_in_order(self):
+        def invert(i):
+            return 1 / i
+
+        for thread_count in (1, 4):
+            results = workers.map_in_thread_pool(invert, [1, 2, 0, 4], thread_count)
+            self.assertEqual([1, 0.5], [next(results), next(results)])
+            with self.assertRaises(ZeroDivisionError):
+                next(results)